@@ -1,141 +1,304 @@
 # agent_manager.py
 
+import os
 import json
 import logging
 import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional
 from langchain_community.chat_models import ChatOpenAI  # Updated import
 from google_search import google_partselect_search
 from partselect_scraper import scrape_partselect
-from symptom_scraper import scrape_symptom_page  # Import SymptomScraper
-from vector_manager import live_store, index_scraped_data, semantic_search_with_intent
+from symptom_scraper import scrape_symptom_pages, merge_symptom_pages
+from vector_manager import live_store, index_scraped_data, retrieve_fresh, page_part_numbers
+from ingestion_worker import ingestion_worker
+from url_resolver import url_resolver, parse_product_url
+from compatibility_store import compatibility_store, PartCompatibility, model_key
+from intent_classifier import intent_classifier
+from entity_extractor import entity_extractor
+from llm_cache import CachedChatModel, llm_cache
+from answer_cache import answer_cache
+from context_builder import context_builder
 from langchain.schema import HumanMessage, SystemMessage
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - AgentManager - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("agent_manager.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("AgentManager")
 
+VALID_INTENTS = {'troubleshoot', 'installation', 'compatibility', 'qna', 'general'}
+
+# Product page sections each intent actually uses (see static_scraper.PRODUCT_SECTIONS)
+INTENT_SECTIONS = {
+    'installation': ("description", "troubleshooting", "qna"),
+    'compatibility': ("model_compatibility",),
+}
+
+# Known part/model pairs are answered straight from the compatibility index; set this to
+# have the LLM still write the answer around the indexed result
+COMPATIBILITY_LLM_PROSE = os.getenv("COMPATIBILITY_LLM_PROSE", "false").lower() in ("1", "true", "yes")
+
+# Entities each intent's handling needs; when the local classifier and extractor find all
+# of them, the query needs no GPT call at all (qna and general need none)
+INTENT_REQUIRED_ENTITIES = {
+    'troubleshoot': ("symptom",),
+    'installation': ("part_number",),
+    'compatibility': ("part_number", "model_number"),
+    'qna': (),
+    'general': (),
+}
+
+
+# System prompts for the final answer of each intent
+TROUBLESHOOT_PROMPT = (
+    "You are a helpful appliance repair assistant. Create a concise but detailed response using the provided information. "
+    "Format your response using these guidelines:\n"
+    "1. Use '### ' for main sections\n"
+    "2. Use '#### ' for subsections\n"
+    "3. Use bullet points for lists\n"
+    "4. Keep sections compact but informative\n\n"
+    "Include these sections:\n"
+    "### Problem Analysis\n"
+    "- Brief description of the issue\n"
+    "- Potential causes\n\n"
+    "### Solution\n"
+    "#### Required Parts\n"
+    "- Part information\n"
+    "- Fix success rate\n\n"
+    "#### Repair Steps\n"
+    "1. Numbered steps\n"
+    "2. Clear instructions\n\n"
+    "Keep the formatting consistent and clean."
+)
+
+INSTALLATION_PROMPT = (
+    "You are a helpful appliance repair assistant. Create a concise but detailed response using the provided information. "
+    "Format your response using these guidelines:\n"
+    "1. Use '### ' for main sections (Part Info)\n"
+    "2. Use '#### ' for subsections (Tools Needed)\n"
+    "3. Use bullet points for lists\n"
+    "4. Keep sections compact but informative\n\n"
+    "Include these sections:\n"
+    "### Part Information\n"
+    "- Part details and compatibility\n"
+    "- Price and availability\n\n"
+    "### Installation Guide\n"
+    "#### Tools Needed\n"
+    "- List required tools\n"
+    "- Estimated time\n\n"
+    "#### Safety First\n"
+    "- Key safety precautions\n\n"
+    "#### Steps\n"
+    "1. Numbered steps\n"
+    "2. Clear instructions\n\n"
+    "Keep the formatting consistent and clean."
+)
+
+COMPATIBILITY_PROMPT = (
+    "You are a helpful appliance repair assistant. Create a concise response about part compatibility. "
+    "Format your response using these guidelines:\n\n"
+    "#### Compatibility Summary\n"
+    "- Start with a clear yes/no statement\n"
+    "- Keep it brief and direct\n\n"
+    "#### Part Details\n"
+    "- Part name and number\n"
+    "- Basic specifications\n\n"
+    "#### Notes\n"
+    "- Important compatibility details\n"
+    "- Installation considerations\n\n"
+    "Use:\n"
+    "- '#### ' for section headers (smaller headers)\n"
+    "- Bullet points for lists\n"
+    "- Brief, clear sentences\n"
+    "- No large headers\n"
+    "Keep the entire response concise and well-organized."
+)
+
+
+@dataclass
+class QueryEntities:
+    """
+    Everything handle_query needs to know about a query, extracted in one pass.
+    """
+    intent: str = "general"
+    model_number: Optional[str] = None
+    brand: Optional[str] = None
+    symptom: str = ""
+    part_number: Optional[str] = None
+
 
 class AgentManager:
+    # Number of recent queries whose extracted entities are kept, so the
+    # per-field wrappers below don't trigger another LLM round trip
+    ENTITY_CACHE_SIZE = 64
+
     def __init__(self):
         """
         Initializes the Agent Manager with necessary components.
         """
-        self.llm = ChatOpenAI(model_name="gpt-4", temperature=0)  # Use GPT-4 for intent detection
+        # Use GPT-4 for intent detection; identical temperature-0 calls are served from the LLM cache
+        self.llm = CachedChatModel(ChatOpenAI(model_name="gpt-4", temperature=0), llm_cache)
+        self._entity_cache = OrderedDict()
+        # Requests run on Flask's worker threads and share the cache
+        self._entity_cache_lock = threading.Lock()
 
-    def detect_intent(self, query: str) -> str:
+    def extract_entities(self, query: str) -> QueryEntities:
         """
-        Detects the user's intent using GPT-4.
+        Extracts intent, model number, brand, symptom and part number from the query.
+        Part/model numbers and brand come from the local extractor and the intent from the
+        local classifier when they can; a single GPT-4 call that returns JSON fills in the
+        rest, and is skipped when the local results already cover everything the intent needs.
+        When GPT is asked, its intent wins over the local one.
         """
+        cached = self._cached_entities(query)
+        if cached is not None:
+            return cached
+
+        # Identifiers and brand come from the deterministic extractor whenever it finds them
+        identifiers = entity_extractor.extract(query)
+        entities = QueryEntities(part_number=identifiers.part_number, model_number=identifiers.model_number,
+                                 brand=identifiers.brand)
+        local_intent = intent_classifier.classify(query)
+        if local_intent is not None:
+            entities.intent = local_intent
+        required = INTENT_REQUIRED_ENTITIES.get(local_intent)
+        if required is not None and all(getattr(entities, field) for field in required):
+            logger.info("⚡ Extracted all entities locally, skipping GPT.")
+            return self._remember_entities(query, entities)
+
         try:
             messages = [
                 SystemMessage(content=(
-                    "You are an AI assistant specialized in classifying queries related to refrigerator and dishwasher parts."
-                    " Classify the user's query into one of the following categories: 'troubleshoot', 'installation', "
-                    "'compatibility', 'qna', or 'general'. Only return the category name as the response."
+                    "You are an AI assistant specialized in queries related to refrigerator and dishwasher parts. "
+                    "Extract the following fields from the user's query and return them as a single JSON object:\n"
+                    "- \"intent\": one of 'troubleshoot', 'installation', 'compatibility', 'qna', or 'general'\n"
+                    "- \"model_number\": the appliance model number (e.g. WRS588FIHZ00, GSS25GSHSS, RF28HMEDBSR). "
+                    "Ignore part numbers, which are usually shorter\n"
+                    "- \"brand\": the appliance brand name\n"
+                    "- \"symptom\": the primary symptom the user is experiencing, as a short phrase\n"
+                    "- \"part_number\": the part number (e.g. PS11752778, WPW10321304)\n"
+                    "Use null for any field that is not present. Return only the JSON object."
                 )),
                 HumanMessage(content=query)
             ]
 
             response = self.llm.invoke(messages)
-            intent = response.content.strip().lower()
+            fields = self._parse_entities_response(response.content)
 
-            valid_intents = {'troubleshoot', 'installation', 'compatibility', 'qna', 'general'}
-            if intent in valid_intents:
-                logger.info(f"🎯 Detected intent: {intent}")
-                return intent
+            intent = (fields.get("intent") or "").strip().lower()
+            if intent in VALID_INTENTS:
+                entities.intent = intent
+                intent_classifier.observe(query, intent)
             else:
-                logger.warning(f"⚠️ Unexpected intent response: {intent}. Defaulting to 'general'.")
-                return "general"
+                logger.warning(f"⚠️ Unexpected intent response: {intent}. Keeping '{entities.intent}'.")
+
+            entities.symptom = self._clean_entity(fields.get("symptom")) or ""
+            entities.part_number = entities.part_number or self._clean_entity(fields.get("part_number"))
+            entities.brand = entities.brand or self._clean_entity(fields.get("brand"))
+            # GPT sometimes returns the part number as the model number
+            gpt_model_number = self._clean_entity(fields.get("model_number"))
+            if gpt_model_number and entity_extractor.classify(gpt_model_number)[0] == "part":
+                logger.info(f"ℹ️ Ignoring part number {gpt_model_number} returned as model number.")
+                gpt_model_number = None
+            entities.model_number = entities.model_number or gpt_model_number
         except Exception as e:
-            logger.exception(f"🚨 Error during GPT-based intent detection: {e}")
-            return "general"
+            # The local results are used for this request only, so the query is retried next time
+            logger.exception(f"🚨 Error during GPT-based entity extraction: {e}")
+            logger.info(f"🎯 Extracted entities without GPT: {asdict(entities)}")
+            return entities
 
-    def extract_model_number(self, query: str) -> str:
+        return self._remember_entities(query, entities)
+
+    def _cached_entities(self, query: str) -> Optional[QueryEntities]:
         """
-        Extracts the model number from the query using a combination of regex patterns
-        and GPT-based extraction.
+        Returns the entities extracted earlier for this exact query, or None.
         """
-        
+        with self._entity_cache_lock:
+            cached = self._entity_cache.get(query)
+            if cached is not None:
+                self._entity_cache.move_to_end(query)
+            return cached
+
+    def _remember_entities(self, query: str, entities: QueryEntities) -> QueryEntities:
+        """
+        Logs the extracted entities and keeps them in the per-query cache.
+        """
+        logger.info(f"🎯 Extracted entities: {asdict(entities)}")
+        with self._entity_cache_lock:
+            self._entity_cache[query] = entities
+            if len(self._entity_cache) > self.ENTITY_CACHE_SIZE:
+                self._entity_cache.popitem(last=False)
+        return entities
+
+    @staticmethod
+    def _parse_entities_response(content: str) -> dict:
+        """
+        Parses the JSON object returned by the extraction prompt, tolerating code fences
+        or text around it.
+        """
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if not match:
+            logger.warning(f"⚠️ Entity extraction returned no JSON: {content}")
+            return {}
         try:
-            # First try common patterns for model numbers
-            patterns = [
-                r'\b[A-Z]{2,}\d{2,}[A-Z0-9]+\b',  # Matches WRS588FIHZ00
-                r'\b[A-Z]+\d{4,}[A-Z]*\d*\b',     # Matches patterns like WRS588
-                r'\b\d{1,2}-?[A-Z]{1,2}\d{3,}\b'  # Matches number-letter-number patterns
-            ]
-            
-            for pattern in patterns:
-                matches = re.finditer(pattern, query.upper())
-                for match in matches:
-                    model = match.group(0)
-                    # Skip if it looks like a part number (usually shorter)
-                    if len(model) >= 8:  # Most model numbers are 8+ characters
-                        return model
-
-            # If regex fails, use GPT to extract model number
-            messages = [
-                SystemMessage(content=(
-                    "Extract the appliance model number from the query. Common formats include:\n"
-                    "- WRS588FIHZ00 (Whirlpool)\n"
-                    "- GSS25GSHSS (GE)\n"
-                    "- RF28HMEDBSR (Samsung)\n"
-                    "Return only the model number or 'None' if not found. "
-                    "Ignore part numbers which are usually shorter."
-                )),
-                HumanMessage(content=query)
-            ]
-            
-            response = self.llm.invoke(messages)
-            model_number = response.content.strip()
-            
-            if model_number.lower() != 'none':
-                return model_number
-            
-            logger.warning("❌ No model number found in query")
-            return None
+            fields = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            logger.warning(f"⚠️ Entity extraction returned invalid JSON: {content}")
+            return {}
+        return fields if isinstance(fields, dict) else {}
 
-        except Exception as e:
-            logger.exception(f"❌ Error extracting model number: {e}")
+    @staticmethod
+    def _clean_entity(value) -> Optional[str]:
+        """
+        Normalizes a single extracted field, mapping empty values and 'None' to None.
+        """
+        if value is None:
+            return None
+        value = str(value).strip()
+        if not value or value.lower() in ('none', 'null', 'n/a'):
             return None
+        return value
 
-    def extract_symptom(self, query: str) -> str:
+    def detect_intent(self, query: str) -> str:
         """
-        Extracts the symptom from the user's query using GPT-4.
+        Detects the user's intent: the local classifier when it is on and confident,
+        otherwise extract_entities.
         """
-        try:
-            messages = [
-                SystemMessage(content=(
-                    "You are an AI assistant that extracts the main symptom from a user's query."
-                    " Given a user's message, identify and return the primary symptom they are experiencing."
-                    " Only return the symptom as a short phrase."
-                )),
-                HumanMessage(content=query)
-            ]
+        cached = self._cached_entities(query)
+        if cached is not None:
+            return cached.intent
+        return intent_classifier.classify(query) or self.extract_entities(query).intent
 
-            response = self.llm.invoke(messages)
-            symptom = response.content.strip()
-            return symptom
-        except Exception as e:
-            logger.exception(f"🚨 Error during symptom extraction: {e}")
-            return ""
+    def extract_model_number(self, query: str) -> str:
+        """
+        Extracts the model number from the query. Thin wrapper over extract_entities.
+        """
+        model_number = self.extract_entities(query).model_number
+        if not model_number:
+            logger.warning("❌ No model number found in query")
+        return model_number
+
+    def extract_symptom(self, query: str) -> str:
+        """
+        Extracts the symptom from the user's query. Thin wrapper over extract_entities.
+        """
+        return self.extract_entities(query).symptom
 
     def find_product_url_by_model(self, model_number: str) -> str:
         """
-        Uses Google Custom Search to find the PartSelect URL based on the model number.
+        Finds the PartSelect URL for a model number, or None. The URL resolver (learned table
+        and /Models/<model>/ pattern) is tried first; Google Custom Search is the last resort.
         """
         try:
+            resolved_url = url_resolver.resolve_model(model_number)
+            if resolved_url:
+                return resolved_url
+
             search_query = f"{model_number} site:partselect.com"
             search_results = google_partselect_search(search_query, num_results=1)
+            url_resolver.learn_from_search_results(search_results)
             if not search_results:
                 logger.warning(f"No search results found for model number: {model_number}")
-                return "❌ No search results found for the given model number."
+                return None
 
             _, first_link = search_results[0]
             if first_link and first_link.startswith("https://www.partselect.com/"):
@@ -143,20 +306,26 @@ class AgentManager:
                 return first_link
             else:
                 logger.warning("⚠️ Unable to extract a valid URL from search results.")
-                return "❌ Unable to extract a valid URL from search results."
+                return None
         except Exception as e:
             logger.exception(f"🚨 Error during Google search for model number {model_number}: {e}")
-            return f"❌ Error during Google search: {e}"
+            return None
 
     def find_product_url_by_part(self, part_number: str) -> str:
         """
-        Find product URL using part number through Google search
+        Find product URL using part number. The URL resolver (learned table, PS<digits>.htm
+        pattern, PartSelect's search handler) is tried first; Google search is the last resort.
         """
         
         try:
+            resolved_url = url_resolver.resolve_part(part_number)
+            if resolved_url:
+                return resolved_url
+
             # Direct search for the part number
             search_query = f"{part_number} site:partselect.com"
             search_results = google_partselect_search(search_query, num_results=5)
+            url_resolver.learn_from_search_results(search_results)
             
             if not search_results:
                 logger.warning(f"No results found for part number: {part_number}")
@@ -167,9 +336,10 @@ class AgentManager:
                 logger.debug(f"Found URL: {url}")
             
             # Get the first valid product URL
+            part_key = model_key(part_number)
             for _, url in search_results:
-                # Look for URLs containing the part number or /parts/ path
-                if "partselect.com" in url and (part_number in url or "/parts/" in url):
+                # Look for product URLs of this part number (either spelling) or a /parts/ path
+                if "partselect.com" in url and (part_key in map(model_key, parse_product_url(url)) or "/parts/" in url):
                     logger.info(f"✅ Found matching product URL: {url}")
                     return url
             
@@ -186,27 +356,150 @@ class AgentManager:
             logger.exception(f"❌ Error finding product URL: {e}")
             return None
 
-    def handle_query(self, query: str, session: dict) -> dict:
+    @staticmethod
+    def _emit(on_event, event: str, **payload):
+        """
+        Reports pipeline progress to the caller's on_event callback, if one was given.
+        """
+        if on_event is None:
+            return
+        try:
+            on_event({"event": event, **payload})
+        except Exception as e:
+            logger.warning(f"⚠️ Progress callback failed for event '{event}': {e}")
+
+    def _emit_stage(self, on_event, stage: str, message: str):
+        """
+        Reports that the pipeline entered a new stage.
+        """
+        self._emit(on_event, "stage", stage=stage, message=message)
+
+    def generate_response(self, messages, on_event=None) -> str:
+        """
+        Generates the final answer. When an on_event callback is given, the answer is
+        streamed token by token as 'token' events while it is produced.
+        """
+        if on_event is None:
+            return self.llm.invoke(messages).content
+
+        tokens = []
+        for chunk in self.llm.stream(messages):
+            token = chunk.content
+            if token:
+                tokens.append(token)
+                self._emit(on_event, "token", content=token)
+        return "".join(tokens)
+
+    def answer_from_store(self, query: str, entities: QueryEntities, on_event=None) -> dict:
+        """
+        Retrieval-first path: answers from fresh indexed documents for the query's part/model
+        and intent. Returns None on a miss, so the caller falls back to live search and scraping.
+        """
+        system_prompts = {
+            "troubleshoot": TROUBLESHOOT_PROMPT,
+            "installation": INSTALLATION_PROMPT,
+            "compatibility": COMPATIBILITY_PROMPT,
+        }
+        system_prompt = system_prompts.get(entities.intent)
+        if system_prompt is None:
+            return None
+
+        documents = retrieve_fresh(query, entities.intent, entities.part_number, entities.model_number,
+                                   entities.symptom)
+        if not documents:
+            return None
+
+        indexed_data = [
+            {"type": doc.metadata.get("type"), "content": doc.page_content, "source": doc.metadata.get("page_url")}
+            for doc in documents
+        ]
+        if entities.intent == "compatibility" and entities.model_number:
+            listed = compatibility_store.lookup(entities.part_number, entities.model_number)
+            indexed_data.insert(0, {
+                "type": "compatibility_lookup",
+                "content": self.describe_compatibility_lookup(entities.part_number, entities.model_number, listed),
+            })
+        context, _ = context_builder.build(query, entities.intent, documents=indexed_data,
+                                           part_number=entities.part_number, model_number=entities.model_number)
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=(
+                f"Query: {query}\n"
+                f"Model Number: {entities.model_number}\n"
+                f"Part Number: {entities.part_number}\n\n"
+                f"Indexed PartSelect Data:\n{context}"
+            ))
+        ]
+
+        try:
+            logger.info(f"🤖 Answering from {len(documents)} indexed documents")
+            self._emit_stage(on_event, "generating", "Generating answer from indexed data")
+            response_content = self.generate_response(messages, on_event)
+        except Exception as e:
+            logger.exception(f"❌ Error answering from indexed data, falling back to live search: {e}")
+            return None
+
+        return {
+            "response": response_content,
+            "status": "success"
+        }
+
+    def handle_query(self, query: str, session: dict, on_event=None) -> dict:
         """
         Handles user queries and returns appropriate responses based on intent.
+        If on_event is provided, it is called with a dict for every pipeline stage
+        ({"event": "stage", ...}) and for every answer token ({"event": "token", ...}).
+
+        A question equivalent to an earlier one about the same intent, model and part is
+        answered from the answer cache without searching, scraping or generating again.
+        """
+        entities = self.extract_entities(query)
+        cached_answer = answer_cache.get(query, entities)
+        if cached_answer is not None:
+            self._emit_stage(on_event, "answer_cache", "Answered from an earlier equivalent question")
+            self._emit(on_event, "token", content=cached_answer)
+            return {"response": cached_answer, "status": "success"}
+
+        response = self._handle_query(query, session, on_event)
+        if isinstance(response, dict) and response.get("status") == "success":
+            answer_cache.put(query, entities, response.get("response"))
+        return response
+
+    def _handle_query(self, query: str, session: dict, on_event=None) -> dict:
+        """
+        Runs the full pipeline for a query: retrieval, search, scraping and generation.
         """
         logger.info(f"🧐 Processing query: {query}")
 
         try:
-            intent = self.detect_intent(query)
+            # Extract intent and all entities in a single LLM call
+            entities = self.extract_entities(query)
+            intent = entities.intent
             logger.info(f"🎯 Detected intent: {intent}")
+            self._emit_stage(on_event, "intent_detected", f"Intent detected: {intent}")
 
-            # Extract model number and brand for all intents
-            model_number = self.extract_model_number(query)
+            model_number = entities.model_number
             brand = None
             if not model_number:
-                brand = self.extract_brand(query)
+                brand = entities.brand
             logger.info(f"🔎 Model number detected: {model_number}")
             logger.info(f"🏢 Brand detected: {brand}")
 
+            # Known part/model pairs are answered from the compatibility index without the LLM
+            if intent == "compatibility" and entities.part_number and model_number:
+                indexed_response = self.answer_from_compatibility_index(
+                    query, entities.part_number, model_number, on_event)
+                if indexed_response is not None:
+                    return indexed_response
+
+            # Answer straight from the vector store when it already covers this part/model
+            self._emit_stage(on_event, "retrieving", "Checking indexed PartSelect data")
+            cached_response = self.answer_from_store(query, entities, on_event)
+            if cached_response is not None:
+                return cached_response
+
             if intent == "troubleshoot":
-                # Extract symptom
-                symptom = self.extract_symptom(query)
+                symptom = entities.symptom
                 logger.info(f"🔍 Extracted symptom: {symptom}")
                 
                 if not symptom:
@@ -215,7 +508,9 @@ class AgentManager:
 
                 # Search with model/brand included
                 search_query = f"{symptom} {model_number if model_number else brand if brand else ''}"
+                self._emit_stage(on_event, "searching", "Searching PartSelect for symptom pages")
                 search_results = google_partselect_search(search_query, num_results=5)
+                url_resolver.learn_from_search_results(search_results)
                 symptom_pages = [link for _, link in search_results if "Symptoms" in link]
                 logger.info(f"🔍 Found {len(symptom_pages)} symptom pages")
 
@@ -223,61 +518,45 @@ class AgentManager:
                     logger.warning(f"No symptom pages found for symptom: {symptom}")
                     return {"response": "❌ Could not find relevant symptom information on PartSelect.", "status": "error"}
 
-                # Scrape first symptom page
-                first_symptom_page = symptom_pages[0]
-                logger.info(f"🌐 Scraping symptom page: {first_symptom_page}")
-                scraped_data = scrape_symptom_page(first_symptom_page, headless=False)
-                logger.info(f"📄 Raw scraped data received")
+                # Scrape the top symptom pages in parallel
+                logger.info(f"🌐 Scraping symptom pages: {symptom_pages}")
+                self._emit_stage(on_event, "scraping", "Scraping symptom pages")
+                scraped_pages = scrape_symptom_pages(symptom_pages, headless=False)
+                logger.info(f"📄 Scraped {len(scraped_pages)} symptom pages")
 
-                # Index the scraped data
-                if scraped_data:
-                    index_status = index_scraped_data(json.dumps(scraped_data))
-                    logger.info(f"Indexed new scraped data: {index_status}")
+                # Index each page in the background, so documents keep their own page URL
+                if scraped_pages:
+                    self._emit_stage(on_event, "indexing", "Queued scraped data for indexing")
+                for page in scraped_pages:
+                    url_resolver.learn_from_scrape(page)
+                    queued = ingestion_worker.submit(page)
+                    logger.info(f"Queued scraped data for background indexing: {queued}")
 
-                    # Now perform semantic search
-                    vector_results = semantic_search_with_intent(query, intent, model_number)
-                    logger.info(f"Vector search completed with {len(vector_results) if isinstance(vector_results, list) else 0} results")
+                # Merge the pages and rank their parts by fix percentage
+                scraped_data = merge_symptom_pages(scraped_pages)
 
                 # Format the scraped data for the LLM
-                if scraped_data and 'common_parts' in scraped_data and scraped_data['common_parts']:
-                    common_parts = scraped_data['common_parts'][0]
-                    user_stories = common_parts.get('user_stories', [])[:3]
-                    formatted_stories = []
-                    for story in user_stories:
-                        formatted_stories.append({
-                            "title": story.get('title', ''),
-                            "instruction": story.get('instruction', '')
+                if scraped_data and scraped_data.get('common_parts'):
+                    formatted_parts = []
+                    for part in scraped_data['common_parts'][:3]:
+                        formatted_parts.append({
+                            "part_name": part.get('part_name', ''),
+                            "part_number": part.get('part_number', ''),
+                            "description": part.get('description', ''),
+                            "fix_percentage": part.get('fix_percentage', ''),
+                            "user_stories": [
+                                {"title": story.get('title', ''), "instruction": story.get('instruction', '')}
+                                for story in part.get('user_stories', [])[:2]
+                            ]
                         })
-                    
+
                     formatted_data = {
                         "symptom": symptom,
-                        "description": common_parts.get('description', ''),
-                        "fix_percentage": common_parts.get('fix_percentage', ''),
-                        "part_name": common_parts.get('part_name', ''),
-                        "user_stories": formatted_stories
+                        "parts": formatted_parts
                     }
                     
                     messages = [
-                        SystemMessage(content=(
-                            "You are a helpful appliance repair assistant. Create a concise but detailed response using the provided information. "
-                            "Format your response using these guidelines:\n"
-                            "1. Use '### ' for main sections\n"
-                            "2. Use '#### ' for subsections\n"
-                            "3. Use bullet points for lists\n"
-                            "4. Keep sections compact but informative\n\n"
-                            "Include these sections:\n"
-                            "### Problem Analysis\n"
-                            "- Brief description of the issue\n"
-                            "- Potential causes\n\n"
-                            "### Solution\n"
-                            "#### Required Parts\n"
-                            "- Part information\n"
-                            "- Fix success rate\n\n"
-                            "#### Repair Steps\n"
-                            "1. Numbered steps\n"
-                            "2. Clear instructions\n\n"
-                            "Keep the formatting consistent and clean."
-                        )),
+                        SystemMessage(content=TROUBLESHOOT_PROMPT),
                         HumanMessage(content=(
                             f"Query: {query}\n\n"
                             f"Troubleshooting Data: {json.dumps(formatted_data, indent=2)}"
@@ -286,10 +565,10 @@ class AgentManager:
                     
                     try:
                         logger.info("🤖 Generating response using LLM")
-                        response = self.llm.invoke(messages)
+                        self._emit_stage(on_event, "generating", "Generating answer")
+                        response_content = self.generate_response(messages, on_event)
                         logger.info("✅ LLM response generated successfully")
                         
-                        response_content = response.content
                         if "🤔 Thought Process:" in response_content and "📝 Response:" in response_content:
                             final_response = response_content.split("📝 Response:")[1].strip()
                             return {
@@ -312,8 +591,7 @@ class AgentManager:
                     return {"response": "❌ Could not find relevant troubleshooting information.", "status": "error"}
 
             elif intent == "installation":
-                # Extract part number
-                part_number = self.extract_part_number(query)
+                part_number = entities.part_number
                 logger.info(f"🔎 Part number detected: {part_number}")
                 
                 if not part_number:
@@ -323,6 +601,7 @@ class AgentManager:
                     }
 
                 # Find product URL
+                self._emit_stage(on_event, "searching", f"Looking up part {part_number}")
                 product_url = self.find_product_url_by_part(part_number)
                 logger.info(f"🌐 Product URL found: {product_url}")
                 
@@ -334,17 +613,17 @@ class AgentManager:
 
                 # Scrape installation data
                 logger.info(f"🌐 Scraping product page: {product_url}")
-                scraped_data = scrape_partselect(product_url, headless=False)
+                self._emit_stage(on_event, "scraping", "Scraping product page")
+                scraped_data = scrape_partselect(product_url, headless=False,
+                                                 sections=INTENT_SECTIONS["installation"])
                 logger.info(f"📄 Scraped data received: {bool(scraped_data)}")
 
-                # Index the scraped data
+                # Index the scraped data in the background
                 if scraped_data:
-                    index_status = index_scraped_data(json.dumps(scraped_data))
-                    logger.info(f"Indexed new scraped data: {index_status}")
-
-                    # Now perform semantic search
-                    vector_results = semantic_search_with_intent(query, intent, model_number)
-                    logger.info(f"Vector search completed with {len(vector_results) if isinstance(vector_results, list) else 0} results")
+                    url_resolver.learn_from_scrape(scraped_data)
+                    self._emit_stage(on_event, "indexing", "Queued scraped data for indexing")
+                    queued = ingestion_worker.submit(scraped_data)
+                    logger.info(f"Queued scraped data for background indexing: {queued}")
 
                 if not scraped_data:
                     return {
@@ -352,47 +631,27 @@ class AgentManager:
                         "status": "error"
                     }
 
+                context, _ = context_builder.build(query, intent, data=scraped_data, part_number=part_number)
                 messages = [
-                    SystemMessage(content=(
-                        "You are a helpful appliance repair assistant. Create a concise but detailed response using the provided information. "
-                        "Format your response using these guidelines:\n"
-                        "1. Use '### ' for main sections (Part Info)\n"
-                        "2. Use '#### ' for subsections (Tools Needed)\n"
-                        "3. Use bullet points for lists\n"
-                        "4. Keep sections compact but informative\n\n"
-                        "Include these sections:\n"
-                        "### Part Information\n"
-                        "- Part details and compatibility\n"
-                        "- Price and availability\n\n"
-                        "### Installation Guide\n"
-                        "#### Tools Needed\n"
-                        "- List required tools\n"
-                        "- Estimated time\n\n"
-                        "#### Safety First\n"
-                        "- Key safety precautions\n\n"
-                        "#### Steps\n"
-                        "1. Numbered steps\n"
-                        "2. Clear instructions\n\n"
-                        "Keep the formatting consistent and clean."
-                    )),
+                    SystemMessage(content=INSTALLATION_PROMPT),
                     HumanMessage(content=(
                         f"Query: {query}\n\n"
-                        f"Installation Data: {json.dumps(scraped_data, indent=2)}"
+                        f"Installation Data:\n{context}"
                     ))
                 ]
                 
                 logger.info("🤖 Generating installation instructions")
-                response = self.llm.invoke(messages)
+                self._emit_stage(on_event, "generating", "Generating installation instructions")
+                response_content = self.generate_response(messages, on_event)
                 logger.info("✅ Generated installation instructions")
                 
                 return {
-                    "response": response.content,
+                    "response": response_content,
                     "status": "success"
                 }
 
             elif intent == "compatibility":
-                # Extract part number (model number already extracted)
-                part_number = self.extract_part_number(query)
+                part_number = entities.part_number
                 logger.info(f"🔎 Part number detected: {part_number}")
                 
                 if not model_number and not brand:
@@ -407,57 +666,57 @@ class AgentManager:
                         "status": "error"
                     }
 
-                # Find product URL for the model
-                product_url = self.find_product_url_by_model(model_number)
+                # The part's product page carries its model cross-reference; the model page
+                # is only used when the part can't be found
+                self._emit_stage(on_event, "searching", f"Looking up part {part_number}")
+                product_url = self.find_product_url_by_part(part_number)
+                if not product_url and model_number:
+                    self._emit_stage(on_event, "searching", f"Looking up model {model_number}")
+                    product_url = self.find_product_url_by_model(model_number)
                 if not product_url:
                     return {
-                        "response": f"❌ Could not find information for model number {model_number}.",
+                        "response": f"❌ Could not find information for part number {part_number}"
+                                    + (f" or model number {model_number}." if model_number else "."),
                         "status": "error"
                     }
 
                 # Scrape compatibility data
-                scraped_data = scrape_partselect(product_url, headless=False)
+                self._emit_stage(on_event, "scraping", "Scraping compatibility data")
+                scraped_data = scrape_partselect(product_url, headless=False,
+                                                 sections=INTENT_SECTIONS["compatibility"])
 
-                # Index the scraped data
+                # Index the scraped data in the background
                 if scraped_data:
-                    index_status = index_scraped_data(json.dumps(scraped_data))
-                    logger.info(f"Indexed new scraped data: {index_status}")
-
-                    # Now perform semantic search
-                    vector_results = semantic_search_with_intent(query, intent, model_number)
-                    logger.info(f"Vector search completed with {len(vector_results) if isinstance(vector_results, list) else 0} results")
-
+                    url_resolver.learn_from_scrape(scraped_data)
+                    self._emit_stage(on_event, "indexing", "Queued scraped data for indexing")
+                    queued = ingestion_worker.submit(scraped_data)
+                    logger.info(f"Queued scraped data for background indexing: {queued}")
+
+                # Add the cross-reference to the index right away and answer from it if it
+                # now knows the pair
+                if self.index_compatibility(scraped_data, part_number) and model_number:
+                    indexed_response = self.answer_from_compatibility_index(
+                        query, part_number, model_number, on_event)
+                    if indexed_response is not None:
+                        return indexed_response
+
+                context, _ = context_builder.build(
+                    query, intent, data=self.compact_compatibility_data(scraped_data, part_number, model_number),
+                    part_number=part_number, model_number=model_number)
                 messages = [
-                    SystemMessage(content=(
-                        "You are a helpful appliance repair assistant. Create a concise response about part compatibility. "
-                        "Format your response using these guidelines:\n\n"
-                        "#### Compatibility Summary\n"
-                        "- Start with a clear yes/no statement\n"
-                        "- Keep it brief and direct\n\n"
-                        "#### Part Details\n"
-                        "- Part name and number\n"
-                        "- Basic specifications\n\n"
-                        "#### Notes\n"
-                        "- Important compatibility details\n"
-                        "- Installation considerations\n\n"
-                        "Use:\n"
-                        "- '#### ' for section headers (smaller headers)\n"
-                        "- Bullet points for lists\n"
-                        "- Brief, clear sentences\n"
-                        "- No large headers\n"
-                        "Keep the entire response concise and well-organized."
-                    )),
+                    SystemMessage(content=COMPATIBILITY_PROMPT),
                     HumanMessage(content=(
                         f"Query: {query}\n"
                         f"Model Number: {model_number}\n"
                         f"Part Number: {part_number}\n"
-                        f"Compatibility Data: {json.dumps(scraped_data, indent=2)}"
+                        f"Compatibility Data:\n{context}"
                     ))
                 ]
                 
-                response = self.llm.invoke(messages)
+                self._emit_stage(on_event, "generating", "Generating compatibility answer")
+                response_content = self.generate_response(messages, on_event)
                 return {
-                    "response": response.content,
+                    "response": response_content,
                     "status": "success"
                 }
 
@@ -471,21 +730,104 @@ class AgentManager:
                 "status": "error"
             }
 
-    def extract_part_number(self, query: str) -> str:
+    def answer_from_compatibility_index(self, query: str, part_number: str, model_number: str,
+                                        on_event=None) -> dict:
         """
-        Extracts part number from the query using GPT.
+        Answers a compatibility question from the local part/model index. Returns None when the
+        pair is unknown, so the caller falls back to scraping and the LLM.
         """
-        messages = [
-            SystemMessage(content="Extract the part number from the query. Return only the part number or 'None' if not found."),
-            HumanMessage(content=query)
-        ]
-        try:
-            response = self.llm.invoke(messages)
-            part_number = response.content.strip()
-            return None if part_number.lower() == 'none' else part_number
-        except Exception as e:
-            logger.exception(f"❌ Error extracting part number: {e}")
+        compatible = compatibility_store.is_compatible(part_number, model_number)
+        if compatible is None:
             return None
+        logger.info(f"⚡ Compatibility of {part_number} with {model_number} found in index: {compatible}")
+
+        listed = compatibility_store.lookup(part_number, model_number) if compatible else False
+        if compatible:
+            summary = f"- ✅ Yes, part {part_number} fits model {model_number}."
+            if listed:
+                summary += f" It is listed for the {listed['brand']} {listed['model_number']} ({listed['description']})."
+        else:
+            summary = f"- ❌ No, model {model_number} is not in the compatible model list of part {part_number}."
+        response_content = f"#### Compatibility Summary\n{summary}"
+
+        if COMPATIBILITY_LLM_PROSE:
+            table = compatibility_store.get(part_number)
+            compatibility_data = {
+                "compatibility_lookup": summary[2:],
+                "model_compatibility_summary": table.summary() if table is not None else {},
+            }
+            context, _ = context_builder.build(query, "compatibility", data=compatibility_data,
+                                               part_number=part_number, model_number=model_number)
+            messages = [
+                SystemMessage(content=COMPATIBILITY_PROMPT),
+                HumanMessage(content=(
+                    f"Query: {query}\n"
+                    f"Model Number: {model_number}\n"
+                    f"Part Number: {part_number}\n"
+                    f"Compatibility Data:\n{context}"
+                ))
+            ]
+            try:
+                self._emit_stage(on_event, "generating", "Generating compatibility answer")
+                return {"response": self.generate_response(messages, on_event), "status": "success"}
+            except Exception as e:
+                logger.exception(f"❌ Error generating compatibility prose, using indexed answer: {e}")
+
+        self._emit(on_event, "token", content=response_content)
+        return {
+            "response": response_content,
+            "status": "success"
+        }
+
+    @staticmethod
+    def index_compatibility(scraped_data: dict, part_number: str) -> bool:
+        """
+        Stores the model cross-reference of a scraped product page in the compatibility index,
+        with the asked part number as an alias of the page's PartSelect number.
+        """
+        if not isinstance(scraped_data, dict) or not scraped_data.get("model_compatibility"):
+            return False
+        page_part_number, manufacturer_part_number = page_part_numbers(scraped_data)
+        if not page_part_number:
+            return False
+        table = compatibility_store.put(page_part_number, scraped_data["model_compatibility"],
+                                        aliases=[manufacturer_part_number, part_number],
+                                        complete=bool(scraped_data.get("model_compatibility_complete")))
+        return bool(len(table))
+
+    @staticmethod
+    def describe_compatibility_lookup(part_number: str, model_number: str, listed) -> str:
+        """
+        States the result of a compatibility_store lookup (row, False or None) in one sentence.
+        """
+        if listed:
+            return (f"Part {part_number} is listed as compatible with {listed['brand']} model "
+                    f"{listed['model_number']} ({listed['description']}).")
+        if listed is False:
+            return f"Model {model_number} is not in the cross-reference list of part {part_number}."
+        return f"The complete cross-reference list of part {part_number} is not known."
+
+    def compact_compatibility_data(self, scraped_data: dict, part_number: str, model_number: str) -> dict:
+        """
+        Replaces the full model cross-reference of scraped data with the result of a key lookup
+        for the asked model plus a summary, so the prompt doesn't grow with the number of models.
+        """
+        if not isinstance(scraped_data, dict):
+            return scraped_data
+        rows = scraped_data.get("model_compatibility") or []
+        table = PartCompatibility.from_rows(part_number, rows)
+        compact = {key: value for key, value in scraped_data.items() if key != "model_compatibility"}
+        if len(table):
+            listed = table.lookup(model_number) or compatibility_store.lookup(part_number, model_number)
+            compact["compatibility_lookup"] = self.describe_compatibility_lookup(part_number, model_number, listed)
+            compact["model_compatibility_summary"] = table.summary()
+        return compact
+
+    def extract_part_number(self, query: str) -> str:
+        """
+        Extracts part number from the query, locally when possible, else via extract_entities.
+        """
+        return entity_extractor.extract(query).part_number or self.extract_entities(query).part_number
 
     def scrape_and_process(self, product_url: str) -> dict:
         """
@@ -495,7 +837,7 @@ class AgentManager:
             scraped_data = scrape_partselect(product_url, headless=False)
             json_data = json.dumps(scraped_data, indent=2)
             indexing_result = index_scraped_data(json_data)
-            if "✅" in indexing_result:
+            if "❌" not in indexing_result:
                 logger.info("✅ Scraped data indexed successfully.")
                 return scraped_data
             else:
@@ -507,19 +849,9 @@ class AgentManager:
 
     def extract_brand(self, query: str) -> str:
         """
-        Extracts brand name from the query using GPT.
+        Extracts brand name from the query, locally when possible, else via extract_entities.
         """
-        messages = [
-            SystemMessage(content="Extract the appliance brand name from the query. Return only the brand name or 'None' if not found."),
-            HumanMessage(content=query)
-        ]
-        try:
-            response = self.llm.invoke(messages)
-            brand = response.content.strip()
-            return None if brand.lower() == 'none' else brand
-        except Exception as e:
-            logger.exception(f"❌ Error extracting brand: {e}")
-            return None
+        return entity_extractor.extract(query).brand or self.extract_entities(query).brand
 
 
 # Instantiate Agent Manager
@@ -3,21 +3,9 @@
 import json
 import logging
 from langchain.schema import HumanMessage, SystemMessage
-from agent_manager import AgentManager
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - Agent - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("agents.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("Agent")
+from agent_manager import agent_manager
 
-# Initialize the Agent Manager
-agent_manager = AgentManager()
+logger = logging.getLogger("Agent")
 
 # ============================
 # 1. Define Tools
@@ -125,8 +113,9 @@ def plan_and_execute_agent(query: str, session: dict) -> dict:
         if "clarifying_question" in processed_data:
             return {"clarifying_question": processed_data["clarifying_question"]}
 
-        # Detect intent using GPT
-        intent = agent_manager.detect_intent(query)
+        # The intent handle_query routed on; its entity extraction is cached, so this
+        # doesn't classify the query a second time
+        intent = agent_manager.extract_entities(query).intent
 
         # Format the response based on processed data and intent
         formatted_response = format_response(processed_data, intent, query, session)
@@ -142,6 +131,7 @@ def plan_and_execute_agent(query: str, session: dict) -> dict:
 # ============================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     # Example query with a mock session
     test_query = "My Whirlpool fridge model WRS588FIHZ00 is not making ice. What's wrong?"
     mock_session = {
@@ -0,0 +1,255 @@
+# answer_cache.py
+
+import os
+import re
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from compatibility_store import model_key
+
+logger = logging.getLogger("AnswerCache")
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+# Symptoms are compared on their own: short symptom questions about one model embed almost
+# alike as a whole ("ice maker not working" / "water dispenser not working")
+ANSWER_CACHE_SYMPTOM_SIMILARITY = float(os.getenv("ANSWER_CACHE_SYMPTOM_SIMILARITY", "0.94"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(6 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_INTENTS = {
+    intent.strip() for intent in os.getenv(
+        "ANSWER_CACHE_INTENTS", "troubleshoot,installation,compatibility").split(",") if intent.strip()
+}
+
+# Recent query embeddings kept so a miss followed by put() doesn't embed the query twice
+QUERY_EMBEDDING_CACHE_SIZE = 64
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lower case, punctuation dropped, whitespace collapsed.
+    """
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (query or "").lower()).split())
+
+
+def cosine_similarity(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """
+    Answers to earlier questions, reused for differently worded questions about the same thing.
+
+    Entries are grouped by the query's entities (intent, model number, part number and the
+    brand when there is no model), so an answer is only reused for the same appliance and part.
+    Within a group, a question matches an earlier one if their normalized text is equal or
+    their embeddings are at least `threshold` similar. Troubleshooting answers also need the
+    same symptom: equal text, or symptom embeddings at least `symptom_threshold` similar.
+    Entries expire after the TTL and the least recently used are evicted beyond max_entries.
+    """
+
+    def __init__(self, embeddings=None, threshold: float = ANSWER_CACHE_SIMILARITY, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, intents: set = None,
+                 enabled: bool = ANSWER_CACHE_ENABLED,
+                 symptom_threshold: float = ANSWER_CACHE_SYMPTOM_SIMILARITY):
+        self.enabled = enabled
+        self._embeddings = embeddings
+        self.threshold = threshold
+        self.symptom_threshold = symptom_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.intents = ANSWER_CACHE_INTENTS if intents is None else intents
+        self._entries = OrderedDict()  # entry id -> entry dict, least recently used first
+        self._groups = {}  # entity key -> set of entry ids
+        self._query_embeddings = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evicted": 0,
+                       "expired": 0, "invalidated": 0, "embedding_errors": 0}
+
+    @property
+    def embeddings(self):
+        # The vector store's embedding model, loaded on first use
+        if self._embeddings is None:
+            from vector_manager import live_store
+            self._embeddings = live_store.embedding_model
+        return self._embeddings
+
+    @staticmethod
+    def entity_key(entities) -> tuple:
+        model_number = model_key(entities.model_number)
+        brand = "" if model_number else (entities.brand or "").strip().lower()
+        return entities.intent, model_number, model_key(entities.part_number), brand
+
+    @staticmethod
+    def symptom_of(entities) -> str:
+        return normalize_query(entities.symptom) if entities.intent == "troubleshoot" else ""
+
+    def get(self, query: str, entities) -> str:
+        """
+        Returns a cached answer for an equivalent question about the same entities, or None.
+        """
+        if not self.enabled or entities.intent not in self.intents:
+            return None
+        key, normalized = self.entity_key(entities), normalize_query(query)
+        symptom = self.symptom_of(entities)
+        with self._lock:
+            candidates = self._live_entries(key)
+            for entry_id, entry in candidates:
+                if entry["normalized"] == normalized and entry["symptom"] == symptom:
+                    return self._hit(entry_id, entry, "exact_hits", 1.0)
+            if not candidates:
+                self._stats["misses"] += 1
+                return None
+            # (entry, field, text) of every embedding the candidates still lack
+            missing = [(entry, "embedding", entry["normalized"]) for _, entry in candidates
+                       if entry["embedding"] is None]
+            compare_symptoms = bool(symptom) and any(
+                entry["symptom"] and entry["symptom"] != symptom for _, entry in candidates)
+            if compare_symptoms:
+                missing += [(entry, "symptom_embedding", entry["symptom"]) for _, entry in candidates
+                            if entry["symptom"] and entry["symptom_embedding"] is None]
+
+        # Embedding calls happen outside the lock
+        try:
+            query_embedding = self._embed_query(normalized)
+            symptom_embedding = self._embed_query(symptom) if compare_symptoms else None
+            if missing:
+                vectors = self.embeddings.embed_documents([text for _, _, text in missing])
+                for (entry, field, _), vector in zip(missing, vectors):
+                    entry[field] = vector
+        except Exception as e:
+            logger.warning(f"⚠️ Could not embed query for the answer cache: {e}")
+            with self._lock:
+                self._stats["embedding_errors"] += 1
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            best_id, best_entry, best_score = None, None, self.threshold
+            for entry_id, entry in candidates:
+                if entry_id not in self._entries or entry["embedding"] is None:
+                    continue
+                if not self._same_symptom(symptom, symptom_embedding, entry):
+                    continue
+                score = cosine_similarity(query_embedding, entry["embedding"])
+                if score >= best_score:
+                    best_id, best_entry, best_score = entry_id, entry, score
+            if best_entry is None:
+                self._stats["misses"] += 1
+                return None
+            return self._hit(best_id, best_entry, "semantic_hits", best_score)
+
+    def put(self, query: str, entities, response: str):
+        """
+        Stores the answer to a question.
+        """
+        if not self.enabled or entities.intent not in self.intents or not response:
+            return
+        key, normalized = self.entity_key(entities), normalize_query(query)
+        symptom = self.symptom_of(entities)
+        with self._lock:
+            for entry_id, entry in self._live_entries(key):
+                if entry["normalized"] == normalized:
+                    self._remove(entry_id)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "key": key,
+                "normalized": normalized,
+                "embedding": self._query_embeddings.get(normalized),
+                "symptom": symptom,
+                "symptom_embedding": self._query_embeddings.get(symptom) if symptom else None,
+                "response": response,
+                "stored_at": time.time(),
+            }
+            self._groups.setdefault(key, set()).add(entry_id)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evicted"] += 1
+
+    def invalidate(self, intent: str = None, part_number: str = None, model_number: str = None) -> int:
+        """
+        Drops the cached answers matching every given filter (all answers if none is given),
+        e.g. all compatibility answers, or every answer about one part. Returns the count.
+        """
+        part, model = model_key(part_number), model_key(model_number)
+        with self._lock:
+            doomed = [
+                entry_id for entry_id, entry in self._entries.items()
+                if (intent is None or entry["key"][0] == intent)
+                and (not model or entry["key"][1] == model)
+                and (not part or entry["key"][2] == part)
+            ]
+            for entry_id in doomed:
+                self._remove(entry_id)
+            self._stats["invalidated"] += len(doomed)
+        if doomed:
+            logger.info(f"🧹 Invalidated {len(doomed)} cached answers "
+                        f"(intent={intent}, part={part_number}, model={model_number}).")
+        return len(doomed)
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        return {"enabled": True, **stats, "entries": entries,
+                "hit_rate": round(hits / lookups, 3) if lookups else None}
+
+    def _embed_query(self, normalized: str) -> list:
+        with self._lock:
+            vector = self._query_embeddings.get(normalized)
+        if vector is None:
+            vector = self.embeddings.embed_query(normalized)
+            with self._lock:
+                self._query_embeddings[normalized] = vector
+                while len(self._query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_embeddings.popitem(last=False)
+        return vector
+
+    def _same_symptom(self, symptom: str, symptom_embedding: list, entry: dict) -> bool:
+        if entry["symptom"] == symptom:
+            return True
+        if symptom_embedding is None or entry["symptom_embedding"] is None:
+            return False
+        return cosine_similarity(symptom_embedding, entry["symptom_embedding"]) >= self.symptom_threshold
+
+    def _live_entries(self, key: tuple) -> list:
+        """
+        Returns the group's unexpired (id, entry) pairs, dropping expired ones. Caller holds the lock.
+        """
+        now, live = time.time(), []
+        for entry_id in list(self._groups.get(key, ())):
+            entry = self._entries[entry_id]
+            if now - entry["stored_at"] > self.ttl:
+                self._remove(entry_id)
+                self._stats["expired"] += 1
+            else:
+                live.append((entry_id, entry))
+        return live
+
+    def _hit(self, entry_id: int, entry: dict, counter: str, score: float) -> str:
+        self._entries.move_to_end(entry_id)
+        self._stats[counter] += 1
+        logger.info(f"⚡ Answer cache hit ({counter[:-5]}, similarity {score:.3f}).")
+        return entry["response"]
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        group = self._groups.get(entry["key"])
+        if group is not None:
+            group.discard(entry_id)
+            if not group:
+                del self._groups[entry["key"]]
+
+
+answer_cache = AnswerCache()
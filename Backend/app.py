@@ -3,11 +3,36 @@
 import os
 import uuid
 import json
-from flask import Flask, request, jsonify
+import queue
+import threading
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from agents import plan_and_execute_agent  
 import logging
+
+# Configure logging once for the whole backend, before the modules below start logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler("backend.log"),
+        logging.StreamHandler()
+    ]
+)
+
+from agents import plan_and_execute_agent  
 from agent_manager import agent_manager
+from browser_pool import get_pool
+from ingestion_worker import ingestion_worker
+from waits import wait_recorder
+from resource_blocker import resource_blocker
+from html_archive import html_archive
+from qna_fetcher import qna_fetcher
+from compatibility_store import compatibility_store
+from intent_classifier import intent_classifier
+from entity_extractor import entity_extractor
+from llm_cache import cache_stats as llm_cache_stats
+from answer_cache import answer_cache
+from context_builder import context_builder
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -15,6 +40,11 @@ CORS(app, resources={
         "origins": ["chrome-extension://*", "http://localhost:3000"],  # Add chrome-extension
         "methods": ["POST"],
         "allow_headers": ["Content-Type"]
+    },
+    r"/chat/stream": {
+        "origins": ["chrome-extension://*", "http://localhost:3000"],
+        "methods": ["POST"],
+        "allow_headers": ["Content-Type"]
     }
 })
 
@@ -61,13 +91,122 @@ def chat():
         logger.error(f"Sending error response: {error_msg}")
         return jsonify({"response": f"Error: {error_msg}"}), 500
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+def format_sse(event: dict) -> str:
+    """
+    Serializes an event dict as a server-sent-events message.
+    """
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming variant of /chat using server-sent events.
+    Expects JSON: {"message": "<user's question>"}
+    Emits 'stage' events while the pipeline runs (intent detected, searching, scraping,
+    indexing, generating), 'token' events while the answer is generated, and a final
+    'done' event carrying the same payload /chat would have returned.
+    """
+    data = request.get_json(silent=True) or {}
+    user_query = data.get('message', '').strip()
+    if not user_query:
+        logger.warning("No query provided in stream request")
+        return jsonify({"response": "No query provided"}), 400
+
+    logger.info(f"📥 Received streaming chat request: {user_query}")
+    events = queue.Queue()
+
+    def run_pipeline():
+        try:
+            response_data = agent_manager.handle_query(user_query, {}, on_event=events.put)
+            if not isinstance(response_data, dict):
+                response_data = {"response": str(response_data)}
+            events.put({"event": "done", **response_data})
+        except Exception as e:
+            logger.exception("Error in streaming chat pipeline")
+            events.put({"event": "done", "response": f"Error: {e}", "status": "error"})
+
+    threading.Thread(target=run_pipeline, daemon=True).start()
+
+    def generate():
+        while True:
+            event = events.get()
+            yield format_sse(event)
+            if event["event"] == "done":
+                logger.info("📤 Finished streaming response")
+                break
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 logger = logging.getLogger(__name__)
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    """
+    Returns runtime counters for monitoring (browser pool usage, etc.).
+    """
+    return jsonify({
+        "browser_pool": get_pool(headless=False).stats(),
+        "ingestion": ingestion_worker.stats(),
+        "waits": wait_recorder.stats(),
+        "resource_blocking": resource_blocker.stats(),
+        "html_archive": html_archive.stats(),
+        "qna_harvest": qna_fetcher.stats(),
+        "compatibility_index": compatibility_store.stats(),
+        "intent_classifier": intent_classifier.stats(),
+        "entity_extraction": entity_extractor.stats(),
+        "llm_cache": llm_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "context": context_builder.stats()
+    })
+
+
+@app.route('/answer-cache/invalidate', methods=['POST'])
+def invalidate_answer_cache():
+    """
+    Drops cached answers. Expects optional JSON filters:
+    {"intent": "compatibility", "part_number": "PS11752778", "model_number": "WRS588FIHZ00"}
+    """
+    data = request.get_json(silent=True) or {}
+    removed = answer_cache.invalidate(
+        intent=data.get("intent"), part_number=data.get("part_number"), model_number=data.get("model_number"))
+    return jsonify({"invalidated": removed})
+
+
+_warm_up_lock = threading.Lock()
+_warm_up_started = False
+
+
+def warm_up_browsers():
+    """
+    Pre-launches the Chrome drivers used by the scrapers in the background,
+    so the first queries after a start don't pay for browser startup. Runs once per process.
+    """
+    global _warm_up_started
+    if os.getenv("BROWSER_POOL_WARMUP", "true").lower() != "true":
+        return
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    # AgentManager scrapes with headless=False
+    threading.Thread(target=get_pool(headless=False).warm_up, daemon=True).start()
+
+
+@app.before_request
+def warm_up_on_first_request():
+    # Servers not started through __main__ below (flask run, WSGI) warm up on their first request
+    warm_up_browsers()
+
+
 if __name__ == '__main__':
+    # debug=True starts the reloader: this file runs in a watcher process and again in the child
+    # that serves requests (WERKZEUG_RUN_MAIN=true); only the child launches browsers
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_up_browsers()
     # Flask dev server
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,254 @@
+# browser_pool.py
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+import undetected_chromedriver as uc
+from resource_blocker import resource_blocker
+
+logger = logging.getLogger("BrowserPool")
+
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_DRIVER = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+MAX_DRIVER_MEMORY_MB = float(os.getenv("BROWSER_MAX_MEMORY_MB", "512"))
+CHECKOUT_TIMEOUT = float(os.getenv("BROWSER_CHECKOUT_TIMEOUT", "60"))
+
+
+def build_chrome_options(headless: bool = False):
+    """
+    Builds the ChromeOptions shared by every scraper Chrome session.
+    """
+    options = uc.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-blink-features=AutomationControlled")  # Prevent detection
+    options.add_argument("--disable-infobars")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--start-maximized")  # Start maximized to ensure all elements are visible
+    if headless:
+        options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+    return resource_blocker.configure_options(options)
+
+
+def launch_chrome(headless: bool = False):
+    """
+    Starts a scraper ChromeDriver with non-essential resources blocked (see resource_blocker).
+    """
+    driver = uc.Chrome(options=build_chrome_options(headless))
+    resource_blocker.install(driver)
+    return driver
+
+
+class PooledDriver:
+    """
+    A pre-launched ChromeDriver plus the bookkeeping needed to decide when to recycle it.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.created_at = time.time()
+
+
+class BrowserPool:
+    """
+    Bounded pool of warm ChromeDriver instances shared by PartSelectScraper and SymptomScraper.
+
+    At most `size` drivers exist at once. Drivers are health-checked on checkout and return,
+    recycled after `max_pages` pages or once their JS heap exceeds `max_memory_mb`, and
+    replaced transparently when they crash.
+    """
+
+    def __init__(self, headless: bool = False, size: int = POOL_SIZE,
+                 max_pages: int = MAX_PAGES_PER_DRIVER, max_memory_mb: float = MAX_DRIVER_MEMORY_MB):
+        self.headless = headless
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._idle = queue.LifoQueue()  # Most recently used driver first, it is the warmest
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "launched": 0,
+            "recycled": 0,
+            "crashed": 0,
+            "checkouts": 0,
+        }
+
+    def _launch(self) -> PooledDriver:
+        """
+        Starts a new ChromeDriver.
+        """
+        driver = launch_chrome(self.headless)
+        with self._lock:
+            self._stats["launched"] += 1
+        logger.info("✅ Launched pooled ChromeDriver.")
+        return PooledDriver(driver)
+
+    def _quit(self, pooled: PooledDriver):
+        """
+        Quits a driver, ignoring errors from already-dead sessions.
+        """
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to quit pooled ChromeDriver: {e}")
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        """
+        Checks that the browser still responds to commands.
+        """
+        try:
+            return pooled.driver.execute_script("return 1;") == 1 and bool(pooled.driver.window_handles)
+        except Exception:
+            return False
+
+    def _memory_mb(self, pooled: PooledDriver) -> float:
+        """
+        Returns the JS heap size of the current page in MB, or 0 when unavailable.
+        """
+        try:
+            used = pooled.driver.execute_script(
+                "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0;")
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def _needs_recycling(self, pooled: PooledDriver) -> bool:
+        """
+        Decides whether a driver has served enough pages or grown too large to keep.
+        """
+        if pooled.pages_served >= self.max_pages:
+            logger.info(f"♻️ Recycling driver after {pooled.pages_served} pages.")
+            return True
+        memory_mb = self._memory_mb(pooled)
+        if memory_mb > self.max_memory_mb:
+            logger.info(f"♻️ Recycling driver using {memory_mb:.0f} MB of JS heap.")
+            return True
+        return False
+
+    def warm_up(self, count: int = None):
+        """
+        Pre-launches drivers so the first requests don't pay Chrome startup cost.
+        """
+        count = self.size if count is None else min(count, self.size)
+        missing = count - self._idle.qsize()
+        for _ in range(max(missing, 0)):
+            try:
+                self._idle.put(self._launch())
+            except Exception as e:
+                logger.exception(f"❌ Failed to warm up ChromeDriver: {e}")
+                break
+        logger.info(f"🔥 Browser pool warmed up with {self._idle.qsize()} driver(s).")
+
+    def _acquire(self) -> PooledDriver:
+        """
+        Takes a healthy idle driver or launches a new one.
+        """
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                return self._launch()
+            if self._is_healthy(pooled):
+                return pooled
+            logger.warning("⚠️ Discarding crashed idle driver.")
+            with self._lock:
+                self._stats["crashed"] += 1
+            self._quit(pooled)
+
+    def _release(self, pooled: PooledDriver):
+        """
+        Returns a driver to the pool, or replaces it if it crashed or needs recycling.
+        """
+        if self._closed:
+            self._quit(pooled)
+            return
+        if not self._is_healthy(pooled):
+            logger.warning("⚠️ Driver crashed during use, discarding it.")
+            with self._lock:
+                self._stats["crashed"] += 1
+            self._quit(pooled)
+            return
+        if self._needs_recycling(pooled):
+            with self._lock:
+                self._stats["recycled"] += 1
+            self._quit(pooled)
+            return
+        try:
+            # Drop the page so an idle driver doesn't hold on to its memory
+            pooled.driver.get("about:blank")
+        except Exception:
+            self._quit(pooled)
+            return
+        self._idle.put(pooled)
+
+    @contextmanager
+    def checkout(self, timeout: float = CHECKOUT_TIMEOUT):
+        """
+        Context manager yielding a ready ChromeDriver. Blocks while all drivers are in use.
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool has been shut down.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser available within {timeout}s.")
+        try:
+            pooled = self._acquire()
+            with self._lock:
+                self._stats["checkouts"] += 1
+            try:
+                yield pooled.driver
+            finally:
+                pooled.pages_served += 1
+                self._release(pooled)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """
+        Quits all idle drivers. Drivers still checked out are quit when returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        logger.info("✅ Browser pool shut down.")
+
+    def stats(self) -> dict:
+        """
+        Returns pool counters for monitoring.
+        """
+        with self._lock:
+            return {**self._stats, "idle": self._idle.qsize(), "size": self.size}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(headless: bool = False) -> BrowserPool:
+    """
+    Returns the shared pool for the given headless mode, creating it on first use.
+    """
+    with _pools_lock:
+        if headless not in _pools:
+            _pools[headless] = BrowserPool(headless=headless)
+        return _pools[headless]
+
+
+@atexit.register
+def shutdown_all():
+    """
+    Quits every pooled driver on interpreter exit.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
@@ -0,0 +1,306 @@
+# compatibility_store.py
+
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger("CompatibilityStore")
+
+COMPATIBILITY_DB_PATH = os.getenv("COMPATIBILITY_DB_PATH", "compatibility.sqlite3")
+COMPATIBILITY_CACHE_SIZE = int(os.getenv("COMPATIBILITY_CACHE_SIZE", "128"))
+# The product page renders the cross-reference in pages of this many rows (infinite scroll);
+# a shorter list is the whole list, a full one may have been cut off
+
+
+def model_key(identifier: str) -> str:
+    """
+    Lookup key for part and model numbers: upper case, letters and digits only,
+    so "wrs588fihz-00" and "WRS588FIHZ00" match.
+    """
+    return re.sub(r'[^A-Z0-9]', '', (identifier or "").upper())
+
+
+class PartCompatibility:
+    """
+    The model cross-reference of one part, stored column-wise.
+
+    Brands and descriptions repeat heavily (thousands of "Whirlpool" / "Refrigerator" rows),
+    so both are dictionary-encoded: each row holds a small integer into a list of distinct
+    values. Model numbers are kept as a plain column plus a key -> row index for O(1) lookups.
+    """
+
+    def __init__(self, part_number: str, brands: list, brand_ids: list, models: list,
+                 descriptions: list, description_ids: list):
+        self.part_number = part_number
+        self.brands = brands
+        self.brand_ids = brand_ids
+        self.models = models
+        self.descriptions = descriptions
+        self.description_ids = description_ids
+        self._index = {model_key(model): i for i, model in enumerate(models)}
+
+    @classmethod
+    def from_rows(cls, part_number: str, rows) -> "PartCompatibility":
+        """
+        Builds the columns from (brand, model_number, description) dicts, e.g. the stream
+        from static_scraper.iter_model_compatibility. Duplicate models are kept once.
+        """
+        brands, brand_ids, models, descriptions, description_ids = [], [], [], [], []
+        brand_codes, description_codes, seen = {}, {}, set()
+        for row in rows:
+            key = model_key(row.get("model_number"))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            brand = row.get("brand", "")
+            description = row.get("description", "")
+            if brand not in brand_codes:
+                brand_codes[brand] = len(brands)
+                brands.append(brand)
+            if description not in description_codes:
+                description_codes[description] = len(descriptions)
+                descriptions.append(description)
+            brand_ids.append(brand_codes[brand])
+            models.append(row["model_number"])
+            description_ids.append(description_codes[description])
+        return cls(part_number, brands, brand_ids, models, descriptions, description_ids)
+
+    def __len__(self):
+        return len(self.models)
+
+    def row(self, i: int) -> dict:
+        return {
+            "brand": self.brands[self.brand_ids[i]],
+            "model_number": self.models[i],
+            "description": self.descriptions[self.description_ids[i]],
+        }
+
+    def rows(self):
+        for i in range(len(self.models)):
+            yield self.row(i)
+
+    def model_keys(self) -> list:
+        return list(self._index)
+
+    def lookup(self, model_number: str) -> dict:
+        """
+        Returns the cross-reference row for a model, or None if the part isn't listed for it.
+        """
+        i = self._index.get(model_key(model_number))
+        return None if i is None else self.row(i)
+
+    def summary(self, sample_size: int = 20) -> dict:
+        """
+        Compact overview: model count, models per brand and per appliance type, and a sample.
+        """
+        return {
+            "part_number": self.part_number,
+            "model_count": len(self.models),
+            "brands": dict(Counter(self.brands[i] for i in self.brand_ids).most_common()),
+            "appliance_types": dict(Counter(self.descriptions[i] for i in self.description_ids).most_common(10)),
+            "sample_models": self.models[:sample_size],
+        }
+
+    def to_blob(self) -> bytes:
+        columns = [self.brands, self.brand_ids, self.models, self.descriptions, self.description_ids]
+        return zlib.compress(json.dumps(columns, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_blob(cls, part_number: str, blob: bytes) -> "PartCompatibility":
+        return cls(part_number, *json.loads(zlib.decompress(blob).decode("utf-8")))
+
+
+class CompatibilityStore:
+    """
+    Persists one PartCompatibility per part in SQLite (compressed columns), addressable by
+    PartSelect number or manufacturer part number. Recently used parts stay decoded in memory.
+
+    Every (model, part) pair ever scraped is also kept in a pair index: a compatible_pairs
+    table, loaded at startup into in-memory sets keyed by normalized model number, so
+    is_compatible() and parts_for_model() are dict/set lookups that never touch SQLite.
+    """
+
+    def __init__(self, path: str = COMPATIBILITY_DB_PATH, cache_size: int = COMPATIBILITY_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS part_models ("
+            "part_number TEXT PRIMARY KEY, columns BLOB NOT NULL, model_count INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS part_aliases (alias TEXT PRIMARY KEY, part_number TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS compatible_pairs ("
+            "model_key TEXT NOT NULL, part_number TEXT NOT NULL, PRIMARY KEY (model_key, part_number)) "
+            "WITHOUT ROWID"
+        )
+        try:
+            self._conn.execute("ALTER TABLE part_models ADD COLUMN complete INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # column already exists
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Lists used to be flagged complete by their row count alone; forget those flags
+            self._conn.execute("UPDATE part_models SET complete = 0")
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+        self._stats = {"lookups": 0, "compatible": 0, "not_compatible": 0, "unknown": 0}
+        # Bumped on every put, so derived indexes know when to pick up new identifiers
+        self.version = 0
+        self._load_index()
+
+    def _load_index(self):
+        """
+        Loads the pair index, the aliases and the set of parts whose full list is known.
+        """
+        self._parts_by_model = {}
+        for key, part in self._conn.execute("SELECT model_key, part_number FROM compatible_pairs"):
+            self._parts_by_model.setdefault(key, set()).add(part)
+        self._aliases = dict(self._conn.execute("SELECT alias, part_number FROM part_aliases"))
+        self._complete = {part for (part,) in self._conn.execute(
+            "SELECT part_number FROM part_models WHERE complete = 1")}
+        self._known = {part for (part,) in self._conn.execute("SELECT part_number FROM part_models")}
+        pair_count = sum(len(parts) for parts in self._parts_by_model.values())
+        logger.info(f"✅ Loaded compatibility index: {pair_count} pairs, {len(self._known)} parts.")
+
+    def put(self, part_number: str, rows, aliases=(), complete: bool = False) -> PartCompatibility:
+        """
+        Stores (replaces) a part's cross-reference. `aliases` are other numbers for the same
+        part, e.g. its manufacturer part number. `complete` says the scraper saw the end of
+        the part's list; only then is a missing model answered "not compatible".
+
+        Pairs are only ever added to the index, so a later, shorter scrape of the same part
+        doesn't forget models it was already listed for.
+        """
+        key = model_key(part_number)
+        table = PartCompatibility.from_rows(part_number, rows)
+        if not key or not len(table):
+            return table
+        model_keys = table.model_keys()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO part_models (part_number, columns, model_count, updated_at, complete) "
+                "VALUES (?, ?, ?, ?, ?)", (key, table.to_blob(), len(table), time.time(), int(complete)))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO compatible_pairs (model_key, part_number) VALUES (?, ?)",
+                [(mkey, key) for mkey in model_keys])
+            for alias in aliases:
+                if model_key(alias):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO part_aliases (alias, part_number) VALUES (?, ?)",
+                        (model_key(alias), key))
+                    self._aliases[model_key(alias)] = key
+            self._conn.commit()
+            for mkey in model_keys:
+                self._parts_by_model.setdefault(mkey, set()).add(key)
+            self._known.add(key)
+            if complete:
+                self._complete.add(key)
+            else:
+                self._complete.discard(key)
+            self._remember(key, table)
+            self.version += 1
+        logger.info(f"✅ Stored {len(table)} compatible models for part {part_number}.")
+        return table
+
+    def get(self, part_number: str) -> PartCompatibility:
+        """
+        Returns the stored cross-reference of a part (by PS or manufacturer number), or None.
+        """
+        key = self.part_key(part_number)
+        if not key:
+            return None
+        with self._lock:
+            table = self._cache.get(key)
+            if table is not None:
+                self._cache.move_to_end(key)
+                return table
+            row = self._conn.execute(
+                "SELECT columns FROM part_models WHERE part_number = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            table = PartCompatibility.from_blob(key, row[0])
+            self._remember(key, table)
+            return table
+
+    def lookup(self, part_number: str, model_number: str):
+        """
+        Returns the cross-reference row if the part is listed for the model, False if the part's
+        complete cross-reference is known and doesn't list the model, and None otherwise.
+        """
+        table = self.get(part_number)
+        if table is None:
+            return None
+        row = table.lookup(model_number)
+        if row:
+            return row
+        return False if self.part_key(part_number) in self._complete else None
+
+    def part_key(self, part_number: str) -> str:
+        """
+        Normalizes a PartSelect or manufacturer part number to the stored PartSelect key.
+        """
+        key = model_key(part_number)
+        return self._aliases.get(key, key)
+
+    def is_compatible(self, part_number: str, model_number: str):
+        """
+        Answers "does this part fit this model" from the pair index alone: True if the pair was
+        scraped, False if the part's complete list is known and lacks the model, None otherwise.
+        """
+        part, model = self.part_key(part_number), model_key(model_number)
+        if not part or not model:
+            return None
+        if part in self._parts_by_model.get(model, ()):
+            result = True
+        elif part in self._complete:
+            result = False
+        else:
+            result = None
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats[{True: "compatible", False: "not_compatible", None: "unknown"}[result]] += 1
+        return result
+
+    def parts_for_model(self, model_number: str) -> list:
+        """
+        Returns the PartSelect numbers of all indexed parts listed for a model.
+        """
+        return sorted(self._parts_by_model.get(model_key(model_number), ()))
+
+    def identifiers(self):
+        """
+        Returns (identifier, 'part' | 'model') for every part number, alias and model indexed.
+        """
+        with self._lock:
+            parts = list(self._known) + list(self._aliases)
+            models = list(self._parts_by_model)
+        return [(part, "part") for part in parts] + [(model, "model") for model in models]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "parts": len(self._known),
+                "complete_parts": len(self._complete),
+                "models": len(self._parts_by_model),
+                "pairs": sum(len(parts) for parts in self._parts_by_model.values()),
+            }
+
+    def _remember(self, key: str, table: PartCompatibility):
+        self._cache[key] = table
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+compatibility_store = CompatibilityStore()
@@ -0,0 +1,20 @@
+import os
+import atexit
+import shutil
+import tempfile
+
+# The modules under test open their SQLite stores and archive at import time; keep those
+# out of the working directory while the tests run
+_store_dir = tempfile.mkdtemp(prefix="partselect-tests-")
+atexit.register(shutil.rmtree, _store_dir, ignore_errors=True)
+os.environ.setdefault("COMPATIBILITY_DB_PATH", os.path.join(_store_dir, "compatibility.sqlite3"))
+os.environ.setdefault("URL_TABLE_PATH", os.path.join(_store_dir, "partselect_urls.sqlite3"))
+os.environ.setdefault("SEARCH_CACHE_PATH", os.path.join(_store_dir, "search_cache.sqlite3"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_store_dir, "llm_cache.sqlite3"))
+os.environ.setdefault("QNA_PROGRESS_PATH", os.path.join(_store_dir, "qna_progress.sqlite3"))
+os.environ.setdefault("INTENT_MODEL_PATH", os.path.join(_store_dir, "intent_model.json"))
+os.environ.setdefault("INTENT_LABEL_LOG", os.path.join(_store_dir, "intent_labels.jsonl"))
+os.environ.setdefault("VECTOR_STORE_DIR", os.path.join(_store_dir, "chroma_db"))
+os.environ.setdefault("HTML_ARCHIVE", "false")
+# The embedding and chat clients are built at import time but never called by the tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
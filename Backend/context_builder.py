@@ -0,0 +1,211 @@
+# context_builder.py
+
+import os
+import re
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from compatibility_store import model_key
+from llm_cache import estimate_tokens
+
+logger = logging.getLogger("ContextBuilder")
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+# Long texts (descriptions, stories) are split into chunks of about this many tokens
+CONTEXT_CHUNK_TOKENS = int(os.getenv("CONTEXT_CHUNK_TOKENS", "150"))
+
+# How much each section of scraped data (or indexed document type) matters per intent;
+# sections not listed get DEFAULT_SECTION_WEIGHT, a weight of 0 leaves the section out
+SECTION_WEIGHTS = {
+    "installation": {
+        "part": 4.0, "full_description": 2.5, "installation_guides": 3.0, "user_story": 2.5,
+        "qna": 1.5, "troubleshooting_info": 1.0, "troubleshooting_symptoms": 0.8,
+        "troubleshooting_products": 0.5, "troubleshooting_replacements": 0.3, "part_info": 3.0,
+        "model_compatibility": 0.2,
+    },
+    "compatibility": {
+        "part": 4.0, "compatibility_lookup": 6.0, "model_compatibility_summary": 3.0,
+        "model_compatibility": 2.0, "troubleshooting_info": 1.5, "troubleshooting_replacements": 1.5,
+        "troubleshooting_products": 1.0, "part_info": 3.0, "full_description": 1.0, "qna": 0.8,
+    },
+    "troubleshoot": {
+        "part": 3.0, "troubleshooting_info": 2.5, "troubleshooting_symptoms": 2.5, "user_story": 2.5,
+        "qna": 1.5, "full_description": 1.0, "part_info": 2.0, "model_compatibility": 0.2,
+    },
+}
+DEFAULT_SECTION_WEIGHT = 1.0
+# Items further down a scraped list (later Q&A pages, later rows) count slightly less
+POSITION_DECAY = 0.05
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "to", "of", "in", "on", "for", "with", "my", "i", "is", "it", "do",
+    "does", "how", "can", "this", "that", "will", "what", "part", "model", "me", "you", "be", "are",
+}
+
+
+def _words(text: str) -> set:
+    return {word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS}
+
+
+def compact(value) -> str:
+    """
+    Serializes scraped values without JSON punctuation: dicts as "key: value; ...",
+    lists of scalars comma-separated.
+    """
+    if isinstance(value, dict):
+        return "; ".join(f"{key}: {compact(item)}" for key, item in value.items() if item not in (None, "", [], {}))
+    if isinstance(value, (list, tuple)):
+        return ", ".join(compact(item) for item in value)
+    return str(value).strip()
+
+
+def split_text(text: str, chunk_tokens: int = CONTEXT_CHUNK_TOKENS) -> list:
+    """
+    Splits a long text at sentence boundaries into chunks of about chunk_tokens. A sentence
+    longer than that on its own (run-on text without punctuation) is split between words.
+    """
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        pieces.extend(sentence.split() if estimate_tokens(sentence) > chunk_tokens else [sentence])
+
+    chunks, current = [], ""
+    for sentence in pieces:
+        if current and estimate_tokens(current + " " + sentence) > chunk_tokens:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class ContextItem:
+    section: str
+    text: str
+    order: int
+    score: float = 0.0
+    tokens: int = 0
+
+
+class ContextBuilder:
+    """
+    Assembles the data part of an answer prompt under a token budget.
+
+    Scraped data and indexed documents are broken into items (one per Q&A pair, model row,
+    description chunk, ...). Each item is scored by its section's weight for the intent,
+    its word overlap with the query, whether it mentions the asked part or model, and its
+    position in its list. The best items are packed greedily until the budget is spent and
+    rendered compactly, grouped by section in their original order.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=20)
+        self._totals = {"builds": 0, "used_tokens": 0, "dropped_tokens": 0}
+
+    def items_from_data(self, data: dict) -> list:
+        """
+        Breaks a scraped data dict into items. Top-level scalars form one "part" item.
+        """
+        items, basics = [], []
+        for key, value in data.items():
+            if value in (None, "", [], {}):
+                continue
+            if isinstance(value, list):
+                for position, element in enumerate(value):
+                    text = compact(element)
+                    if text:
+                        items.append(ContextItem(key, text, position))
+            elif isinstance(value, dict):
+                items.append(ContextItem(key, compact(value), 0))
+            elif isinstance(value, str) and estimate_tokens(value) > CONTEXT_CHUNK_TOKENS:
+                items.extend(ContextItem(key, chunk, position) for position, chunk in enumerate(split_text(value)))
+            else:
+                basics.append(f"{key}: {compact(value)}")
+        if basics:
+            items.insert(0, ContextItem("part", "; ".join(basics), 0))
+        return items
+
+    @staticmethod
+    def items_from_documents(documents: list) -> list:
+        """
+        Turns indexed documents ({"type", "content", "source"}), most relevant first, into items.
+        """
+        return [
+            ContextItem(document.get("type") or "indexed", compact(document.get("content", "")), position)
+            for position, document in enumerate(documents) if document.get("content")
+        ]
+
+    def score(self, item: ContextItem, intent: str, query_words: set, identifiers: set) -> float:
+        weight = SECTION_WEIGHTS.get(intent, {}).get(item.section, DEFAULT_SECTION_WEIGHT)
+        if weight <= 0:
+            return 0.0
+        item_words = _words(item.text)
+        relevance = len(query_words & item_words) / len(query_words) if query_words else 0.0
+        if identifiers and {model_key(word) for word in item_words} & identifiers:
+            relevance += 2.0
+        return weight * (1.0 + relevance) / (1.0 + POSITION_DECAY * item.order)
+
+    def build(self, query: str, intent: str, data: dict = None, documents: list = None,
+              part_number: str = None, model_number: str = None, budget: int = None) -> tuple:
+        """
+        Returns (context text, report). The report gives the budget, the tokens used and
+        dropped, and the number of items kept and dropped.
+        """
+        budget = self.budget if budget is None else budget
+        items = self.items_from_data(data) if isinstance(data, dict) else []
+        items += self.items_from_documents(documents or [])
+        query_words = _words(query)
+        identifiers = {key for key in (model_key(part_number), model_key(model_number)) if key}
+
+        sections = []
+        for item in items:
+            item.score = self.score(item, intent, query_words, identifiers)
+            item.tokens = estimate_tokens(item.text) + 1
+            if item.section not in sections:
+                sections.append(item.section)
+
+        used, dropped, remaining = [], [], budget
+        for item in sorted(items, key=lambda item: item.score, reverse=True):
+            if item.score > 0 and item.tokens <= remaining:
+                used.append(item)
+                remaining -= item.tokens
+            else:
+                dropped.append(item)
+
+        lines = []
+        for section in sections:
+            section_items = sorted((item for item in used if item.section == section), key=lambda item: item.order)
+            if not section_items:
+                continue
+            lines.append(f"[{section}]")
+            lines.extend(f"- {item.text}" if len(section_items) > 1 else item.text for item in section_items)
+        context = "\n".join(lines)
+
+        report = {
+            "intent": intent,
+            "budget": budget,
+            "used_tokens": budget - remaining,
+            "dropped_tokens": sum(item.tokens for item in dropped),
+            "items_used": len(used),
+            "items_dropped": len(dropped),
+        }
+        with self._lock:
+            self._recent.append(report)
+            self._totals["builds"] += 1
+            self._totals["used_tokens"] += report["used_tokens"]
+            self._totals["dropped_tokens"] += report["dropped_tokens"]
+        logger.info(f"📦 Built {intent} context: {report['used_tokens']}/{budget} tokens used, "
+                    f"{report['dropped_tokens']} tokens in {len(dropped)} items dropped.")
+        return context, report
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"budget": self.budget, **self._totals, "recent": list(self._recent)}
+
+
+context_builder = ContextBuilder()
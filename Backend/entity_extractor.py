@@ -0,0 +1,226 @@
+# entity_extractor.py
+
+import os
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from compatibility_store import compatibility_store, model_key
+from url_resolver import url_resolver
+
+logger = logging.getLogger("EntityExtractor")
+
+# How often (at most) newly scraped identifiers are pulled into the index
+IDENTIFIER_INDEX_REFRESH_SECONDS = float(os.getenv("IDENTIFIER_INDEX_REFRESH_SECONDS", "30"))
+# Identifiers shorter than this are never typo-corrected; one edit changes too much of them
+FUZZY_MIN_LENGTH = int(os.getenv("IDENTIFIER_FUZZY_MIN_LENGTH", "7"))
+
+# Manufacturer part number formats, matched against the normalized (alphanumeric) token
+PART_NUMBER_PATTERNS = [
+    re.compile(r'^PS\d{5,9}$'),                   # PartSelect: PS11752778
+    re.compile(r'^(WP)?W\d{7,8}$'),               # Whirlpool: W10321304, WPW10321304
+    re.compile(r'^WP\d{6,8}$'),                   # Whirlpool: WP2188656
+    re.compile(r'^W[BDEGHRSX]\d{2}[A-Z]\d{3,5}$'),  # GE: WR55X10942, WD21X10224
+    re.compile(r'^D[ACDEG]\d{7}[A-Z]?$'),         # Samsung: DA97-12540G
+    re.compile(r'^[A-Z]{3}\d{8}$'),               # LG: EBR76542903, AEQ73110205
+    re.compile(r'^\d{6,10}$'),                    # Frigidaire / Bosch: 242126602, 00611319
+]
+# Appliance model numbers: letters and digits mixed, or Kenmore's 11+ digit numbers
+MODEL_NUMBER_RE = re.compile(r'^(?=(?:.*[A-Z]){2})(?=(?:.*\d){2})[A-Z0-9]{7,20}$|^\d{11,}$')
+# Identifier-like tokens in free text ("WRS588FIHZ-00", "106.51133211")
+CANDIDATE_RE = re.compile(r'[A-Za-z0-9](?:[A-Za-z0-9.-]*[A-Za-z0-9])?')
+
+# Lower-case spelling -> canonical brand name
+BRANDS = {
+    "whirlpool": "Whirlpool", "ge": "GE", "general electric": "GE", "ge profile": "GE",
+    "samsung": "Samsung", "lg": "LG", "frigidaire": "Frigidaire", "kenmore": "Kenmore",
+    "maytag": "Maytag", "kitchenaid": "KitchenAid", "kitchen aid": "KitchenAid", "bosch": "Bosch",
+    "electrolux": "Electrolux", "amana": "Amana", "jenn-air": "Jenn-Air", "jennair": "Jenn-Air",
+    "jenn air": "Jenn-Air", "hotpoint": "Hotpoint", "haier": "Haier", "fisher & paykel": "Fisher & Paykel",
+    "fisher paykel": "Fisher & Paykel", "thermador": "Thermador", "sub-zero": "Sub-Zero",
+    "subzero": "Sub-Zero", "viking": "Viking", "beko": "Beko", "crosley": "Crosley", "admiral": "Admiral",
+    "estate": "Estate", "roper": "Roper", "magic chef": "Magic Chef", "midea": "Midea",
+    "blomberg": "Blomberg", "miele": "Miele", "dacor": "Dacor", "gaggenau": "Gaggenau",
+    "inglis": "Inglis", "tappan": "Tappan", "gibson": "Gibson", "westinghouse": "Westinghouse",
+}
+BRAND_RE = re.compile(r'\b(' + '|'.join(sorted((re.escape(b) for b in BRANDS), key=len, reverse=True)) + r')\b')
+WORD_RE = re.compile(r"[a-z][a-z&-]+")
+# Shorter brand names are too close to ordinary words ("estate", "viking") to typo-match
+FUZZY_BRAND_MIN_LENGTH = 7
+# Characters users mix up when typing identifiers
+CONFUSABLES = str.maketrans("OIL", "011")
+
+
+def _deletions(key: str) -> set:
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+@dataclass
+class ExtractedIdentifiers:
+    """
+    The identifiers found in a query without the LLM.
+    """
+    part_number: Optional[str] = None
+    model_number: Optional[str] = None
+    brand: Optional[str] = None
+
+
+class IdentifierIndex:
+    """
+    Every part and model number seen in scraped data, as a set keyed by normalized identifier
+    plus a single-deletion index for typo matching: two identifiers within one insertion,
+    deletion, substitution or transposition share a key or a deletion variant, so a lookup is
+    a handful of dict probes instead of a scan.
+    """
+
+    def __init__(self):
+        self._kinds = {}
+        self._deletes = {}
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def add(self, identifier: str, kind: str):
+        key = model_key(identifier)
+        if not key or key in self._kinds:
+            return
+        self._kinds[key] = kind
+        if len(key) >= FUZZY_MIN_LENGTH:
+            for variant in _deletions(key):
+                self._deletes.setdefault(variant, set()).add(key)
+
+    def kind(self, key: str) -> Optional[str]:
+        return self._kinds.get(key)
+
+    def closest(self, key: str) -> Optional[str]:
+        """
+        Returns the single known identifier one edit away from `key`, or None if there is
+        none or the match is ambiguous.
+        """
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        matches = set(self._deletes.get(key, ()))
+        for variant in _deletions(key):
+            if variant in self._kinds:
+                matches.add(variant)
+            matches.update(self._deletes.get(variant, ()))
+        matches.discard(key)
+        return matches.pop() if len(matches) == 1 else None
+
+
+class EntityExtractor:
+    """
+    Finds part numbers, model numbers and brands in a query with regexes and a brand
+    dictionary, checked against the identifiers we have scraped (compatibility store and
+    learned URL table). Known identifiers are classified by what they were seen as; unknown
+    ones by their format; near misses of a known identifier are corrected to it.
+    """
+
+    def __init__(self, refresh_seconds: float = IDENTIFIER_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.index = IdentifierIndex()
+        self._lock = threading.Lock()
+        self._indexed_version = None
+        self._refreshed_at = None
+        self._stats = {"queries": 0, "known": 0, "corrected": 0, "by_format": 0}
+
+    def refresh(self, force: bool = False):
+        """
+        Adds identifiers scraped since the last refresh; at most once per refresh interval.
+        """
+        version = (compatibility_store.version, url_resolver.version)
+        now = time.monotonic()
+        if version == self._indexed_version:
+            return
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        with self._lock:
+            for identifier, kind in compatibility_store.identifiers():
+                self.index.add(identifier, kind)
+            for identifier, kind in url_resolver.identifiers():
+                self.index.add(identifier, kind)
+            self._indexed_version = version
+            self._refreshed_at = now
+        logger.info(f"✅ Identifier index holds {len(self.index)} part and model numbers.")
+
+    @staticmethod
+    def format_kind(key: str) -> Optional[str]:
+        """
+        Classifies an identifier by its format alone: 'part', 'model' or None.
+        """
+        if any(pattern.match(key) for pattern in PART_NUMBER_PATTERNS):
+            return "part"
+        if MODEL_NUMBER_RE.match(key):
+            return "model"
+        return None
+
+    def classify(self, identifier: str) -> tuple:
+        """
+        Returns (kind, normalized identifier) for a candidate token, or (None, key).
+        """
+        key = model_key(identifier)
+        kind = self.index.kind(key)
+        if kind is not None:
+            self._count("known")
+            return kind, key
+        # Sibling models often differ in one character (WRS588FIHZ00 / WRS588FIHZ01), so a
+        # well-formed identifier is only corrected for O/0 and I/1 mix-ups
+        kind = self.format_kind(key)
+        corrected = self.index.closest(key)
+        if corrected is not None and (kind is None or corrected.translate(CONFUSABLES) == key.translate(CONFUSABLES)):
+            self._count("corrected")
+            logger.info(f"🔤 Corrected identifier {key} to known {corrected}.")
+            return self.index.kind(corrected), corrected
+        if kind is not None:
+            self._count("by_format")
+        return kind, key
+
+    def extract_brand(self, query: str) -> Optional[str]:
+        """
+        Finds a brand from the dictionary, allowing one typo in brand names of 7+ letters.
+        """
+        text = (query or "").lower()
+        match = BRAND_RE.search(text)
+        if match:
+            return BRANDS[match.group(1)]
+        for word in WORD_RE.findall(text):
+            if len(word) < FUZZY_BRAND_MIN_LENGTH:
+                continue
+            word_deletions = _deletions(word)
+            for spelling, brand in BRANDS.items():
+                if len(spelling) < FUZZY_BRAND_MIN_LENGTH or abs(len(spelling) - len(word)) > 1:
+                    continue
+                spelling_deletions = _deletions(spelling)
+                if spelling in word_deletions or word in spelling_deletions or word_deletions & spelling_deletions:
+                    return brand
+        return None
+
+    def extract(self, query: str) -> ExtractedIdentifiers:
+        """
+        Extracts the first part number, the first model number and the brand of a query.
+        """
+        self.refresh()
+        self._count("queries")
+        found = ExtractedIdentifiers(brand=self.extract_brand(query))
+        for token in CANDIDATE_RE.findall(query or ""):
+            if not any(char.isdigit() for char in token) or len(model_key(token)) < 5:
+                continue
+            kind, key = self.classify(token)
+            if kind == "part" and found.part_number is None:
+                found.part_number = key
+            elif kind == "model" and found.model_number is None:
+                found.model_number = key
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"identifiers": len(self.index), **self._stats}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+
+entity_extractor = EntityExtractor()
@@ -1,17 +1,235 @@
 # google_search.py
 import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
 import requests
+from requests.adapters import HTTPAdapter
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
-def google_partselect_search(query: str, num_results=3):
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "sqlite")  # sqlite | memory | none
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite3")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "10"))
+# Custom Search allows 100 queries per 100 seconds per user by default
+CSE_RATE_PER_SECOND = float(os.getenv("CSE_RATE_PER_SECOND", "1"))
+CSE_BURST = int(os.getenv("CSE_BURST", "5"))
+
+logger = logging.getLogger("GoogleSearch")
+
+
+# ============================
+# Result caches
+# ============================
+
+class SearchCache(ABC):
     """
-    Use Google Custom Search, restricted to site:partselect.com
-    Returns a list of (snippet, link).
+    Interface for search result caches. Values are lists of (snippet, link) tuples.
     """
-    if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
-        raise ValueError("Missing GOOGLE_API_KEY or GOOGLE_CSE_ID in environment.")
+
+    @abstractmethod
+    def get(self, key: str):
+        """
+        Returns the cached results for a key, or None.
+        """
+
+    @abstractmethod
+    def set(self, key: str, results: list):
+        """
+        Stores the results for a key.
+        """
+
+
+class NullSearchCache(SearchCache):
+    """
+    Cache that never stores anything.
+    """
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, results: list):
+        pass
+
+
+class MemorySearchCache(SearchCache):
+    """
+    In-process LRU cache with TTL.
+    """
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def set(self, key: str, results: list):
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteSearchCache(SearchCache):
+    """
+    On-disk cache with TTL, shared across restarts and worker processes.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, results TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, stored_at FROM search_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return [tuple(item) for item in json.loads(row[0])]
+
+    def set(self, key: str, results: list):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, results, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(results), time.time()))
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+
+def _make_cache(backend: str) -> SearchCache:
+    if backend == "sqlite":
+        try:
+            return SQLiteSearchCache()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not open search cache at {SEARCH_CACHE_PATH}, using memory: {e}")
+            return MemorySearchCache()
+    if backend == "memory":
+        return MemorySearchCache()
+    return NullSearchCache()
+
+
+search_cache = _make_cache(SEARCH_CACHE_BACKEND)
+
+
+def set_search_cache(cache: SearchCache):
+    """
+    Replaces the cache used by google_partselect_search.
+    """
+    global search_cache
+    search_cache = cache
+
+
+def _cache_get(key: str):
+    """
+    Reads the search cache; a cache error counts as a miss.
+    """
+    try:
+        return search_cache.get(key)
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"⚠️ Could not read search cache, searching: {e}")
+        return None
+
+
+def _cache_set(key: str, results: list):
+    """
+    Writes the search cache; a cache error only costs the entry.
+    """
+    try:
+        search_cache.set(key, results)
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"⚠️ Could not store search results in cache: {e}")
+
+
+# ============================
+# Quota-aware HTTP client
+# ============================
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, at most `capacity` saved up.
+    """
+
+    def __init__(self, rate: float = CSE_RATE_PER_SECOND, capacity: int = CSE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = SEARCH_TIMEOUT) -> bool:
+        """
+        Takes one token, waiting up to `timeout` seconds for it. Returns False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+rate_limiter = TokenBucket()
+
+# Pooled session: connections to the Custom Search API are kept alive and reused
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Identical lookups in flight right now, keyed like the cache
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _cache_key(query: str, num_results: int) -> str:
+    """
+    Normalizes the query so trivially different spellings share a cache entry.
+    """
+    normalized = " ".join(query.lower().split())
+    return f"{normalized}|{num_results}"
+
+
+def _fetch_results(query: str, num_results: int):
+    """
+    Calls the Custom Search API. Returns the (snippet, link) list, or None when the call
+    failed and the result must not be cached.
+    """
+    if not rate_limiter.acquire():
+        logger.warning("⚠️ Custom Search rate limit reached, skipping search.")
+        return None
 
     url = "https://www.googleapis.com/customsearch/v1"
     params = {
@@ -21,7 +239,14 @@ def google_partselect_search(query: str, num_results=3):
         "num": num_results
     }
 
-    response = requests.get(url, params=params)
+    try:
+        response = session.get(url, params=params, timeout=SEARCH_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning(f"⚠️ Custom Search request failed: {e}")
+        return None
+    if response.status_code != 200:
+        logger.warning(f"⚠️ Custom Search returned HTTP {response.status_code}: {response.text[:200]}")
+        return None
     data = response.json()
 
     if "items" not in data:
@@ -34,6 +259,48 @@ def google_partselect_search(query: str, num_results=3):
         results.append((snippet, link))
     return results
 
+
+def google_partselect_search(query: str, num_results=3):
+    """
+    Use Google Custom Search, restricted to site:partselect.com
+    Returns a list of (snippet, link).
+
+    Results are cached by normalized query and num_results (SEARCH_CACHE_TTL), and
+    concurrent identical lookups share a single upstream call.
+    """
+    if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
+        raise ValueError("Missing GOOGLE_API_KEY or GOOGLE_CSE_ID in environment.")
+
+    key = _cache_key(query, num_results)
+    cached = _cache_get(key)
+    if cached is not None:
+        logger.info(f"✅ Search cache hit for '{query}'")
+        return cached
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not is_leader:
+        logger.info(f"ℹ️ Waiting for in-flight search for '{query}'")
+        return future.result()
+
+    try:
+        results = _fetch_results(query, num_results)
+        if results is not None:
+            _cache_set(key, results)
+        future.set_result(results or [])
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    return results or []
+
 if __name__ == "__main__":
     # Test the search function manually
     query = "GE fridge model WR55X10942 control board"
@@ -44,4 +311,4 @@ if __name__ == "__main__":
     else:
         print("\n🔍 **Google Search Results for PartSelect:**")
         for title, snippet, link in results:
-            print(f"🔹 {title}\n   {snippet}\n   {link}\n")
\ No newline at end of file
+            print(f"🔹 {title}\n   {snippet}\n   {link}\n")
@@ -0,0 +1,193 @@
+# html_archive.py
+
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("HTMLArchive")
+
+HTML_ARCHIVE_ENABLED = os.getenv("HTML_ARCHIVE", "true").lower() in ("1", "true", "yes")
+HTML_ARCHIVE_DIR = os.getenv("HTML_ARCHIVE_DIR", "html_archive")
+# Archived pages validated more recently than this are served without any request
+HTML_ARCHIVE_FRESH_SECONDS = float(os.getenv("HTML_ARCHIVE_FRESH_SECONDS", "3600"))
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def read_object(path: str) -> str:
+    """
+    Reads one gzip-compressed page. Returns None if the object is missing or corrupt.
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, EOFError) as e:
+        logger.warning(f"⚠️ Could not read archived page {path}: {e}")
+        return None
+
+
+class HTMLArchive:
+    """
+    Content-addressed archive of raw PartSelect pages.
+
+    Page bodies are stored gzip-compressed under objects/<hash[:2]>/<hash>.html.gz, so identical
+    pages are stored once. A SQLite index maps each URL to its latest content hash together with
+    the fetch time, the last successful revalidation and the ETag / Last-Modified validators
+    for conditional requests. Every distinct version of a page is kept in page_versions.
+
+    Selenium renders are indexed separately in `renders`: a JS-rendered DOM has no HTTP
+    validators and differs from what the server sends, so it must neither replace the
+    static copy used for revalidation nor be served to the static parser as fresh.
+    """
+
+    def __init__(self, root: str = HTML_ARCHIVE_DIR, enabled: bool = HTML_ARCHIVE_ENABLED):
+        self.root = root
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "unchanged": 0, "renders": 0, "fresh_hits": 0, "revalidated": 0,
+                       "stale_served": 0}
+        if not enabled:
+            return
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "fetched_at REAL NOT NULL, validated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_versions ("
+            "url TEXT NOT NULL, content_hash TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (url, content_hash))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS renders ("
+            "url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, rendered_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.html.gz")
+
+    def count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def lookup(self, url: str) -> dict:
+        """
+        Returns the index entry of the latest archived version of a URL, or None.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, etag, last_modified, fetched_at, validated_at FROM pages WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("content_hash", "etag", "last_modified", "fetched_at", "validated_at"), row))
+
+    def read(self, digest: str) -> str:
+        """
+        Returns the archived HTML for a content hash, or None.
+        """
+        if not self.enabled:
+            return None
+        return read_object(self.object_path(digest))
+
+    def store(self, url: str, html: str, etag: str = None, last_modified: str = None) -> str:
+        """
+        Archives a page fetched over HTTP and returns its content hash.
+        """
+        if not self.enabled or not html:
+            return None
+        digest = self._write_object(html)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, content_hash, etag, last_modified, fetched_at, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (url, digest, etag, last_modified, now, now))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO page_versions (url, content_hash, fetched_at) VALUES (?, ?, ?)",
+                (url, digest, now))
+            self._conn.commit()
+        return digest
+
+    def store_render(self, url: str, html: str) -> str:
+        """
+        Archives a Selenium page_source snapshot and returns its content hash. The HTTP
+        entry of the URL, and with it the validators, is left alone.
+        """
+        if not self.enabled or not html:
+            return None
+        digest = self._write_object(html)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO renders (url, content_hash, rendered_at) VALUES (?, ?, ?)",
+                (url, digest, time.time()))
+            self._conn.commit()
+        self.count("renders")
+        return digest
+
+    def _write_object(self, html: str) -> str:
+        """
+        Writes a page body unless this exact content is archived already; returns its hash.
+        """
+        digest = content_hash(html)
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            self.count("unchanged")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+            self.count("stored")
+        return digest
+
+    def mark_validated(self, url: str):
+        """
+        Records that the server confirmed the archived version is current (HTTP 304).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE pages SET validated_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def entries(self) -> list:
+        """
+        Returns (url, object path) for the latest version of every archived page; a Selenium
+        render is only used for pages never fetched over HTTP.
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, content_hash FROM pages UNION ALL "
+                "SELECT url, content_hash FROM renders WHERE url NOT IN (SELECT url FROM pages) "
+                "ORDER BY url").fetchall()
+        return [(url, self.object_path(digest)) for url, digest in rows]
+
+    def stats(self) -> dict:
+        """
+        Returns archive counters for monitoring.
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            versions = self._conn.execute("SELECT COUNT(*) FROM page_versions").fetchone()[0]
+            renders = self._conn.execute("SELECT COUNT(*) FROM renders").fetchone()[0]
+            return {"enabled": True, "pages": pages, "versions": versions, "rendered_pages": renders,
+                    **self._stats}
+
+
+html_archive = HTMLArchive()
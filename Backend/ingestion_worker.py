@@ -0,0 +1,152 @@
+# ingestion_worker.py
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from vector_manager import live_store, build_documents
+
+logger = logging.getLogger("IngestionWorker")
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "2"))
+INGEST_SUBMIT_TIMEOUT = float(os.getenv("INGEST_SUBMIT_TIMEOUT", "0.5"))
+
+_STOP = object()
+
+
+class IngestionWorker:
+    """
+    Indexes scraped data into the vector store on a background thread.
+
+    Requests hand their scraped data to submit() and continue answering immediately.
+    Documents from several requests are batched into one embedding + upsert call once
+    INGEST_BATCH_SIZE documents are pending or INGEST_FLUSH_INTERVAL seconds have passed.
+    The queue is bounded: when it is full, submit() blocks for at most INGEST_SUBMIT_TIMEOUT
+    seconds and then drops the data rather than letting memory grow.
+    """
+
+    def __init__(self, max_queue: int = INGEST_QUEUE_SIZE, batch_size: int = INGEST_BATCH_SIZE,
+                 flush_interval: float = INGEST_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "dropped": 0,
+            "indexed": 0,
+            "unchanged": 0,
+            "failed_batches": 0,
+        }
+        self._thread = threading.Thread(target=self._run, name="ingestion-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, scraped_data: dict, timeout: float = INGEST_SUBMIT_TIMEOUT) -> bool:
+        """
+        Queues scraped data for background indexing. Returns False if it was dropped
+        because the queue stayed full (backpressure) or the worker has stopped.
+        """
+        if not scraped_data or not self._thread.is_alive():
+            return False
+        try:
+            self._queue.put(scraped_data, timeout=timeout)
+        except queue.Full:
+            logger.warning("⚠️ Ingestion queue full, dropping scraped data.")
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Blocks until everything submitted so far has been written to the vector store.
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 30):
+        """
+        Flushes pending documents and stops the worker thread.
+        """
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("⚠️ Ingestion queue still full at shutdown, pending data is lost.")
+            return
+        self._thread.join(timeout)
+        logger.info("✅ Ingestion worker stopped.")
+
+    def stats(self) -> dict:
+        """
+        Returns ingestion counters for monitoring.
+        """
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _run(self):
+        """
+        Worker loop: collects documents until the batch is full or the flush interval
+        expires, then writes the batch.
+        """
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is None or item is _STOP or isinstance(item, threading.Event):
+                self._write(batch)
+                batch, deadline = [], None
+                if isinstance(item, threading.Event):
+                    item.set()
+                if item is _STOP:
+                    return
+                continue
+
+            try:
+                batch.extend(build_documents(item))
+            except Exception as e:
+                logger.exception(f"❌ Failed to build documents from scraped data: {e}")
+                continue
+
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch, deadline = [], None
+            elif batch and deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch: list):
+        """
+        Embeds and upserts one batch of documents.
+        """
+        if not batch:
+            return
+        try:
+            added, skipped = live_store.upsert_documents(batch)
+            self._count("indexed", added)
+            self._count("unchanged", skipped)
+            logger.info(f"✅ Indexed {added} documents in background ({skipped} unchanged).")
+        except Exception as e:
+            self._count("failed_batches")
+            logger.exception(f"❌ Background indexing failed for {len(batch)} documents: {e}")
+
+
+ingestion_worker = IngestionWorker()
+atexit.register(ingestion_worker.shutdown)
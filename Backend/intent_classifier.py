@@ -0,0 +1,295 @@
+# intent_classifier.py
+"""
+Local intent classifier that answers confident cases without calling GPT.
+
+A multinomial naive Bayes model trained on logged queries and their GPT labels scores each
+query; keyword rules for the unambiguous phrasings are features of that model, so how much
+they count is learned from the labels. Until a model is trained every query goes to GPT.
+Retrain it from the label log with:
+
+    python intent_classifier.py train
+"""
+
+import os
+import re
+import json
+import math
+import random
+import logging
+import argparse
+import threading
+from collections import Counter
+
+logger = logging.getLogger("IntentClassifier")
+
+# off: GPT only. shadow: classify every query next to GPT and record agreement, but always
+# use GPT's label. on: use the local label when it is confident, GPT otherwise.
+INTENT_CLASSIFIER_MODE = os.getenv("INTENT_CLASSIFIER_MODE", "shadow").lower()
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.85"))
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "intent_model.json")
+INTENT_LABEL_LOG = os.getenv("INTENT_LABEL_LOG", "intent_labels.jsonl")
+
+INTENTS = ("troubleshoot", "installation", "compatibility", "qna", "general")
+
+# High-precision phrasings; each matching rule adds a "<rule:intent>" feature to the query
+INTENT_RULES = {
+    "installation": re.compile(
+        r"\b(install(ing|ation)?|replac(e|ing|ement)|put (it |this )?in|remove (the|my|old)|"
+        r"how (do|can|should) i (fit|mount|attach|swap))\b"),
+    "compatibility": re.compile(
+        r"\b(compatib(le|ility)|fits?|work(s)? (with|on|in)|right part for|will (this|it|part)\b.*\b(fit|work))\b"),
+    "troubleshoot": re.compile(
+        r"\b(not (working|cooling|making|draining|cleaning|dispensing|spinning|starting|turning)|"
+        r"(won'?t|doesn'?t|does not|will not|isn'?t|stopped) \w+|leak(s|ing)?|noisy|noise|broken|"
+        r"too (warm|cold)|frost|error code|ice maker|troubleshoot\w*|fix)\b"),
+}
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(query: str) -> list:
+    """
+    Lower-cased words, word bigrams and matching keyword rules; part and model numbers all
+    become one "<id>" token so the model learns from the phrasing rather than from specific numbers.
+    """
+    text = (query or "").lower()
+    words = ["<id>" if any(char.isdigit() for char in token) else token for token in TOKEN_RE.findall(text)]
+    rules = [f"<rule:{intent}>" for intent, pattern in INTENT_RULES.items() if pattern.search(text)]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])] + rules
+
+
+class NaiveBayesModel:
+    """
+    Multinomial naive Bayes with add-one smoothing over tokenize() features.
+    """
+
+    def __init__(self, class_counts: dict, token_counts: dict):
+        self.class_counts = class_counts
+        self.token_counts = token_counts
+        self.vocabulary = {token for counts in token_counts.values() for token in counts}
+        self.class_totals = {intent: sum(counts.values()) for intent, counts in token_counts.items()}
+        total_examples = sum(class_counts.values())
+        self.log_priors = {intent: math.log(count / total_examples) for intent, count in class_counts.items()}
+
+    @classmethod
+    def train(cls, examples) -> "NaiveBayesModel":
+        """
+        Trains on (query, intent) pairs.
+        """
+        class_counts, token_counts = Counter(), {}
+        for query, intent in examples:
+            class_counts[intent] += 1
+            token_counts.setdefault(intent, Counter()).update(tokenize(query))
+        return cls(dict(class_counts), {intent: dict(counts) for intent, counts in token_counts.items()})
+
+    def predict_proba(self, query: str) -> dict:
+        """
+        Returns the posterior probability of every trained intent.
+        """
+        tokens = [token for token in tokenize(query) if token in self.vocabulary]
+        vocabulary_size = len(self.vocabulary)
+        scores = {}
+        for intent, log_prior in self.log_priors.items():
+            counts, denominator = self.token_counts[intent], self.class_totals[intent] + vocabulary_size
+            scores[intent] = log_prior + sum(math.log((counts.get(token, 0) + 1) / denominator) for token in tokens)
+        best = max(scores.values())
+        exp_scores = {intent: math.exp(score - best) for intent, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {intent: score / total for intent, score in exp_scores.items()}
+
+    def to_dict(self) -> dict:
+        return {"class_counts": self.class_counts, "token_counts": self.token_counts}
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesModel":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["class_counts"], data["token_counts"])
+
+
+class IntentClassifier:
+    """
+    The trained model's prediction and confidence. Every GPT label is appended to the label
+    log as training data and, outside "off" mode, compared with the local prediction.
+    """
+
+    def __init__(self, mode: str = INTENT_CLASSIFIER_MODE, threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+                 model_path: str = INTENT_MODEL_PATH, label_log: str = INTENT_LABEL_LOG):
+        self.mode = mode if mode in ("off", "shadow", "on") else "shadow"
+        self.threshold = threshold
+        self.model_path = model_path
+        self.label_log = label_log
+        self._lock = threading.Lock()
+        self._stats = {"predictions": 0, "confident": 0, "fast_path": 0, "compared": 0, "agreed": 0,
+                       "confident_compared": 0, "confident_agreed": 0}
+        self._disagreements = Counter()
+        self.model = None
+        self.reload()
+
+    def reload(self):
+        """
+        Loads the trained model, if there is one.
+        """
+        if not os.path.exists(self.model_path):
+            self.model = None
+            return
+        try:
+            self.model = NaiveBayesModel.load(self.model_path)
+            logger.info(f"✅ Loaded intent model from {self.model_path} "
+                        f"({sum(self.model.class_counts.values())} training queries).")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Could not load intent model {self.model_path}: {e}")
+            self.model = None
+
+    def predict(self, query: str) -> tuple:
+        """
+        Returns (intent, confidence); (None, 0.0) while no model is trained.
+        """
+        if self.model is not None:
+            probabilities = self.model.predict_proba(query)
+            intent = max(probabilities, key=probabilities.get)
+            result = (intent, probabilities[intent])
+        else:
+            result = (None, 0.0)
+        with self._lock:
+            self._stats["predictions"] += 1
+            if result[1] >= self.threshold:
+                self._stats["confident"] += 1
+        return result
+
+    def classify(self, query: str):
+        """
+        Returns the local intent when the classifier is on and confident, else None (ask GPT).
+        """
+        if self.mode != "on":
+            return None
+        intent, confidence = self.predict(query)
+        if intent is None or confidence < self.threshold:
+            return None
+        with self._lock:
+            self._stats["fast_path"] += 1
+        logger.info(f"⚡ Classified intent locally: {intent} ({confidence:.2f})")
+        return intent
+
+    def observe(self, query: str, gpt_intent: str):
+        """
+        Records GPT's label for a query: appends it to the label log and, in shadow and on
+        mode, compares it with the local prediction.
+        """
+        if self.mode == "off" or gpt_intent not in INTENTS:
+            return
+        intent, confidence = self.predict(query)
+        with self._lock:
+            try:
+                with open(self.label_log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"query": query, "intent": gpt_intent}) + "\n")
+            except OSError as e:
+                logger.warning(f"⚠️ Could not append to intent label log: {e}")
+            self._stats["compared"] += 1
+            self._stats["agreed"] += intent == gpt_intent
+            if confidence >= self.threshold:
+                self._stats["confident_compared"] += 1
+                self._stats["confident_agreed"] += intent == gpt_intent
+            if intent != gpt_intent:
+                self._disagreements[f"{gpt_intent}->{intent}"] += 1
+        if intent != gpt_intent:
+            logger.info(f"🔀 Intent disagreement: GPT={gpt_intent}, local={intent} ({confidence:.2f}) for: {query}")
+
+    def stats(self) -> dict:
+        """
+        Returns the mode, counters and agreement with GPT (overall and on confident predictions,
+        which is the rate that matters before switching to "on").
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            disagreements = dict(self._disagreements.most_common(10))
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "model_loaded": self.model is not None,
+            **stats,
+            "agreement": round(stats["agreed"] / stats["compared"], 3) if stats["compared"] else None,
+            "confident_agreement": (round(stats["confident_agreed"] / stats["confident_compared"], 3)
+                                    if stats["confident_compared"] else None),
+            "disagreements": disagreements,
+        }
+
+
+def load_labels(path: str = INTENT_LABEL_LOG) -> list:
+    """
+    Reads the (query, intent) pairs of the label log; the latest label of a query wins.
+    """
+    labels = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("query") and entry.get("intent") in INTENTS:
+                labels[entry["query"]] = entry["intent"]
+    return list(labels.items())
+
+
+def train(label_log: str = INTENT_LABEL_LOG, model_path: str = INTENT_MODEL_PATH,
+          holdout: float = 0.2, threshold: float = INTENT_CONFIDENCE_THRESHOLD) -> dict:
+    """
+    Measures accuracy and coverage at the threshold on a held-out share of the labels, then
+    trains on all labels and saves the model. Returns the evaluation report.
+    """
+    examples = load_labels(label_log)
+    if not examples:
+        raise ValueError(f"no labelled queries in {label_log}")
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - holdout)) if holdout and len(examples) >= 10 else len(examples)
+    report = {"examples": len(examples), "labels": dict(Counter(intent for _, intent in examples))}
+
+    if split < len(examples):
+        evaluator = IntentClassifier(mode="shadow", threshold=threshold, model_path="", label_log="")
+        evaluator.model = NaiveBayesModel.train(examples[:split])
+        predictions = [(evaluator.predict(query), intent) for query, intent in examples[split:]]
+        confident = [(predicted, intent) for (predicted, confidence), intent in predictions if confidence >= threshold]
+        report["holdout"] = len(predictions)
+        report["accuracy"] = round(sum(p == intent for (p, _), intent in predictions) / len(predictions), 3)
+        report["coverage_at_threshold"] = round(len(confident) / len(predictions), 3)
+        report["accuracy_at_threshold"] = (round(sum(p == intent for p, intent in confident) / len(confident), 3)
+                                           if confident else None)
+
+    NaiveBayesModel.train(examples).save(model_path)
+    logger.info(f"✅ Trained intent model on {len(examples)} queries, saved to {model_path}: {report}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local intent classifier.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train_parser = subcommands.add_parser("train", help="retrain the model from the GPT label log")
+    train_parser.add_argument("--labels", default=INTENT_LABEL_LOG, help="label log (JSON lines)")
+    train_parser.add_argument("--output", default=INTENT_MODEL_PATH, help="where to write the model")
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="share of labels held out for evaluation")
+    predict_parser = subcommands.add_parser("predict", help="classify a query with the saved model")
+    predict_parser.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        try:
+            report = train(args.labels, args.output, args.holdout)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(json.dumps(report, indent=2))
+    else:
+        intent, confidence = IntentClassifier(mode="on").predict(args.query)
+        print(json.dumps({"intent": intent, "confidence": round(confidence, 3)}))
+
+
+intent_classifier = IntentClassifier()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,235 @@
+# llm_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from langchain.schema import AIMessage
+from langchain.schema.messages import AIMessageChunk
+
+logger = logging.getLogger("LLMCache")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+# Only calls at or below this temperature are cached; sampled answers are meant to vary
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0"))
+
+# Rough characters per token, used when the API doesn't report usage (e.g. streamed calls)
+CHARS_PER_TOKEN = 4
+
+
+def cache_key(model: str, temperature: float, messages) -> str:
+    """
+    Hash of the model, temperature and the messages' roles and contents in canonical JSON.
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [{"role": message.type, "content": message.content} for message in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // CHARS_PER_TOKEN)
+
+
+class LLMCache:
+    """
+    Two-level cache of LLM completions: an in-process LRU in front of a SQLite table shared
+    across restarts and worker processes. Entries expire after the TTL; the table is trimmed
+    to the least recently used max_entries.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evicted": 0,
+                       "saved_prompt_tokens": 0, "saved_completion_tokens": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, "
+            "completion_tokens INTEGER NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_used_at ON llm_cache (used_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> dict:
+        """
+        Returns the cached entry ({"content", "prompt_tokens", "completion_tokens"}) or None.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry["stored_at"] <= self.ttl:
+                self._memory.move_to_end(key)
+                self._record_hit("memory_hits", entry)
+                return entry
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT content, prompt_tokens, completion_tokens, stored_at FROM llm_cache WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or now - row[3] > self.ttl:
+                self._stats["misses"] += 1
+                return None
+            entry = dict(zip(("content", "prompt_tokens", "completion_tokens", "stored_at"), row))
+            self._conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, entry)
+            self._record_hit("disk_hits", entry)
+            return entry
+
+    def set(self, key: str, model: str, content: str, prompt_tokens: int, completion_tokens: int):
+        now = time.time()
+        entry = {"content": content, "prompt_tokens": prompt_tokens,
+                 "completion_tokens": completion_tokens, "stored_at": now}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, content, prompt_tokens, completion_tokens, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (key, model, content, prompt_tokens, completion_tokens, now, now))
+            self._stats["stores"] += 1
+            # Trim occasionally rather than on every write
+            if self._stats["stores"] % 100 == 1:
+                self._evict(now)
+            self._conn.commit()
+            self._remember(key, entry)
+
+    def _evict(self, now: float):
+        """
+        Drops expired entries and the least recently used ones beyond max_entries.
+        """
+        expired = self._conn.execute("DELETE FROM llm_cache WHERE stored_at < ?", (now - self.ttl,)).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+        self._stats["evicted"] += expired + overflow
+
+    def _remember(self, key: str, entry: dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, counter: str, entry: dict):
+        self._stats[counter] += 1
+        self._stats["saved_prompt_tokens"] += entry["prompt_tokens"]
+        self._stats["saved_completion_tokens"] += entry["completion_tokens"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "memory_entries": len(self._memory),
+            "hit_rate": round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else None,
+        }
+
+
+class CachedChatModel:
+    """
+    Wraps a LangChain chat model so invoke() and stream() are answered from the LLM cache
+    when the same model, temperature and messages were seen before. Calls above
+    LLM_CACHE_MAX_TEMPERATURE always go to the model. Other attributes pass through.
+    """
+
+    def __init__(self, llm, cache: LLMCache = None, max_temperature: float = LLM_CACHE_MAX_TEMPERATURE):
+        self.llm = llm
+        self.cache = cache
+        self.max_temperature = max_temperature
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _key(self, messages):
+        temperature = getattr(self.llm, "temperature", None)
+        if self.cache is None or temperature is None or temperature > self.max_temperature:
+            return None
+        return cache_key(getattr(self.llm, "model_name", ""), temperature, messages)
+
+    def _lookup(self, key: str) -> dict:
+        """
+        Returns the cached entry, or None on a miss or when the cache can't be read
+        (e.g. the database is locked by another worker), so the call goes to the model.
+        """
+        if not key:
+            return None
+        try:
+            return self.cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not read LLM cache, calling the model: {e}")
+            return None
+
+    def _store(self, key: str, messages, content: str, usage: dict = None):
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens") or sum(estimate_tokens(message.content) for message in messages)
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(content)
+        try:
+            self.cache.set(key, getattr(self.llm, "model_name", ""), content, prompt_tokens, completion_tokens)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not store LLM response in cache: {e}")
+
+    def invoke(self, messages, **kwargs):
+        key = self._key(messages)
+        entry = self._lookup(key)
+        if entry is not None:
+            logger.info("⚡ LLM cache hit.")
+            return AIMessage(content=entry["content"])
+        response = self.llm.invoke(messages, **kwargs)
+        if key:
+            usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+            self._store(key, messages, response.content, usage)
+        return response
+
+    def stream(self, messages, **kwargs):
+        key = self._key(messages)
+        entry = self._lookup(key)
+        if entry is not None:
+            logger.info("⚡ LLM cache hit (stream).")
+            yield AIMessageChunk(content=entry["content"])
+            return
+        tokens = []
+        for chunk in self.llm.stream(messages, **kwargs):
+            tokens.append(chunk.content or "")
+            yield chunk
+        # Only a stream that ran to the end is cached
+        if key:
+            self._store(key, messages, "".join(tokens))
+
+
+def _make_cache() -> LLMCache:
+    if not LLM_CACHE_ENABLED:
+        return None
+    try:
+        return LLMCache()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Could not open LLM cache at {LLM_CACHE_PATH}, caching disabled: {e}")
+        return None
+
+
+llm_cache = _make_cache()
+
+
+def cache_stats() -> dict:
+    """
+    Returns the LLM cache counters for monitoring.
+    """
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
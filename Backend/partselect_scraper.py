@@ -1,44 +1,55 @@
 # partselect_scraper.py
 
-import undetected_chromedriver as uc
-import time
+import os
 import json
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
+from browser_pool import get_pool, launch_chrome
+from resource_blocker import resource_blocker
+from html_archive import html_archive
+from qna_fetcher import qna_fetcher, QNA_PAGE_SIZE
+from waits import wait_for_attribute, wait_for_invisible, wait_for_network_idle, EXPAND_TIMEOUT
+from static_scraper import (scrape_product_static, parse_product_html, make_soup,
+                            iter_model_compatibility, PRODUCT_SECTIONS)
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("scraper.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# The cross-reference list loads more rows as it is scrolled; give up after this many scrolls
+CROSSREF_MAX_SCROLLS = int(os.getenv("CROSSREF_MAX_SCROLLS", "100"))
+CROSSREF_SCROLL_SCRIPT = """
+var list = document.querySelector('.pd__crossref__list');
+if (!list) { return -1; }
+list.scrollTop = list.scrollHeight;
+list.scrollIntoView(false);
+return list.querySelectorAll('.row').length;
+"""
+CROSSREF_COUNT_SCRIPT = "return document.querySelectorAll('.pd__crossref__list .row').length;"
+
+# Collapsible header (id, label) of each optional section, see static_scraper.PRODUCT_SECTIONS
+SECTION_HEADERS = {
+    "description": ("ProductDescription", "Product Description"),
+    "troubleshooting": ("Troubleshooting", "Troubleshooting"),
+    "model_compatibility": ("ModelCrossReference", "Model Compatibility"),
+    "qna": ("QuestionsAndAnswers", "Q&A"),
+}
+
 class PartSelectScraper:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, driver=None):
         """
         Initializes the undetected ChromeDriver with specified options.
+        If a driver is passed in (e.g. checked out from the browser pool), it is reused
+        and left running on close().
         """
-        self.options = uc.ChromeOptions()
-        self.options.add_argument("--no-sandbox")
-        self.options.add_argument("--disable-blink-features=AutomationControlled")  # Prevent detection
-        self.options.add_argument("--disable-infobars")
-        self.options.add_argument("--disable-extensions")
-        self.options.add_argument("--start-maximized")  # Start maximized to ensure all elements are visible
-        if headless:
-            self.options.add_argument("--headless")
-            self.options.add_argument("--disable-gpu")
-            self.options.add_argument("--window-size=1920,1080")
-
-        # Initialize the ChromeDriver once and reuse it
+        self._owns_driver = driver is None
+        if driver is not None:
+            self.driver = driver
+            return
+
         try:
-            self.driver = uc.Chrome(options=self.options)
+            self.driver = launch_chrome(headless)
             logger.info("✅ ChromeDriver initialized successfully.")
         except Exception as e:
             logger.exception(f"❌ Failed to initialize ChromeDriver: {e}")
@@ -46,19 +57,29 @@ class PartSelectScraper:
 
     def close(self):
         """
-        Closes the ChromeDriver instance.
+        Closes the ChromeDriver instance, unless it is owned by the browser pool.
         """
+        if not self._owns_driver:
+            return
         try:
             self.driver.quit()
             logger.info("✅ ChromeDriver closed successfully.")
         except Exception as e:
             logger.exception(f"❌ Failed to close ChromeDriver: {e}")
 
-    def scrape_partselect(self, url):
+    def scrape_partselect(self, url, single_pass=True, sections=None):
         """
         Scrapes product details from a PartSelect URL.
         Returns structured JSON data.
+
+        With single_pass=True the driver is only used for navigation and expansion clicks;
+        the sections are parsed from one page_source snapshot instead of one WebDriver
+        round trip per element.
+
+        `sections` limits scraping to a subset of static_scraper.PRODUCT_SECTIONS
+        (default: all); sections that aren't needed are neither expanded nor extracted.
         """
+        sections = list(PRODUCT_SECTIONS) if sections is None else list(sections)
         product_data = {}
         try:
             self.driver.get(url)
@@ -67,23 +88,32 @@ class PartSelectScraper:
             # Handle potential pop-ups or modals
             self.close_popup(wait)
 
-            # Scroll to bottom to load dynamic content
-            self.scroll_to_bottom()
+            # Scroll to bottom to load dynamic content (only the Q&A section needs it)
+            if "qna" in sections:
+                self.scroll_to_bottom()
+
+            if single_pass:
+                product_data.update(self.extract_from_page_source(wait, url, sections))
+                return product_data
 
             # Extract basic product info
             product_data.update(self.extract_basic_info(wait, url))
 
             # Extract full description
-            product_data["full_description"] = self.extract_full_description(wait)
+            if "description" in sections:
+                product_data["full_description"] = self.extract_full_description(wait)
 
             # Extract troubleshooting info
-            product_data["troubleshooting_info"] = self.extract_troubleshooting_info(wait)
+            if "troubleshooting" in sections:
+                product_data["troubleshooting_info"] = self.extract_troubleshooting_info(wait)
 
             # Extract model compatibility
-            product_data["model_compatibility"] = self.extract_model_compatibility(wait)
+            if "model_compatibility" in sections:
+                product_data["model_compatibility"] = self.extract_model_compatibility(wait)
 
             # Extract Q&A
-            product_data["qna"] = self.extract_qna(wait)
+            if "qna" in sections:
+                product_data["qna"] = self.extract_qna(wait)
 
             product_data["product_page"] = url
 
@@ -91,8 +121,8 @@ class PartSelectScraper:
             logger.exception(f"❌ Scraping failed for URL {url}: {e}")
             product_data = {"error": "Scraping failed due to an unexpected error."}
         finally:
-            # Optional: Keep the browser open for reuse
-            pass  # Comment out or implement browser pooling as needed
+            # Record blocked requests for this page and pick up newly seen third-party hosts
+            resource_blocker.collect(self.driver)
 
         return product_data
 
@@ -104,8 +134,8 @@ class PartSelectScraper:
             decline_button = wait.until(EC.element_to_be_clickable(
                 (By.XPATH, "//button[@type='reset' and @data-click='close']")))
             decline_button.click()
+            wait_for_invisible(self.driver, decline_button, EXPAND_TIMEOUT, name="popup_closed")
             logger.info("✅ Popup closed successfully.")
-            time.sleep(1)  # Brief pause to ensure the popup is closed
         except TimeoutException:
             logger.info("ℹ️ No popup detected.")
         except Exception as e:
@@ -117,11 +147,67 @@ class PartSelectScraper:
         """
         try:
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)  # Brief pause to allow content to load
+            wait_for_network_idle(self.driver, name="scroll_lazy_load")  # Let lazy-loaded content arrive
             logger.info("✅ Scrolled to bottom of the page.")
         except Exception as e:
             logger.warning(f"⚠️ Scrolling failed: {e}")
 
+    def expand_section(self, wait, section_id, label):
+        """
+        Scrolls to a collapsible section header and expands it if it is collapsed.
+        """
+        header = self.driver.find_element(By.ID, section_id)
+        self.driver.execute_script("arguments[0].scrollIntoView();", header)
+        if header.get_attribute("aria-expanded") == "false":
+            header.click()
+            if wait_for_attribute(self.driver, (By.ID, section_id), "aria-expanded", "true",
+                                  name="section_expanded"):
+                logger.info(f"✅ {label} section expanded.")
+            else:
+                logger.warning(f"⚠️ {label} section did not report as expanded.")
+
+    def extract_from_page_source(self, wait, url, sections):
+        """
+        Expands the requested sections, then parses all of them from a single page_source
+        snapshot. Q&A pages after the first are harvested by qna_fetcher, not clicked through.
+        """
+        for section in sections:
+            section_id, label = SECTION_HEADERS[section]
+            try:
+                self.expand_section(wait, section_id, label)
+            except (NoSuchElementException, TimeoutException) as e:
+                logger.warning(f"⚠️ Could not expand {label} section: {e}")
+
+        crossref_complete = "model_compatibility" in sections and self.load_full_crossref()
+
+        page_source = self.driver.page_source
+        html_archive.store_render(url, page_source)
+        product_data = parse_product_html(page_source, url, sections)
+        if crossref_complete:
+            product_data["model_compatibility_complete"] = True
+        logger.info(f"✅ Extracted product data from page source (sections: {', '.join(sections)}).")
+        return product_data
+
+    def load_full_crossref(self, max_scrolls: int = CROSSREF_MAX_SCROLLS) -> bool:
+        """
+        Scrolls the model cross-reference list until no more rows load. Returns True only when
+        a scroll loaded nothing, i.e. the end of the list was seen.
+        """
+        try:
+            for _ in range(max_scrolls):
+                rows = self.driver.execute_script(CROSSREF_SCROLL_SCRIPT)
+                if rows < 0:
+                    return False
+                wait_for_network_idle(self.driver, name="crossref_scroll")
+                if self.driver.execute_script(CROSSREF_COUNT_SCRIPT) == rows:
+                    logger.info(f"✅ Loaded the full cross-reference list ({rows} models).")
+                    return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not scroll the cross-reference list: {e}")
+            return False
+        logger.info(f"ℹ️ Cross-reference list still growing after {max_scrolls} scrolls.")
+        return False
+
     def extract_basic_info(self, wait, url):
         """
         Extracts basic product information.
@@ -137,6 +223,8 @@ class PartSelectScraper:
                 "model_type": main_div.get_attribute("data-modeltype"),
                 "category": main_div.get_attribute("data-category"),
             })
+            mpn_elements = self.driver.find_elements(By.CSS_SELECTOR, "[itemprop='mpn']")
+            product_data["manufacturer_part_number"] = (mpn_elements[0].text.strip() or None) if mpn_elements else None
             logger.info("✅ Extracted basic product information.")
         except NoSuchElementException as e:
             logger.warning(f"⚠️ Basic product info extraction failed: {e}")
@@ -153,12 +241,7 @@ class PartSelectScraper:
         product_description = "No description available."
         try:
             # Ensure the Product Description section is expanded
-            description_header = self.driver.find_element(By.ID, "ProductDescription")
-            self.driver.execute_script("arguments[0].scrollIntoView();", description_header)
-            if description_header.get_attribute("aria-expanded") == "false":
-                description_header.click()
-                wait.until(EC.attribute_to_be((By.ID, "ProductDescription"), "aria-expanded", "true"))
-                logger.info("✅ Product Description section expanded.")
+            self.expand_section(wait, "ProductDescription", "Product Description")
 
             description_element = wait.until(EC.presence_of_element_located(
                 (By.XPATH, "//div[@itemprop='description']")))
@@ -176,12 +259,7 @@ class PartSelectScraper:
         """
         troubleshooting_info = {}
         try:
-            troubleshooting_header = self.driver.find_element(By.ID, "Troubleshooting")
-            self.driver.execute_script("arguments[0].scrollIntoView();", troubleshooting_header)
-            if troubleshooting_header.get_attribute("aria-expanded") == "false":
-                troubleshooting_header.click()
-                wait.until(EC.attribute_to_be((By.ID, "Troubleshooting"), "aria-expanded", "true"))
-                logger.info("✅ Troubleshooting section expanded.")
+            self.expand_section(wait, "Troubleshooting", "Troubleshooting")
 
             troubleshooting_element = wait.until(EC.presence_of_element_located(
                 (By.XPATH, "//div[@id='Troubleshooting']/following-sibling::div")))
@@ -228,50 +306,13 @@ class PartSelectScraper:
         """
         model_compatibility = []
         try:
-            model_compatibility_header = self.driver.find_element(By.ID, "ModelCrossReference")
-            self.driver.execute_script("arguments[0].scrollIntoView();", model_compatibility_header)
-            if model_compatibility_header.get_attribute("aria-expanded") == "false":
-                model_compatibility_header.click()
-                wait.until(EC.attribute_to_be((By.ID, "ModelCrossReference"), "aria-expanded", "true"))
-                logger.info("✅ Model Compatibility section expanded.")
+            self.expand_section(wait, "ModelCrossReference", "Model Compatibility")
 
             model_compatibility_element = wait.until(EC.presence_of_element_located(
                 (By.XPATH, "//div[@id='ModelCrossReference']/following-sibling::div")))
-            model_compatibility_text = model_compatibility_element.text.strip()
-
-            # Parse Model Compatibility into a list of dictionaries
-            lines = model_compatibility_text.split('\n')
-
-            # Identify the start of model data by finding the line after headers
-            try:
-                headers_index = lines.index("Description")
-                data_lines = lines[headers_index + 1:]
-            except ValueError:
-                # If "Description" is not found, assume data starts after first 3 lines
-                data_lines = lines[3:] if len(lines) > 3 else []
-
-            # Iterate through the data in chunks of 3 lines (Brand, Model Number, Description)
-            for i in range(0, len(data_lines), 3):
-                try:
-                    brand = data_lines[i].strip()
-                    model_number = data_lines[i + 1].strip()
-                    description = data_lines[i + 2].strip()
-
-                    # Skip if any field is missing
-                    if not brand or not model_number or not description:
-                        continue
-
-                    # Clean up description
-                    description = description.replace("- REFRIGERATOR", "").strip()
-
-                    model_compatibility.append({
-                        "brand": brand,
-                        "model_number": model_number,
-                        "description": description
-                    })
-                except IndexError:
-                    # Incomplete data; skip
-                    continue
+            # Parse the table rows from the section's HTML (one round trip) instead of its text
+            section_html = model_compatibility_element.get_attribute("outerHTML")
+            model_compatibility = list(iter_model_compatibility(make_soup(section_html)))
 
             logger.info("✅ Extracted model compatibility information.")
         except (NoSuchElementException, TimeoutException) as e:
@@ -284,83 +325,36 @@ class PartSelectScraper:
 
     def extract_qna(self, wait):
         """
-        Extracts Q&A pairs from the product page.
+        Extracts the Q&A pairs on the first page of the product page's Q&A section.
         """
         qna = []
         try:
             # Ensure the Q&A section is expanded
-            qna_header = self.driver.find_element(By.ID, "QuestionsAndAnswers")
-            self.driver.execute_script("arguments[0].scrollIntoView();", qna_header)
-            if qna_header.get_attribute("aria-expanded") == "false":
-                qna_header.click()
-                wait.until(EC.attribute_to_be((By.ID, "QuestionsAndAnswers"), "aria-expanded", "true"))
-                logger.info("✅ Q&A section expanded.")
+            self.expand_section(wait, "QuestionsAndAnswers", "Q&A")
 
             # Wait for Q&A content to load
             qna_container = wait.until(EC.presence_of_element_located(
                 (By.ID, "QuestionsAndAnswersContent")))
             
-            # Function to extract Q&A from the current page
-            def extract_qna_from_page():
-                qna_elements = qna_container.find_elements(By.CLASS_NAME, "qna__question")
-                for qna_element in qna_elements:
-                    try:
-                        # Extract question
-                        question_text_element = qna_element.find_element(By.CLASS_NAME, "js-searchKeys")
-                        question_text = question_text_element.text.strip()
-
-                        # Extract answer
-                        answer_element = qna_element.find_element(By.CSS_SELECTOR, "div.qna__ps-answer__msg > div.js-searchKeys")
-                        answer_text = answer_element.text.strip()
-
-                        qna.append({
-                            "question": question_text,
-                            "answer": answer_text
-                        })
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to extract a Q&A pair: {e}")
-                        continue
-
-            # Extract Q&A from the first page
-            extract_qna_from_page()
-
-            # Handle pagination (if multiple pages exist)
-            page_number = 1
-            max_pages = 2  # Prevent infinite loops
-
-            while page_number < max_pages:
+            # Only the first page is read here; later pages are harvested by qna_fetcher
+            qna_elements = qna_container.find_elements(By.CLASS_NAME, "qna__question")
+            for qna_element in qna_elements:
                 try:
-                    # Get the first question's text to detect page change
-                    first_qna_element = qna_container.find_element(By.CLASS_NAME, "qna__question")
-                    first_question_text = first_qna_element.find_element(By.CLASS_NAME, "js-searchKeys").text.strip()
-
-                    # Find the 'Next' button within the current Q&A container using flexible XPath
-                    next_button = qna_container.find_element(By.XPATH, ".//ul[contains(@class, 'pagination') and contains(@class, 'js-pagination')]//li[contains(@class, 'next')]")
-                    
-                    # Check if 'Next' button is disabled
-                    if "disabled" in next_button.get_attribute("class"):
-                        logger.info("✅ No more Q&A pages to navigate.")
-                        break
-                    else:
-                        # Click the 'Next' button
-                        next_button.click()
-                        logger.info(f"➡️ Navigated to Q&A page {page_number + 1}.")
-                        
-                        # Wait for the first question's text to change, indicating a new page
-                        wait.until(lambda d: qna_container.find_element(By.CLASS_NAME, "qna__question").find_element(By.CLASS_NAME, "js-searchKeys").text.strip() != first_question_text)
-                        
-                        # Small delay to ensure content has loaded
-                        time.sleep(1)
-
-                        # Extract Q&A from the new page
-                        extract_qna_from_page()
-                        page_number += 1
-                except (NoSuchElementException, TimeoutException) as e:
-                    logger.info(f"✅ No further Q&A pages found: {e}")
-                    break
+                    # Extract question
+                    question_text_element = qna_element.find_element(By.CLASS_NAME, "js-searchKeys")
+                    question_text = question_text_element.text.strip()
+
+                    # Extract answer
+                    answer_element = qna_element.find_element(By.CSS_SELECTOR, "div.qna__ps-answer__msg > div.js-searchKeys")
+                    answer_text = answer_element.text.strip()
+
+                    qna.append({
+                        "question": question_text,
+                        "answer": answer_text
+                    })
                 except Exception as e:
-                    logger.warning(f"⚠️ Pagination handling failed: {e}")
-                    break
+                    logger.warning(f"⚠️ Failed to extract a Q&A pair: {e}")
+                    continue
 
             logger.info(f"✅ Extracted {len(qna)} Q&A pairs.")
 
@@ -372,26 +366,54 @@ class PartSelectScraper:
             qna = []
         return qna
 
-def scrape_partselect(url: str, headless: bool = False) -> dict:
+def scrape_partselect(url: str, headless: bool = False, use_pool: bool = True, prefer_static: bool = True,
+                      sections=None) -> dict:
     """
     Standalone function to scrape PartSelect product details.
     
     Args:
         url (str): The PartSelect product URL.
         headless (bool): Whether to run Chrome in headless mode. Default is False.
+        use_pool (bool): Whether to check a warm driver out of the shared browser pool
+            instead of launching a dedicated Chrome. Default is True.
+        prefer_static (bool): Whether to try a plain HTTP fetch + HTML parse first and only
+            start Chrome when the static page is unusable. Default is True.
+        sections (iterable): Subset of static_scraper.PRODUCT_SECTIONS to scrape
+            ("description", "troubleshooting", "model_compatibility", "qna"). Default is all.
+            With "qna", only the first Q&A page is returned; the rest is harvested by
+            qna_fetcher in the background.
     
     Returns:
         dict: Scraped product data in JSON-like dictionary format.
     """
-    scraper = PartSelectScraper(headless=headless)
-    try:
-        extracted_data = scraper.scrape_partselect(url)
-    finally:
-        scraper.close()
-    
+    extracted_data = None
+    if prefer_static:
+        extracted_data = scrape_product_static(url, sections)
+        if extracted_data is None:
+            logger.info(f"ℹ️ Falling back to Selenium for {url}")
+
+    if extracted_data is None and use_pool:
+        with get_pool(headless).checkout() as driver:
+            extracted_data = PartSelectScraper(driver=driver).scrape_partselect(url, sections=sections)
+    elif extracted_data is None:
+        scraper = PartSelectScraper(headless=headless)
+        try:
+            extracted_data = scraper.scrape_partselect(url, sections=sections)
+        finally:
+            scraper.close()
+
+    # The Q&A pages are harvested in the background and indexed as they arrive;
+    # the pager's item count lets the harvest fetch the remaining pages in parallel
+    qna_meta = extracted_data.pop("qna_meta", None) or {}
+    if (sections is None or "qna" in sections) and "error" not in extracted_data:
+        qna_fetcher.submit(url, extracted_data.get("inventory_id") or qna_meta.get("inventory_id"),
+                           total_items=qna_meta.get("total_items"),
+                           page_size=qna_meta.get("page_size") or QNA_PAGE_SIZE)
+
     return extracted_data
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     test_url = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
     extracted_data = scrape_partselect(test_url, headless=False)  # Set headless=False to match original behavior
 
@@ -0,0 +1,200 @@
+# qna_fetcher.py
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from static_scraper import session, make_soup, parse_qna_items, parse_qna_meta, FETCH_TIMEOUT
+from ingestion_worker import ingestion_worker
+
+logger = logging.getLogger("QnAFetcher")
+
+# The Q&A pager reloads the section from the product page itself with these query parameters
+# (inferred from the pager's data-handler / data-inventory-id / data-page-size attributes).
+# Pages are read oldest first: new questions are appended to the last page instead of
+# shifting every page, as they do under the page's default "Most Helpful" (rating) order,
+# so a harvest can resume from the page it stopped at.
+QNA_URL_TEMPLATE = os.getenv(
+    "QNA_URL_TEMPLATE",
+    "{product_url}?currentPage={page}&inventoryID={inventory_id}&handler=QuestionsAndAnswers"
+    "&pageSize={page_size}&sortColumn=date&sortOrder=asc"
+)
+QNA_PAGE_SIZE = int(os.getenv("QNA_PAGE_SIZE", "10"))
+QNA_FETCH_WORKERS = int(os.getenv("QNA_FETCH_WORKERS", "4"))
+QNA_MAX_PAGES = int(os.getenv("QNA_MAX_PAGES", "50"))
+QNA_PROGRESS_PATH = os.getenv("QNA_PROGRESS_PATH", "qna_progress.sqlite3")
+
+
+class QnAProgress:
+    """
+    Remembers, per part, the last Q&A page harvested and the total item count seen,
+    so refreshes continue where the previous harvest stopped.
+    """
+
+    def __init__(self, path: str = QNA_PROGRESS_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS qna_progress ("
+            "inventory_id TEXT PRIMARY KEY, last_page INTEGER NOT NULL, total_items INTEGER, "
+            "updated_at REAL NOT NULL)"
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Progress used to be counted in rating order, whose pages don't line up with date order
+            self._conn.execute("DELETE FROM qna_progress")
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+
+    def get(self, inventory_id: str) -> tuple:
+        """
+        Returns (last_page, total_items) for a part, or (0, None) if it was never harvested.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_page, total_items FROM qna_progress WHERE inventory_id = ?",
+                (inventory_id,)).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def save(self, inventory_id: str, last_page: int, total_items: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO qna_progress (inventory_id, last_page, total_items, updated_at) "
+                "VALUES (?, ?, ?, ?)", (inventory_id, last_page, total_items, time.time()))
+            self._conn.commit()
+
+
+class QnAFetcher:
+    """
+    Harvests all Q&A pages of a part by calling the pager's request directly instead of
+    clicking through the section in Chrome.
+
+    Pages are fetched QNA_FETCH_WORKERS at a time. Each page's pairs are handed to the
+    ingestion worker as soon as it arrives, and the last contiguous page is saved per part so
+    a later refresh only fetches pages it hasn't seen yet.
+    """
+
+    def __init__(self, url_template: str = QNA_URL_TEMPLATE, workers: int = QNA_FETCH_WORKERS,
+                 max_pages: int = QNA_MAX_PAGES, progress: QnAProgress = None):
+        self.url_template = url_template
+        self.workers = workers
+        self.max_pages = max_pages
+        self.progress = progress or QnAProgress()
+        self._pages = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qna-page")
+        self._harvests = ThreadPoolExecutor(max_workers=2, thread_name_prefix="qna-harvest")
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._stats = {"harvests": 0, "pages": 0, "pairs": 0, "failed_pages": 0}
+
+    def page_url(self, product_url: str, inventory_id: str, page: int, page_size: int) -> str:
+        base_url = product_url.split("?")[0].split("#")[0]
+        return self.url_template.format(product_url=base_url, page=page,
+                                        inventory_id=inventory_id, page_size=page_size)
+
+    def fetch_page(self, product_url: str, inventory_id: str, page: int, page_size: int) -> tuple:
+        """
+        Fetches one Q&A page. Returns (pairs, meta); pairs is None when the request failed.
+        """
+        url = self.page_url(product_url, inventory_id, page, page_size)
+        try:
+            response = session.get(url, headers={"X-Requested-With": "XMLHttpRequest"}, timeout=FETCH_TIMEOUT)
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Q&A page {page} request failed for {inventory_id}: {e}")
+            return None, {}
+        if response.status_code != 200:
+            logger.warning(f"⚠️ HTTP {response.status_code} fetching Q&A page {page} for {inventory_id}")
+            return None, {}
+        soup = make_soup(response.text)
+        return parse_qna_items(soup), parse_qna_meta(soup)
+
+    def harvest(self, product_url: str, inventory_id: str, total_items: int = None,
+                page_size: int = QNA_PAGE_SIZE) -> int:
+        """
+        Fetches the part's Q&A pages after the last one harvested, streaming each page's pairs
+        to the ingestion worker. Returns the number of pairs found.
+
+        `total_items` is the live count from the product page, if the caller has it. Without it,
+        the first page after the saved one is always requested, so newly added Q&A is noticed.
+        """
+        last_page, _ = self.progress.get(inventory_id)
+        pairs_found = 0
+        # The last harvested page may have been partly filled, so it is fetched again. Page 1
+        # is fetched too: the product page shows the first page in rating order, not date order
+        page = max(last_page, 1)
+        seen_first_questions = set()
+        finished = False
+        while not finished and page <= self.max_pages:
+            total_pages = math.ceil(total_items / page_size) if total_items else None
+            if total_pages is not None and page > total_pages:
+                break
+            # Until the total is known, probe one page: its pager tells how many pages there are
+            batch_end = min(page + (self.workers if total_pages is not None else 1), self.max_pages + 1)
+            if total_pages is not None:
+                batch_end = min(batch_end, total_pages + 1)
+            batch = list(range(page, batch_end))
+            futures = [self._pages.submit(self.fetch_page, product_url, inventory_id, p, page_size) for p in batch]
+
+            # Results are consumed in page order, so last_page only advances over contiguous pages
+            for p, future in zip(batch, futures):
+                pairs, meta = future.result()
+                if pairs is None:
+                    self._count("failed_pages")
+                    finished = True
+                    break
+                total_items = meta.get("total_items") or total_items
+                # An empty page, or a repeat of an earlier one, means we ran past the end
+                if not pairs or pairs[0]["question"] in seen_first_questions:
+                    finished = True
+                    break
+                seen_first_questions.add(pairs[0]["question"])
+                ingestion_worker.submit({"product_page": product_url, "inventory_id": inventory_id, "qna": pairs})
+                self._count("pages")
+                self._count("pairs", len(pairs))
+                pairs_found += len(pairs)
+                last_page = p
+            for future in futures:
+                future.cancel()
+            self.progress.save(inventory_id, last_page, total_items)
+            page = batch_end
+
+        logger.info(f"✅ Harvested {pairs_found} Q&A pairs for part {inventory_id} (through page {last_page}).")
+        return pairs_found
+
+    def submit(self, product_url: str, inventory_id: str, total_items: int = None,
+               page_size: int = QNA_PAGE_SIZE) -> bool:
+        """
+        Starts a background harvest for a part unless one is already running.
+        """
+        if not product_url or not inventory_id:
+            return False
+        with self._lock:
+            if inventory_id in self._inflight:
+                return False
+            self._inflight.add(inventory_id)
+            self._stats["harvests"] += 1
+
+        def run():
+            try:
+                self.harvest(product_url, inventory_id, total_items, page_size)
+            except Exception as e:
+                logger.exception(f"❌ Q&A harvest failed for part {inventory_id}: {e}")
+            finally:
+                with self._lock:
+                    self._inflight.discard(inventory_id)
+
+        self._harvests.submit(run)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "running": len(self._inflight)}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+
+qna_fetcher = QnAFetcher()
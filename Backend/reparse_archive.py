@@ -0,0 +1,80 @@
+# reparse_archive.py
+"""
+Re-parses every page in the HTML archive with the current extraction logic, without
+touching the site. Pages are parsed in parallel worker processes.
+
+    python reparse_archive.py --output reparsed.jsonl
+    python reparse_archive.py --index   # also re-index the results into the vector store
+"""
+
+import os
+import json
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from html_archive import html_archive, read_object
+from static_scraper import parse_product_html, parse_symptom_html
+
+logger = logging.getLogger("ReparseArchive")
+
+SYMPTOM_PARTS_PER_PAGE = int(os.getenv("SYMPTOM_PARTS_PER_PAGE", "3"))
+
+
+def parse_archived_page(entry: tuple) -> dict:
+    """
+    Parses one archived page, choosing the parser from the URL. Runs in a worker process.
+    """
+    url, path = entry
+    html = read_object(path)
+    if html is None:
+        return None
+    if "/Symptoms/" in url:
+        data = parse_symptom_html(html, url, limit=SYMPTOM_PARTS_PER_PAGE)
+        return data if data.get("common_parts") else None
+    data = parse_product_html(html, url)
+    data.pop("qna_meta", None)
+    return None if "error" in data else data
+
+
+def reparse_archive(workers: int = None):
+    """
+    Yields the parsed data of every archived page that still parses.
+    """
+    entries = html_archive.entries()
+    logger.info(f"🔁 Re-parsing {len(entries)} archived pages.")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for data in executor.map(parse_archived_page, entries, chunksize=8):
+            if data:
+                yield data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse the HTML archive offline.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--output", help="write one JSON document per page to this file")
+    parser.add_argument("--index", action="store_true", help="upsert the results into the vector store")
+    args = parser.parse_args()
+
+    if args.index:
+        from vector_manager import live_store, build_documents
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    parsed = 0
+    try:
+        for data in reparse_archive(args.workers):
+            parsed += 1
+            if output:
+                output.write(json.dumps(data) + "\n")
+            if args.index:
+                added, skipped = live_store.upsert_documents(build_documents(data))
+                logger.info(f"✅ Re-indexed {data.get('product_page') or data.get('product_url')}: "
+                            f"{added} new, {skipped} unchanged.")
+    finally:
+        if output:
+            output.close()
+    logger.info(f"✅ Re-parsed {parsed} pages.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,196 @@
+# resource_blocker.py
+
+import os
+import json
+import logging
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+logger = logging.getLogger("ResourceBlocker")
+
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")
+BLOCK_THIRD_PARTY = os.getenv("BLOCK_THIRD_PARTY", "true").lower() in ("1", "true", "yes")
+# Hosts (or host suffixes) that are never blocked; the site itself and the script CDNs its widgets need
+RESOURCE_ALLOWLIST = [
+    host.strip().lower() for host in os.getenv(
+        "RESOURCE_ALLOWLIST",
+        "partselect.com,ajax.googleapis.com,code.jquery.com,cdnjs.cloudflare.com,cdn.jsdelivr.net"
+    ).split(",") if host.strip()
+]
+MAX_LEARNED_HOSTS = int(os.getenv("RESOURCE_MAX_LEARNED_HOSTS", "200"))
+# Only hosts that served these resource types are learned. A host serving scripts, XHR or
+# stylesheets may be what renders a section, and blocking it would break later pages
+LEARNED_RESOURCE_TYPES = {
+    resource_type.strip() for resource_type in os.getenv(
+        "RESOURCE_LEARNED_TYPES", "Image,Font,Media").split(",") if resource_type.strip()
+}
+
+# Non-essential resources: images, fonts, media, and well-known trackers, ads and chat widgets
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*googleadservices.com*", "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*bing.com*",
+    "*clarity.ms*", "*criteo.*", "*taboola.com*", "*outbrain.com*", "*pinterest.com*", "*tiktok.com*",
+    "*livechatinc.com*", "*zendesk.com*", "*zopim.com*", "*intercom.io*", "*olark.com*",
+]
+
+# Typical transfer size per CDP resource type, used until real sizes have been observed
+DEFAULT_RESOURCE_BYTES = {
+    "Image": 30_000,
+    "Font": 40_000,
+    "Media": 200_000,
+    "Script": 50_000,
+    "Stylesheet": 20_000,
+}
+FALLBACK_RESOURCE_BYTES = 10_000
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _is_allowed(host: str, allowlist: list) -> bool:
+    return any(host == allowed or host.endswith("." + allowed) for allowed in allowlist)
+
+
+class ResourceBlocker:
+    """
+    Blocks non-essential requests in scraper Chrome sessions through the DevTools protocol
+    (Network.setBlockedURLs).
+
+    Besides the static patterns, third-party hosts that served images, fonts or media on
+    earlier pages are learned from the performance log and blocked on later pages, unless they
+    are on the allowlist; trackers are covered by the static patterns. The same log
+    gives per-page counters of blocked requests and an estimate of the bytes saved.
+    """
+
+    def __init__(self, enabled: bool = BLOCK_RESOURCES, allowlist: list = None,
+                 patterns: list = None, block_third_party: bool = BLOCK_THIRD_PARTY,
+                 learned_types: set = None):
+        self.enabled = enabled
+        self.allowlist = RESOURCE_ALLOWLIST if allowlist is None else allowlist
+        self.patterns = BLOCKED_URL_PATTERNS if patterns is None else patterns
+        self.block_third_party = block_third_party
+        self.learned_types = LEARNED_RESOURCE_TYPES if learned_types is None else learned_types
+        self._lock = threading.Lock()
+        self._learned_hosts = set()
+        self._observed_bytes = {}  # resource type -> (total bytes, count) of requests that did load
+        self._pages = deque(maxlen=20)
+        self._totals = {"pages": 0, "blocked_requests": 0, "bytes_saved_estimate": 0}
+
+    def configure_options(self, options):
+        """
+        Enables Chrome's performance log, which collect() reads the network events from.
+        """
+        if self.enabled:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return options
+
+    def blocked_urls(self) -> list:
+        with self._lock:
+            return self.patterns + [f"*://{host}/*" for host in sorted(self._learned_hosts)]
+
+    def _apply(self, driver):
+        """
+        Sends the current block list to a driver and remembers how many learned hosts it has.
+        """
+        urls = self.blocked_urls()
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+        driver._blocked_host_count = len(urls) - len(self.patterns)
+
+    def install(self, driver):
+        """
+        Turns on request blocking for a freshly launched driver.
+        """
+        if not self.enabled:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            self._apply(driver)
+            logger.info("✅ Resource blocking enabled for ChromeDriver.")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not enable resource blocking: {e}")
+
+    def _estimate_bytes(self, resource_type: str) -> int:
+        total, count = self._observed_bytes.get(resource_type, (0, 0))
+        if count:
+            return total // count
+        return DEFAULT_RESOURCE_BYTES.get(resource_type, FALLBACK_RESOURCE_BYTES)
+
+    def collect(self, driver) -> dict:
+        """
+        Reads the network events since the last call, records the page's blocked requests and
+        estimated bytes saved, learns new third-party hosts and re-applies the block list.
+        Returns the page counters.
+        """
+        if not self.enabled:
+            return {}
+        try:
+            page_url = driver.current_url
+            entries = driver.get_log("performance")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read performance log: {e}")
+            return {}
+
+        requests = {}
+        blocked = []
+        new_hosts = set()
+        with self._lock:
+            for entry in entries:
+                try:
+                    message = json.loads(entry["message"])["message"]
+                except (KeyError, ValueError):
+                    continue
+                method, params = message.get("method"), message.get("params", {})
+                if method == "Network.requestWillBeSent":
+                    url = params.get("request", {}).get("url", "")
+                    requests[params.get("requestId")] = (url, params.get("type", "Other"))
+                elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                    blocked.append(params.get("type") or requests.get(params.get("requestId"), ("", "Other"))[1])
+                elif method == "Network.loadingFinished" and params.get("requestId") in requests:
+                    url, resource_type = requests[params["requestId"]]
+                    total, count = self._observed_bytes.get(resource_type, (0, 0))
+                    self._observed_bytes[resource_type] = (total + int(params.get("encodedDataLength", 0)), count + 1)
+                    host = _host(url)
+                    if (self.block_third_party and resource_type in self.learned_types and host
+                            and not _is_allowed(host, self.allowlist) and host not in self._learned_hosts
+                            and len(self._learned_hosts) + len(new_hosts) < MAX_LEARNED_HOSTS):
+                        new_hosts.add(host)
+
+            bytes_saved = sum(self._estimate_bytes(resource_type) for resource_type in blocked)
+            page = {"url": page_url, "blocked_requests": len(blocked), "bytes_saved_estimate": bytes_saved}
+            self._pages.append(page)
+            self._totals["pages"] += 1
+            self._totals["blocked_requests"] += len(blocked)
+            self._totals["bytes_saved_estimate"] += bytes_saved
+            self._learned_hosts.update(new_hosts)
+            learned_count = len(self._learned_hosts)
+
+        if new_hosts:
+            logger.info(f"🚫 Learned third-party hosts to block: {', '.join(sorted(new_hosts))}")
+        # Hosts may also have been learned by other drivers since this one was last updated
+        if getattr(driver, "_blocked_host_count", None) != learned_count:
+            try:
+                self._apply(driver)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not update blocked URLs: {e}")
+        logger.info(f"🚫 Blocked {len(blocked)} requests on {page_url} (~{bytes_saved // 1024} KB saved).")
+        return page
+
+    def stats(self) -> dict:
+        """
+        Returns totals, the most recent pages' counters and the learned hosts.
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                **self._totals,
+                "learned_hosts": sorted(self._learned_hosts),
+                "recent_pages": list(self._pages),
+            }
+
+
+resource_blocker = ResourceBlocker()
@@ -0,0 +1,429 @@
+# static_scraper.py
+
+import os
+import json
+import time
+import logging
+import requests
+from bs4 import BeautifulSoup
+from html_archive import html_archive, HTML_ARCHIVE_FRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = float(os.getenv("STATIC_FETCH_TIMEOUT", "10"))
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Shared session so repeated fetches reuse TCP/TLS connections
+session = requests.Session()
+session.headers.update(HEADERS)
+
+
+def fetch_html(url: str) -> str:
+    """
+    Fetches a PartSelect page over plain HTTP. Returns the HTML, or None on failure.
+
+    Pages go through the HTML archive: a recently validated copy is served without a request,
+    an older one is revalidated with If-None-Match / If-Modified-Since, and a fresh body is
+    archived. If the site can't be reached, the archived copy is served instead.
+    """
+    archived = html_archive.lookup(url)
+    archived_html = html_archive.read(archived["content_hash"]) if archived else None
+    if archived_html and time.time() - archived["validated_at"] < HTML_ARCHIVE_FRESH_SECONDS:
+        html_archive.count("fresh_hits")
+        return archived_html
+
+    headers = {}
+    if archived_html:
+        if archived["etag"]:
+            headers["If-None-Match"] = archived["etag"]
+        if archived["last_modified"]:
+            headers["If-Modified-Since"] = archived["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning(f"⚠️ HTTP fetch failed for {url}: {e}")
+        if archived_html:
+            html_archive.count("stale_served")
+        return archived_html
+
+    if response.status_code == 304 and archived_html:
+        html_archive.mark_validated(url)
+        html_archive.count("revalidated")
+        logger.info(f"✅ Archived copy of {url} is still current.")
+        return archived_html
+    if response.status_code != 200:
+        logger.warning(f"⚠️ HTTP {response.status_code} fetching {url}")
+        return None
+    html_archive.store(url, response.text, etag=response.headers.get("ETag"),
+                       last_modified=response.headers.get("Last-Modified"))
+    return response.text
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    """
+    Parses HTML with the fast lxml parser.
+    """
+    return BeautifulSoup(html, "lxml")
+
+
+def _text(el, separator=" ") -> str:
+    """
+    Returns the whitespace-normalized text of an element, or "" if it is missing.
+    """
+    if el is None:
+        return ""
+    if separator == "\n":
+        return el.get_text("\n", strip=True)
+    return " ".join(el.get_text(" ").split())
+
+
+# ============================
+# Product pages
+# ============================
+
+def parse_basic_info(soup) -> dict:
+    """
+    Extracts basic product information from the data attributes of div#main, plus the
+    manufacturer part number shown on the page.
+    """
+    main_div = soup.find(id="main")
+    if main_div is None:
+        logger.warning("⚠️ Basic product info extraction failed: no div#main")
+        return {"error": "No product details found."}
+    return {
+        "inventory_id": main_div.get("data-inventory-id"),
+        "description": main_div.get("data-description"),
+        "price": main_div.get("data-price"),
+        "brand": main_div.get("data-brand"),
+        "model_type": main_div.get("data-modeltype"),
+        "category": main_div.get("data-category"),
+        "manufacturer_part_number": _text(soup.find(attrs={"itemprop": "mpn"})) or None,
+    }
+
+
+def parse_full_description(soup) -> str:
+    """
+    Extracts the full product description.
+    """
+    description_element = soup.find("div", attrs={"itemprop": "description"})
+    description = _text(description_element)
+    return description or "No description available."
+
+
+def _section_content(soup, section_id):
+    """
+    Returns the content div that follows a collapsible section header.
+    """
+    header = soup.find(id=section_id)
+    if header is None:
+        return None
+    return header.find_next_sibling("div")
+
+
+def parse_troubleshooting_info(soup) -> dict:
+    """
+    Extracts troubleshooting information (symptoms, products, replaced part numbers).
+    """
+    content = _section_content(soup, "Troubleshooting")
+    if content is None:
+        return {}
+
+    symptoms = []
+    products = []
+    replacements = []
+    for block in content.find_all("div", recursive=False):
+        label_el = block.find("div", class_="bold")
+        if label_el is None:
+            continue
+        label = _text(label_el)
+        label_el.extract()
+        value = _text(block)
+        if label.startswith("This part fixes the following symptoms:"):
+            symptoms = value.split(" | ")
+        elif label.startswith("This part works with the following products:"):
+            products = value.split(" | ")
+        elif label.startswith("Part#"):
+            replacements = value.split(",")
+
+    return {
+        "symptoms": [s.strip() for s in symptoms if s.strip()],
+        "products": [p.strip() for p in products if p.strip()],
+        "replacements": [r.strip() for r in replacements if r.strip()]
+    }
+
+
+def parse_model_compatibility(soup) -> list:
+    """
+    Extracts the (brand, model number, description) rows of the model cross-reference table.
+    """
+    content = _section_content(soup, "ModelCrossReference")
+    if content is None:
+        return []
+    return list(iter_model_compatibility(content))
+
+
+def iter_model_compatibility(root):
+    """
+    Yields the cross-reference rows under `root` (the section content, or a fragment holding
+    the table) one at a time, reading each row's three cells instead of splitting the text of
+    the whole table.
+    """
+    for row in root.select(".pd__crossref__list .row"):
+        cells = row.find_all(["div", "a"], recursive=False)
+        if len(cells) < 3:
+            continue
+        brand = _text(cells[0])
+        model_number = _text(cells[1])
+        description = _text(cells[2]).replace("- REFRIGERATOR", "").strip()
+        if not brand or not model_number or not description:
+            continue
+        yield {
+            "brand": brand,
+            "model_number": model_number,
+            "description": description
+        }
+
+
+def parse_qna(soup) -> list:
+    """
+    Extracts the Q&A pairs rendered in the page (the first page of the Q&A section).
+    """
+    container = soup.find(id="QuestionsAndAnswersContent")
+    if container is None:
+        return []
+    return parse_qna_items(container)
+
+
+def parse_qna_meta(soup) -> dict:
+    """
+    Reads the inventory ID, total number of Q&A items and page size from the Q&A container.
+    Missing values are None.
+    """
+    container = soup.find(attrs={"data-handler": "QuestionsAndAnswers"})
+    if container is None:
+        return {"inventory_id": None, "total_items": None, "page_size": None}
+
+    def as_int(value):
+        return int(value) if value and value.isdigit() else None
+
+    return {
+        "inventory_id": container.get("data-inventory-id"),
+        "total_items": as_int(container.get("data-total-items")),
+        "page_size": as_int(container.get("data-page-size")),
+    }
+
+
+def parse_qna_items(root) -> list:
+    """
+    Extracts the Q&A pairs under an element, e.g. the Q&A container or a fetched Q&A page fragment.
+    """
+    qna = []
+    for qna_element in root.select(".qna__question"):
+        question_el = qna_element.find("div", class_="js-searchKeys")
+        answer_el = qna_element.select_one("div.qna__ps-answer__msg > div.js-searchKeys")
+        question = _text(question_el)
+        answer = _text(answer_el)
+        if question and answer:
+            qna.append({"question": question, "answer": answer})
+    return qna
+
+
+# Optional product page sections: name -> (result key, parser). Basic info is always extracted.
+PRODUCT_SECTIONS = {
+    "description": ("full_description", parse_full_description),
+    "troubleshooting": ("troubleshooting_info", parse_troubleshooting_info),
+    "model_compatibility": ("model_compatibility", parse_model_compatibility),
+    "qna": ("qna", parse_qna),
+}
+
+
+def parse_product_html(html: str, url: str, sections=None) -> dict:
+    """
+    Parses a PartSelect product page into the same dict shape as
+    PartSelectScraper.scrape_partselect. Only the requested sections
+    (default: all of PRODUCT_SECTIONS) are extracted. With "qna", the pager's item count
+    and page size are added under "qna_meta" for qna_fetcher.
+    """
+    soup = make_soup(html)
+    product_data = parse_basic_info(soup)
+    for section in PRODUCT_SECTIONS if sections is None else sections:
+        key, parser = PRODUCT_SECTIONS[section]
+        product_data[key] = parser(soup)
+        if section == "qna":
+            product_data["qna_meta"] = parse_qna_meta(soup)
+    product_data["product_page"] = url
+    return product_data
+
+
+# ============================
+# Symptom pages
+# ============================
+
+def parse_symptom_info(soup) -> dict:
+    """
+    Extracts top-level info such as the model number and symptom title.
+    """
+    main_el = soup.select_one("div#main")
+    if main_el is None:
+        return {}
+    return {
+        "model_number": main_el.get("data-model-num") or "",
+        "symptom_title": _text(main_el.select_one("h1.title-main")),
+    }
+
+
+def parse_part_details(row) -> tuple:
+    """
+    Extracts price, PartSelect #, manufacturer # and short description from a symptom row.
+    """
+    price = _text(row.select_one("span.price.pd__price span.js-partPrice"))
+    ps_number = _text(row.select_one("div.mt-3.mb-2.bold span.bold.text-teal"))
+    manufacturer_pn = _text(row.select_one("div.mb-2.bold span.bold.text-teal"))
+    description = _text(row.select_one("p.mb-4"))
+    return price, ps_number, manufacturer_pn, description
+
+
+def parse_story_details(story) -> dict:
+    """
+    Maps each detail LI of a repair story to author, difficulty, time or tools.
+    """
+    details = {}
+    for li in story.select("ul.repair-story__details li"):
+        svg_use = li.select_one("svg use")
+        value_el = li.find("div")
+        if svg_use is None or value_el is None:
+            continue
+        svg_href = svg_use.get("href") or svg_use.get("xlink:href") or ""
+        value_text = _text(value_el, "\n")
+        if "#profile" in svg_href:
+            details["author"] = value_text.split("\n")[-1]
+        elif "#difficulty" in svg_href:
+            details["difficulty"] = value_text.replace("Difficulty Level:", "").strip()
+        elif "#duration" in svg_href:
+            details["time"] = value_text.replace("Total Repair Time:", "").strip()
+        elif "#tools" in svg_href:
+            lines = value_text.split("\n")
+            if len(lines) > 1:
+                details["tools"] = [t.strip() for t in lines[-1].split(",")]
+    return details
+
+
+def parse_user_stories(row) -> list:
+    """
+    Extracts the repair stories of a symptom row. The full instruction text is part of the
+    static HTML, so no "Read more" expansion is needed.
+    """
+    stories = []
+    for story in row.select("div.repair-story"):
+        instruction_el = story.select_one("div.repair-story__instruction__content")
+        if instruction_el is not None:
+            for trigger in instruction_el.select("[data-collapse-trigger]"):
+                trigger.decompose()
+        title = _text(story.select_one("div.repair-story__title"))
+        instruction = _text(instruction_el)
+        details = parse_story_details(story)
+        if not any([title, instruction, details.get("author"), details.get("difficulty"),
+                    details.get("time"), details.get("tools")]):
+            continue
+        stories.append({
+            "title": title,
+            "instruction": instruction,
+            "author": details.get("author", ""),
+            "difficulty": details.get("difficulty", ""),
+            "time": details.get("time", ""),
+            "tools": details.get("tools", [])
+        })
+    return stories
+
+
+def parse_common_parts(soup, limit=1) -> list:
+    """
+    Extracts part listings and their repair stories from the symptom rows,
+    processing at most 'limit' rows.
+    """
+    parts = []
+    for row in soup.select("div.mb-5.symptoms.d-flex")[:limit]:
+        part_header = row.select_one("div.symptoms__header a")
+        if part_header is None:
+            continue
+        price, ps_number, manufacturer_pn, description = parse_part_details(row)
+        user_stories = parse_user_stories(row)
+        if not user_stories:
+            continue
+        parts.append({
+            "part_name": _text(part_header),
+            "part_url": part_header.get("href"),
+            "fix_percentage": _text(row.select_one("div.symptoms__percent span.bold")).replace("%", ""),
+            "price": price,
+            "part_number": ps_number,
+            "manufacturer_part_number": manufacturer_pn,
+            "description": description,
+            "user_stories": user_stories
+        })
+    return parts
+
+
+def parse_symptom_html(html: str, url: str, limit=1) -> dict:
+    """
+    Parses a PartSelect symptom page into the same dict shape as
+    SymptomScraper.scrape_symptom_page.
+    """
+    soup = make_soup(html)
+    data = {"product_url": url}
+    data.update(parse_symptom_info(soup))
+    data["common_parts"] = parse_common_parts(soup, limit=limit)
+    return data
+
+
+# ============================
+# HTTP-first entry points
+# ============================
+
+def scrape_product_static(url: str, sections=None) -> dict:
+    """
+    Fetches and parses a product page without a browser, extracting only the given sections.
+    Returns None when the page could not be fetched or does not look like a product page,
+    so the caller can fall back to Selenium.
+    """
+    html = fetch_html(url)
+    if not html:
+        return None
+    data = parse_product_html(html, url, sections)
+    if "error" in data:
+        logger.info(f"ℹ️ Static HTML for {url} has no product details, browser needed.")
+        return None
+    logger.info(f"✅ Scraped product page over HTTP: {url}")
+    return data
+
+
+def scrape_symptom_static(url: str, limit=1) -> dict:
+    """
+    Fetches and parses a symptom page without a browser.
+    Returns None when the page could not be fetched or no parts were found in the static HTML.
+    """
+    html = fetch_html(url)
+    if not html:
+        return None
+    data = parse_symptom_html(html, url, limit=limit)
+    if not data.get("common_parts"):
+        logger.info(f"ℹ️ Static HTML for {url} has no symptom parts, browser needed.")
+        return None
+    logger.info(f"✅ Scraped symptom page over HTTP: {url}")
+    return data
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    with open("debug_output.html", encoding="utf-8") as f:
+        saved_html = f.read()
+    test_url = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+    print(json.dumps(parse_product_html(saved_html, test_url), indent=4))
@@ -1,44 +1,57 @@
 # symptom_scraper.py
 
-import undetected_chromedriver as uc
-import time
+import os
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from browser_pool import get_pool, launch_chrome
+from resource_blocker import resource_blocker
+from html_archive import html_archive
+from waits import wait_for, wait_for_dom_quiet, wait_for_element_count, wait_for_invisible, EXPAND_TIMEOUT
+from static_scraper import scrape_symptom_static, parse_symptom_html
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - symptom_scraper - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("symptom_scraper.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+SYMPTOM_MAX_PAGES = int(os.getenv("SYMPTOM_MAX_PAGES", "3"))
+SYMPTOM_PARTS_PER_PAGE = int(os.getenv("SYMPTOM_PARTS_PER_PAGE", "3"))
+SYMPTOM_SCRAPE_WORKERS = int(os.getenv("SYMPTOM_SCRAPE_WORKERS", "3"))
+
+# Visible "Read more" links of collapsed repair stories
+READ_MORE_SELECTOR = "div.repair-story span[data-collapse-trigger='show-more'] span.bold.text-link.underline"
+
+# Clicks every visible "Read more" link in one round trip and returns how many were clicked
+EXPAND_ALL_JS = """
+var clicked = 0;
+document.querySelectorAll(arguments[0]).forEach(function(link) {
+    if (link.offsetParent !== null) { link.click(); clicked++; }
+});
+return clicked;
+"""
+
+COLLAPSED_COUNT_JS = """
+return Array.prototype.filter.call(document.querySelectorAll(arguments[0]),
+    function(link) { return link.offsetParent !== null; }).length;
+"""
+
 
 class SymptomScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, driver=None):
         """
-        Initializes undetected ChromeDriver with specified options.
+        Initializes the undetected ChromeDriver with specified options.
+        If a driver is passed in (e.g. checked out from the browser pool), it is reused
+        and left running on close().
         """
-        self.options = uc.ChromeOptions()
-        self.options.add_argument("--no-sandbox")
-        self.options.add_argument("--disable-blink-features=AutomationControlled")
-        self.options.add_argument("--disable-infobars")
-        self.options.add_argument("--disable-extensions")
-        self.options.add_argument("--start-maximized")
-        if headless:
-            self.options.add_argument("--headless")
-            self.options.add_argument("--disable-gpu")
-            self.options.add_argument("--window-size=1920,1080")
+        self._owns_driver = driver is None
+        if driver is not None:
+            self.driver = driver
+            return
 
         try:
-            self.driver = uc.Chrome(options=self.options)
+            self.driver = launch_chrome(headless)
             logger.info("✅ SymptomScraper: ChromeDriver initialized successfully.")
         except Exception as e:
             logger.exception(f"❌ Failed to initialize ChromeDriver: {e}")
@@ -46,18 +59,29 @@ class SymptomScraper:
 
     def close(self):
         """
-        Closes the ChromeDriver instance.
+        Closes the ChromeDriver instance, unless it is owned by the browser pool.
         """
+        if not self._owns_driver:
+            return
         try:
             self.driver.quit()
             logger.info("✅ SymptomScraper: ChromeDriver closed successfully.")
         except Exception as e:
             logger.exception(f"❌ Failed to close ChromeDriver: {e}")
 
-    def scrape_symptom_page(self, url: str):
+    def scrape_symptom_page(self, url: str, single_pass: bool = True, bulk_expand: bool = True, limit: int = 1):
         """
         Scrapes a PartSelect Symptom Page for structured data.
         Returns a dictionary with symptom info, common parts, user stories, etc.
+
+        With single_pass=True the rendered page_source is grabbed once and all sections are
+        parsed in memory, instead of one WebDriver round trip per element. The collapsed
+        story text is already in the DOM, so no "Read more" clicks are needed either.
+
+        In the per-element path, bulk_expand=True expands every story with one script and
+        one wait (see expand_all_read_more) instead of clicking each "Read more" in turn.
+
+        `limit` is the number of part rows to extract, in page order (highest fix rate first).
         """
         data = {}
         try:
@@ -67,23 +91,35 @@ class SymptomScraper:
             # Attempt to close any pop-up if it exists
             self.close_popup(wait)
 
-            # Wait for main content to load (adjust sleep as needed)
-            time.sleep(2)
+            # Wait for the symptom rows to render and the page to settle
+            wait_for_element_count(self.driver, "div.mb-5.symptoms.d-flex", 1, name="symptom_rows")
+            wait_for_dom_quiet(self.driver, name="symptom_page_render")
 
             data["product_url"] = url
 
+            if single_pass:
+                page_source = self.driver.page_source
+                html_archive.store_render(url, page_source)
+                data.update(parse_symptom_html(page_source, url, limit=limit))
+                logger.info(f"✅ Extracted {len(data['common_parts'])} common parts from page source.")
+                return data
+
             # Extract high-level info (model num, symptom title, etc.)
             data.update(self.extract_symptom_info(wait))
 
             # Extract each "symptoms__redesign" row for parts and user stories
             # Since we only want the first symptom section (highest fix_percentage),
             # we'll modify the method to return only the first one.
-            data["common_parts"] = self.extract_common_parts(wait, limit=1)
+            if bulk_expand:
+                self.expand_all_read_more()
+            data["common_parts"] = self.extract_common_parts(wait, limit=limit, expand_each=not bulk_expand)
 
         except Exception as e:
             logger.exception(f"❌ Scraping failed for Symptom Page {url}: {e}")
             data["error"] = f"Scraping failed: {e}"
-
+        finally:
+            # Record blocked requests for this page and pick up newly seen third-party hosts
+            resource_blocker.collect(self.driver)
 
         return data
 
@@ -97,8 +133,8 @@ class SymptomScraper:
                 EC.element_to_be_clickable((By.XPATH, "//button[@type='reset' and @data-click='close']"))
             )
             decline_btn.click()
+            wait_for_invisible(self.driver, decline_btn, EXPAND_TIMEOUT, name="popup_closed")
             logger.info("✅ Popup closed successfully.")
-            time.sleep(1)
         except TimeoutException:
             logger.info("ℹ️ No popup detected on this symptom page.")
         except Exception as e:
@@ -124,11 +160,12 @@ class SymptomScraper:
             logger.warning(f"⚠️ Failed to extract symptom info: {e}")
         return result
 
-    def extract_common_parts(self, wait, limit=1):
+    def extract_common_parts(self, wait, limit=1, expand_each=True):
         """
         Extracts part listings and associated user repair stories from the "symptoms__redesign" containers.
         Returns a list of part objects, each with user stories.
         Only processes up to 'limit' number of symptom_rows.
+        Set expand_each=False when the stories were already expanded with expand_all_read_more.
         """
         parts = []
         try:
@@ -156,7 +193,7 @@ class SymptomScraper:
                     price, ps_number, manufacturer_pn, description = self.extract_part_details(row)
 
                     # EXTRACT USER STORIES
-                    user_stories = self.extract_user_stories(row)
+                    user_stories = self.extract_user_stories(row, expand_each)
 
                     # Skip parts with no user stories
                     if not user_stories:
@@ -223,7 +260,7 @@ class SymptomScraper:
 
         return price, ps_number, manufacturer_pn, description
 
-    def extract_user_stories(self, row_el):
+    def extract_user_stories(self, row_el, expand_each=True):
         """
         Extracts user repair stories from the row element:
          .repair-story =>  .repair-story__title, .repair-story__instruction__content, .repair-story__details
@@ -234,7 +271,8 @@ class SymptomScraper:
             for s_el in story_elements:
                 try:
                     # Click "Read More" if exists to expand full instruction
-                    self.expand_read_more(s_el)
+                    if expand_each:
+                        self.expand_read_more(s_el)
 
                     # Title
                     story_title = s_el.find_element(By.CSS_SELECTOR, "div.repair-story__title").text.strip()
@@ -267,6 +305,23 @@ class SymptomScraper:
             pass
         return stories
 
+    def expand_all_read_more(self) -> int:
+        """
+        Clicks every collapsed story's "Read more" link with a single script, then waits once
+        until none is left visible. Returns the number of stories expanded.
+        """
+        try:
+            clicked = self.driver.execute_script(EXPAND_ALL_JS, READ_MORE_SELECTOR)
+        except Exception as e:
+            logger.warning(f"⚠️ Bulk 'Read more' expansion failed: {e}")
+            return 0
+        if clicked:
+            wait_for(self.driver, "read_more_bulk_expanded",
+                     lambda d: d.execute_script(COLLAPSED_COUNT_JS, READ_MORE_SELECTOR) == 0,
+                     EXPAND_TIMEOUT)
+        logger.info(f"✅ Expanded {clicked} user stories in one pass.")
+        return clicked
+
     def expand_read_more(self, story_element):
         """
         Clicks the "Read more" button/span within a user story to reveal full instructions.
@@ -278,8 +333,8 @@ class SymptomScraper:
             read_more_text = read_more_trigger.find_element(By.CSS_SELECTOR, "span.bold.text-link.underline")
             if read_more_text.is_displayed():
                 read_more_text.click()
+                wait_for_invisible(self.driver, read_more_text, EXPAND_TIMEOUT, name="read_more_expanded")
                 logger.info("✅ Clicked 'Read more' to expand instruction.")
-                time.sleep(1)  # Wait for content to load
         except NoSuchElementException:
             logger.info("ℹ️ No 'Read more' button found for this user story.")
         except ElementClickInterceptedException:
@@ -317,19 +372,104 @@ class SymptomScraper:
         return details
 
 
-def scrape_symptom_page(url: str, headless: bool = False) -> dict:
+def scrape_symptom_page(url: str, headless: bool = False, use_pool: bool = True, prefer_static: bool = True,
+                        limit: int = 1) -> dict:
     """
     Standalone function to scrape PartSelect symptom pages.
+    By default the page is first fetched and parsed over plain HTTP; Chrome (a warm driver
+    from the shared browser pool) is only used when the static HTML is unusable.
+    `limit` is the number of part rows to keep.
     """
+    if prefer_static:
+        static_data = scrape_symptom_static(url, limit=limit)
+        if static_data is not None:
+            return static_data
+        logger.info(f"ℹ️ Falling back to Selenium for {url}")
+
+    if use_pool:
+        with get_pool(headless).checkout() as driver:
+            return SymptomScraper(driver=driver).scrape_symptom_page(url, limit=limit)
+
     scraper = SymptomScraper(headless=headless)
     try:
-        data = scraper.scrape_symptom_page(url)
+        data = scraper.scrape_symptom_page(url, limit=limit)
     finally:
         scraper.close()
     return data
 
 
+def scrape_symptom_pages(urls: list, headless: bool = False, max_pages: int = SYMPTOM_MAX_PAGES,
+                         parts_per_page: int = SYMPTOM_PARTS_PER_PAGE,
+                         max_workers: int = SYMPTOM_SCRAPE_WORKERS) -> list:
+    """
+    Scrapes the first `max_pages` symptom pages concurrently, keeping `parts_per_page` part rows
+    from each. At most `max_workers` pages are in flight; pages that fall back to Chrome are
+    further bounded by the browser pool. Returns the per-page results in the order of `urls`,
+    skipping pages that failed or had no parts.
+    """
+    urls = list(dict.fromkeys(urls))[:max_pages]
+    if not urls:
+        return []
+
+    def scrape(url):
+        try:
+            return scrape_symptom_page(url, headless=headless, limit=parts_per_page)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to scrape symptom page {url}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        results = list(executor.map(scrape, urls))
+    pages = [data for data in results if data and data.get("common_parts")]
+    logger.info(f"✅ Scraped {len(pages)} of {len(urls)} symptom pages in parallel.")
+    return pages
+
+
+def _fix_percentage(part: dict) -> float:
+    try:
+        return float(part.get("fix_percentage") or 0)
+    except ValueError:
+        return 0.0
+
+
+def merge_symptom_pages(pages: list) -> dict:
+    """
+    Merges several scraped symptom pages into one result. Parts listed on more than one page
+    are kept once (with the higher fix percentage and the union of their user stories), and
+    common_parts is ranked by fix percentage across all pages.
+    """
+    if not pages:
+        return {}
+    merged = {
+        "product_url": pages[0].get("product_url", ""),
+        "model_number": next((p["model_number"] for p in pages if p.get("model_number")), ""),
+        "symptom_title": pages[0].get("symptom_title", ""),
+        "symptom_pages": [p.get("product_url", "") for p in pages],
+    }
+
+    parts = {}
+    for page in pages:
+        for part in page.get("common_parts", []):
+            key = part.get("part_number") or part.get("part_url") or part.get("part_name")
+            existing = parts.get(key)
+            if existing is None:
+                parts[key] = dict(part, user_stories=list(part.get("user_stories", [])),
+                                  source_pages=[page.get("product_url", "")])
+                continue
+            existing["source_pages"].append(page.get("product_url", ""))
+            seen_stories = {(s.get("title"), s.get("instruction")) for s in existing["user_stories"]}
+            for story in part.get("user_stories", []):
+                if (story.get("title"), story.get("instruction")) not in seen_stories:
+                    existing["user_stories"].append(story)
+            if _fix_percentage(part) > _fix_percentage(existing):
+                existing["fix_percentage"] = part.get("fix_percentage")
+
+    merged["common_parts"] = sorted(parts.values(), key=_fix_percentage, reverse=True)
+    return merged
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     test_url = "https://www.partselect.com/Models/WRS588FIHZ00/Symptoms/Ice-maker-not-making-ice/"
     result_data = scrape_symptom_page(test_url, headless=False)
     print(json.dumps(result_data, indent=2))
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+import pytest
+from answer_cache import AnswerCache
+
+# Hand-placed vectors: rewordings point the same way, other questions and symptoms don't
+VECTORS = {
+    "how do i install part ps11752778": [1.0, 0.0, 0.0, 0.0],
+    "what are the steps to install ps11752778": [0.98, 0.2, 0.0, 0.0],
+    "how do i replace the door gasket": [0.0, 1.0, 0.0, 0.0],
+    "my ice maker is not working": [0.0, 0.0, 1.0, 0.1],
+    "my fridge won t make ice": [0.0, 0.0, 0.99, 0.15],
+    "my water dispenser is not working": [0.0, 0.0, 0.99, 0.12],
+    "ice maker not working": [1.0, 0.0, 0.0],
+    "won t make ice": [0.97, 0.2, 0.0],
+    "water dispenser not working": [0.8, 0.0, 0.6],
+}
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return VECTORS[text]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [VECTORS[text] for text in texts]
+
+
+def entities(intent="installation", part_number="", model_number="", brand="", symptom=""):
+    return SimpleNamespace(intent=intent, part_number=part_number, model_number=model_number,
+                           brand=brand, symptom=symptom)
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(embeddings=FakeEmbeddings(), threshold=0.92, ttl=60, max_entries=10,
+                       intents={"installation", "troubleshoot"}, enabled=True, symptom_threshold=0.94)
+
+
+def test_exact_question_hits_without_embedding(cache):
+    cache.put("How do I install part PS11752778?", entities(part_number="PS11752778"), "Answer")
+    assert cache.get("how do I install part  ps11752778", entities(part_number="ps11752778")) == "Answer"
+    assert cache.embeddings.calls == 0
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_reworded_question_hits_semantically(cache):
+    cache.put("How do I install part PS11752778?", entities(part_number="PS11752778"), "Answer")
+    assert cache.get("What are the steps to install PS11752778?", entities(part_number="PS11752778")) == "Answer"
+    assert cache.get("How do I replace the door gasket?", entities(part_number="PS11752778")) is None
+
+
+def test_answers_are_not_shared_across_parts_or_intents(cache):
+    cache.put("How do I install part PS11752778?", entities(part_number="PS11752778"), "Answer")
+    assert cache.get("How do I install part PS11752778?", entities(part_number="PS11722130")) is None
+    assert cache.get("How do I install part PS11752778?", entities(intent="compatibility",
+                                                                  part_number="PS11752778")) is None
+
+
+def test_reworded_symptom_hits(cache):
+    cache.put("My ice maker is not working", entities("troubleshoot", model_number="WRS588FIHZ00",
+                                                      symptom="ice maker not working"), "Check the water valve")
+    assert cache.get("My fridge won't make ice", entities("troubleshoot", model_number="WRS588FIHZ00",
+                                                          symptom="won't make ice")) == "Check the water valve"
+
+
+def test_different_symptom_misses_even_when_questions_embed_alike(cache):
+    cache.put("My ice maker is not working", entities("troubleshoot", model_number="WRS588FIHZ00",
+                                                      symptom="ice maker not working"), "Check the water valve")
+    assert cache.get("My water dispenser is not working",
+                     entities("troubleshoot", model_number="WRS588FIHZ00",
+                              symptom="water dispenser not working")) is None
+
+
+def test_expired_and_invalidated_answers_are_dropped(cache):
+    cache.put("How do I install part PS11752778?", entities(part_number="PS11752778"), "Answer")
+    cache.ttl = -1
+    assert cache.get("How do I install part PS11752778?", entities(part_number="PS11752778")) is None
+    cache.ttl = 60
+    cache.put("How do I install part PS11752778?", entities(part_number="PS11752778"), "Answer")
+    assert cache.invalidate(part_number="ps11752778") == 1
+    assert cache.get("How do I install part PS11752778?", entities(part_number="PS11752778")) is None
+
+
+def test_embedding_errors_are_a_miss(cache):
+    cache.put("How do I install part PS11752778?", entities(part_number="PS11752778"), "Answer")
+    # Not in VECTORS, so the fake embedding model raises
+    assert cache.get("Installing it?", entities(part_number="PS11752778")) is None
+    assert cache.stats()["embedding_errors"] == 1
@@ -0,0 +1,88 @@
+import sqlite3
+import pytest
+from compatibility_store import CompatibilityStore, PartCompatibility
+
+
+def model_rows(count: int, prefix: str = "WRS588FIHZ", brand: str = "Whirlpool") -> list:
+    return [{"brand": brand, "model_number": f"{prefix}{i:02d}", "description": "Refrigerator"} for i in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CompatibilityStore(path=str(tmp_path / "compatibility.sqlite3"))
+
+
+def test_listed_pair_is_compatible(store):
+    store.put("PS11752778", model_rows(3))
+    assert store.is_compatible("PS11752778", "WRS588FIHZ01") is True
+    # Model numbers match regardless of case and punctuation
+    assert store.is_compatible("ps11752778", "wrs588fihz-01") is True
+    assert store.lookup("PS11752778", "WRS588FIHZ01")["brand"] == "Whirlpool"
+
+
+def test_manufacturer_alias_resolves_to_part(store):
+    store.put("PS11752778", model_rows(3), aliases=["WPW10321304"])
+    assert store.part_key("WPW10321304") == "PS11752778"
+    assert store.is_compatible("WPW10321304", "WRS588FIHZ02") is True
+    assert len(store.get("WPW10321304")) == 3
+
+
+def test_complete_list_answers_no(store):
+    store.put("PS11752778", model_rows(3), complete=True)
+    assert store.is_compatible("PS11752778", "GSS25GSHSS") is False
+    assert store.lookup("PS11752778", "GSS25GSHSS") is False
+
+
+@pytest.mark.parametrize("rows", [
+    model_rows(3),
+    # A truncated first scroll page with a duplicate row used to look complete
+    model_rows(29) + model_rows(1),
+])
+def test_list_not_seen_to_end_answers_unknown(store, rows):
+    store.put("PS11752778", rows)
+    assert store.is_compatible("PS11752778", "WRS588FIHZ00") is True
+    assert store.is_compatible("PS11752778", "GSS25GSHSS") is None
+    assert store.lookup("PS11752778", "GSS25GSHSS") is None
+
+
+def test_rescrape_without_end_of_list_clears_completeness(store):
+    store.put("PS11752778", model_rows(3), complete=True)
+    store.put("PS11752778", model_rows(3))
+    assert store.is_compatible("PS11752778", "GSS25GSHSS") is None
+
+
+def test_unknown_part_is_unknown(store):
+    assert store.is_compatible("PS99999999", "WRS588FIHZ00") is None
+    assert store.lookup("PS99999999", "WRS588FIHZ00") is None
+
+
+def test_pairs_are_kept_across_shorter_scrapes(store):
+    store.put("PS11752778", model_rows(5), complete=False)
+    store.put("PS11752778", model_rows(2), complete=False)
+    assert store.is_compatible("PS11752778", "WRS588FIHZ04") is True
+    assert store.parts_for_model("WRS588FIHZ04") == ["PS11752778"]
+
+
+def test_index_is_reloaded_from_disk(tmp_path):
+    path = str(tmp_path / "compatibility.sqlite3")
+    CompatibilityStore(path=path).put("PS11752778", model_rows(3), aliases=["WPW10321304"], complete=True)
+    reopened = CompatibilityStore(path=path)
+    assert reopened.is_compatible("WPW10321304", "WRS588FIHZ00") is True
+    assert reopened.is_compatible("PS11752778", "GSS25GSHSS") is False
+
+
+def test_columns_round_trip_through_blob():
+    table = PartCompatibility.from_rows("PS11752778", model_rows(3) + model_rows(1))
+    assert len(table) == 3
+    restored = PartCompatibility.from_blob("PS11752778", table.to_blob())
+    assert list(restored.rows()) == list(table.rows())
+
+
+def test_completeness_flags_from_older_stores_are_reset(tmp_path):
+    path = str(tmp_path / "compatibility.sqlite3")
+    CompatibilityStore(path=path).put("PS11752778", model_rows(3), complete=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    assert CompatibilityStore(path=path).is_compatible("PS11752778", "GSS25GSHSS") is None
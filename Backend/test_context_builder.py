@@ -0,0 +1,73 @@
+import pytest
+from context_builder import ContextBuilder, compact, split_text
+from llm_cache import estimate_tokens
+
+
+@pytest.fixture
+def builder():
+    return ContextBuilder(budget=200)
+
+
+def scraped_part() -> dict:
+    return {
+        "inventory_id": "11752778",
+        "brand": "Whirlpool",
+        "manufacturer_part_number": "WPW10321304",
+        "qna": [{"question": f"Question {i} about the shelf?", "answer": f"Answer {i}."} for i in range(30)]
+               + [{"question": "How do I install the door bin?", "answer": "Slide it onto the door rails."}],
+        "model_compatibility": [{"brand": "Kenmore", "model_number": f"1064026201{i}", "description": "Refrigerator"}
+                                for i in range(30)],
+    }
+
+
+def test_compact_drops_json_punctuation_and_empty_values():
+    assert compact({"brand": "Kenmore", "model_number": "10640262010", "notes": ""}) == \
+        "brand: Kenmore; model_number: 10640262010"
+    assert compact(["a", "b"]) == "a, b"
+
+
+def test_split_text_keeps_sentences_together():
+    text = " ".join(f"Sentence number {i} is short." for i in range(40))
+    chunks = split_text(text, chunk_tokens=30)
+    assert len(chunks) > 1
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_split_text_splits_run_on_text_between_words():
+    text = " ".join(["word"] * 400)
+    chunks = split_text(text, chunk_tokens=30)
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_context_stays_within_budget(builder):
+    context, report = builder.build("How do I install the door bin?", "installation", data=scraped_part())
+    assert report["used_tokens"] <= 200
+    assert report["items_dropped"] > 0
+    assert estimate_tokens(context) <= 200 + report["items_used"]
+
+
+def test_relevant_items_are_kept_first(builder):
+    context, _ = builder.build("How do I install the door bin?", "installation", data=scraped_part())
+    assert "Slide it onto the door rails." in context
+    assert "inventory_id: 11752778" in context
+    # Cross-reference rows barely matter for installation and don't fit next to the Q&A
+    assert "[model_compatibility]" not in context
+
+
+def test_asked_model_is_kept_for_compatibility(builder):
+    context, _ = builder.build("Does it fit my Kenmore?", "compatibility", data=scraped_part(),
+                               part_number="PS11752778", model_number="1064026201-29")
+    # The last row, which position alone would rank lowest
+    assert "model_number: 106402620129" in context
+
+
+def test_documents_are_grouped_by_type_in_order(builder):
+    documents = [{"type": "qna", "content": "Second answer", "source": "a"},
+                 {"type": "full_description", "content": "A door bin.", "source": "b"},
+                 {"type": "qna", "content": "Third answer", "source": "c"}]
+    context, report = builder.build("door bin", "installation", documents=documents)
+    assert context.splitlines() == ["[qna]", "- Second answer", "- Third answer", "[full_description]", "A door bin."]
+    assert report["items_dropped"] == 0
+    assert builder.stats()["builds"] == 1
@@ -0,0 +1,68 @@
+import pytest
+from compatibility_store import compatibility_store
+from entity_extractor import EntityExtractor, ExtractedIdentifiers
+from url_resolver import PartSelectURLResolver
+
+
+@pytest.fixture
+def extractor():
+    return EntityExtractor()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How do I install part PS11752778?",
+     ExtractedIdentifiers(part_number="PS11752778")),
+    ("Is WPW10321304 compatible with my WDT780SAEM1 dishwasher?",
+     ExtractedIdentifiers(part_number="WPW10321304", model_number="WDT780SAEM1")),
+    ("Will WR55X10942 fit my GE GSS25GSHSS?",
+     ExtractedIdentifiers(part_number="WR55X10942", model_number="GSS25GSHSS", brand="GE")),
+    ("DA97-07365A for Samsung RF28HMEDBSR",
+     ExtractedIdentifiers(part_number="DA9707365A", model_number="RF28HMEDBSR", brand="Samsung")),
+    ("Kenmore 106.51133211 ice maker stopped working",
+     ExtractedIdentifiers(model_number="10651133211", brand="Kenmore")),
+    ("My whirlpool fridge ice maker is broken",
+     ExtractedIdentifiers(brand="Whirlpool")),
+    ("How can I get my dishwasher to drain?",
+     ExtractedIdentifiers()),
+])
+def test_extract(extractor, query, expected):
+    assert extractor.extract(query) == expected
+
+
+def test_brand_typo_is_matched(extractor):
+    assert extractor.extract("Frigidare dishwasher not draining").brand == "Frigidaire"
+    # Short brand names are too close to ordinary words to typo-match
+    assert extractor.extract("My lf fridge is warm").brand is None
+
+
+def test_known_identifier_is_corrected_for_confusable_characters(extractor):
+    extractor.index.add("WRS588FIHZ00", "model")
+    extractor.index.add("PS11752778", "part")
+    assert extractor.extract("WRS588FIHZ0O is leaking").model_number == "WRS588FIHZ00"
+    assert extractor.extract("install PSI1752778").part_number == "PS11752778"
+
+
+def test_sibling_model_is_not_corrected(extractor):
+    extractor.index.add("WRS588FIHZ00", "model")
+    # A one-character difference that isn't an O/0 or I/1 mix-up is another model
+    assert extractor.extract("WRS588FIHZ01 is leaking").model_number == "WRS588FIHZ01"
+
+
+def test_scraped_identifiers_are_classified_by_what_they_were_seen_as(extractor):
+    # Ten digits look like a Frigidaire part number, but the compatibility store lists it as a model
+    compatibility_store.put("PS11752778", [{"brand": "Whirlpool", "model_number": "1064026201",
+                                            "description": "Refrigerator"}], aliases=["WPW10321304"])
+    assert extractor.format_kind("1064026201") == "part"
+    extractor.refresh(force=True)
+    assert extractor.index.kind("1064026201") == "model"
+    assert extractor.extract("does WPW10321304 fit 1064026201").model_number == "1064026201"
+
+
+def test_hyphenated_part_number_resolves_from_learned_url(extractor, tmp_path):
+    resolver = PartSelectURLResolver(path=str(tmp_path / "urls.sqlite3"))
+    url = "https://www.partselect.com/PS4204638-Samsung-DA97-07365A-Ice-Maker-Assembly.htm"
+    resolver.learn_from_url(url + "?SourceCode=18")
+    part_number = extractor.extract("Is DA97-07365A the right ice maker?").part_number
+    assert resolver.resolve_part(part_number) == url
+    assert resolver.resolve_part("da97 07365a") == url
+    assert resolver.resolve_part("PS4204638") == url
@@ -0,0 +1,105 @@
+import time
+import sqlite3
+import threading
+import pytest
+import google_search
+from google_search import (SearchCache, NullSearchCache, MemorySearchCache, SQLiteSearchCache, TokenBucket,
+                           google_partselect_search, set_search_cache)
+
+RESULTS = [("Door bin for Whirlpool refrigerators", "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm")]
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+
+    def fetch(query, num_results):
+        calls.append(query)
+        return RESULTS
+
+    monkeypatch.setattr(google_search, "GOOGLE_API_KEY", "key")
+    monkeypatch.setattr(google_search, "GOOGLE_CSE_ID", "cse")
+    monkeypatch.setattr(google_search, "_fetch_results", fetch)
+    monkeypatch.setattr(google_search, "search_cache", MemorySearchCache())
+    return calls
+
+
+def test_search_cache_is_abstract():
+    with pytest.raises(TypeError):
+        SearchCache()
+
+
+def test_repeated_search_is_served_from_cache(fetches):
+    assert google_partselect_search("WPW10321304 door bin", num_results=3) == RESULTS
+    assert google_partselect_search("  wpw10321304   Door Bin", num_results=3) == RESULTS
+    assert len(fetches) == 1
+    google_partselect_search("WPW10321304 door bin", num_results=5)
+    assert len(fetches) == 2
+
+
+def test_failed_search_is_not_cached(fetches, monkeypatch):
+    monkeypatch.setattr(google_search, "_fetch_results", lambda query, num_results: None)
+    assert google_partselect_search("WPW10321304") == []
+    assert google_search.search_cache.get(google_search._cache_key("WPW10321304", 3)) is None
+
+
+def test_concurrent_identical_searches_share_one_call(fetches, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch(query, num_results):
+        calls.append(query)
+        release.wait(5)
+        return RESULTS
+
+    monkeypatch.setattr(google_search, "_fetch_results", slow_fetch)
+    # Without a cache, only the in-flight lookup can stop the callers from fetching
+    set_search_cache(NullSearchCache())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(google_partselect_search("WPW10321304")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    # Let every thread reach the in-flight lookup before the leader's call returns
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [RESULTS] * 5
+    assert len(calls) == 1
+
+
+def test_cache_errors_never_fail_a_search(fetches):
+    class BrokenCache(SearchCache):
+        def get(self, key):
+            raise sqlite3.OperationalError("database is locked")
+
+        def set(self, key, results):
+            raise sqlite3.OperationalError("database is locked")
+
+    set_search_cache(BrokenCache())
+    assert google_partselect_search("WPW10321304") == RESULTS
+
+
+def test_sqlite_cache_round_trip_and_ttl(tmp_path):
+    cache = SQLiteSearchCache(path=str(tmp_path / "search.sqlite3"), ttl=60)
+    cache.set("wpw10321304|3", RESULTS)
+    assert cache.get("wpw10321304|3") == RESULTS
+    cache.ttl = -1
+    assert cache.get("wpw10321304|3") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemorySearchCache(ttl=60, max_entries=2)
+    cache.set("a", RESULTS)
+    cache.set("b", RESULTS)
+    cache.get("a")
+    cache.set("c", RESULTS)
+    assert cache.get("b") is None
+    assert cache.get("a") == RESULTS
+
+
+def test_token_bucket_runs_dry():
+    bucket = TokenBucket(rate=0.001, capacity=2)
+    assert bucket.acquire(timeout=0) and bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
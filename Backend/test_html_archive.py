@@ -0,0 +1,97 @@
+import pytest
+import requests
+import static_scraper
+from html_archive import HTMLArchive, content_hash
+
+URL = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+PAGE = "<html><body><h1>Refrigerator Door Shelf Bin</h1></body></html>"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return HTMLArchive(root=str(tmp_path / "archive"), enabled=True)
+
+
+def test_stored_page_round_trips(archive):
+    digest = archive.store(URL, PAGE, etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert digest == content_hash(PAGE)
+    entry = archive.lookup(URL)
+    assert entry["etag"] == '"abc"'
+    assert archive.read(entry["content_hash"]) == PAGE
+
+
+def test_identical_pages_are_stored_once(archive):
+    archive.store(URL, PAGE)
+    archive.store(URL + "?SourceCode=18", PAGE)
+    archive.store(URL, PAGE + "<!-- new -->")
+    stats = archive.stats()
+    assert stats["stored"] == 2 and stats["unchanged"] == 1
+    assert stats["pages"] == 2 and stats["versions"] == 3
+
+
+def test_render_does_not_replace_the_http_copy(archive):
+    archive.store(URL, PAGE, etag='"abc"')
+    archive.store_render(URL, PAGE + "<div>rendered</div>")
+    archive.store_render(URL + "#QuestionsAndAnswers", "<html>rendered only</html>")
+    assert archive.read(archive.lookup(URL)["content_hash"]) == PAGE
+    assert archive.lookup(URL + "#QuestionsAndAnswers") is None
+    # Renders are only re-parsed for pages never fetched over HTTP
+    assert [url for url, _ in archive.entries()] == [URL, URL + "#QuestionsAndAnswers"]
+    assert archive.entries()[0][1] == archive.object_path(content_hash(PAGE))
+
+
+def test_corrupt_object_reads_as_missing(archive):
+    digest = archive.store(URL, PAGE)
+    with open(archive.object_path(digest), "wb") as f:
+        f.write(b"not gzip")
+    assert archive.read(digest) is None
+
+
+def test_disabled_archive_does_nothing(tmp_path):
+    archive = HTMLArchive(root=str(tmp_path / "archive"), enabled=False)
+    assert archive.store(URL, PAGE) is None
+    assert archive.lookup(URL) is None
+    assert archive.entries() == []
+    assert not (tmp_path / "archive").exists()
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def fetched(archive, monkeypatch):
+    requests_sent = []
+    responses = []
+
+    def get(url, headers=None, timeout=None):
+        requests_sent.append(headers or {})
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(static_scraper, "html_archive", archive)
+    monkeypatch.setattr(static_scraper.session, "get", get)
+    monkeypatch.setattr(static_scraper, "HTML_ARCHIVE_FRESH_SECONDS", 0)
+    return requests_sent, responses
+
+
+def test_archived_page_is_revalidated_with_its_validators(archive, fetched):
+    requests_sent, responses = fetched
+    responses += [FakeResponse(200, PAGE, {"ETag": '"abc"'}), FakeResponse(304)]
+    assert static_scraper.fetch_html(URL) == PAGE
+    assert static_scraper.fetch_html(URL) == PAGE
+    assert requests_sent == [{}, {"If-None-Match": '"abc"'}]
+    assert archive.stats()["revalidated"] == 1
+
+
+def test_archived_page_is_served_when_the_site_is_down(archive, fetched):
+    _, responses = fetched
+    responses += [FakeResponse(200, PAGE), requests.ConnectionError("offline")]
+    static_scraper.fetch_html(URL)
+    assert static_scraper.fetch_html(URL) == PAGE
+    assert archive.stats()["stale_served"] == 1
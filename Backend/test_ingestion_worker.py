@@ -0,0 +1,104 @@
+import threading
+import pytest
+import ingestion_worker as ingestion_worker_module
+from ingestion_worker import IngestionWorker
+
+PRODUCT_URL = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+
+
+def qna_data(count: int) -> dict:
+    return {"product_page": PRODUCT_URL, "inventory_id": "11752778",
+            "qna": [{"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(count)]}
+
+
+class FakeStore:
+    def __init__(self, fail: bool = False, release: threading.Event = None):
+        self.batches = []
+        self.fail = fail
+        self.release = release
+
+    def upsert_documents(self, documents):
+        if self.release is not None:
+            self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("embedding API down")
+        self.batches.append(documents)
+        return len(documents), 0
+
+
+@pytest.fixture
+def workers():
+    started = []
+    yield started
+    for worker in started:
+        worker.shutdown(timeout=5)
+
+
+def start(workers, monkeypatch, store, **kwargs) -> IngestionWorker:
+    monkeypatch.setattr(ingestion_worker_module, "live_store", store)
+    worker = IngestionWorker(**kwargs)
+    workers.append(worker)
+    return worker
+
+
+def test_submissions_are_batched_until_flush(workers, monkeypatch):
+    store = FakeStore()
+    worker = start(workers, monkeypatch, store, batch_size=100, flush_interval=60)
+    assert worker.submit(qna_data(2)) and worker.submit(qna_data(3))
+    assert worker.flush(timeout=5)
+    # Both pages' documents went into one upsert call
+    assert [len(batch) for batch in store.batches] == [5]
+    assert worker.stats()["indexed"] == 5
+
+
+def test_full_batch_is_written_without_waiting(workers, monkeypatch):
+    store = FakeStore()
+    worker = start(workers, monkeypatch, store, batch_size=2, flush_interval=60)
+    worker.submit(qna_data(2))
+    worker.flush(timeout=5)
+    assert [len(batch) for batch in store.batches] == [2]
+
+
+def test_flush_interval_writes_a_partial_batch(workers, monkeypatch):
+    store = FakeStore()
+    worker = start(workers, monkeypatch, store, batch_size=100, flush_interval=0.05)
+    worker.submit(qna_data(1))
+    for _ in range(100):
+        if store.batches:
+            break
+        threading.Event().wait(0.02)
+    assert [len(batch) for batch in store.batches] == [1]
+
+
+def test_failed_batch_is_counted_and_the_worker_keeps_running(workers, monkeypatch):
+    store = FakeStore(fail=True)
+    worker = start(workers, monkeypatch, store, batch_size=100, flush_interval=60)
+    worker.submit(qna_data(1))
+    worker.flush(timeout=5)
+    assert worker.stats()["failed_batches"] == 1
+    store.fail = False
+    worker.submit(qna_data(1))
+    worker.flush(timeout=5)
+    assert worker.stats()["indexed"] == 1
+
+
+def test_full_queue_drops_data(workers, monkeypatch):
+    release = threading.Event()
+    store = FakeStore(release=release)
+    worker = start(workers, monkeypatch, store, max_queue=1, batch_size=1, flush_interval=60)
+    assert worker.submit(qna_data(1))
+    # The worker is now stuck writing the first batch, so the queue's one slot fills up
+    for _ in range(100):
+        if worker.stats()["queued"] == 0:
+            break
+        threading.Event().wait(0.02)
+    assert worker.submit(qna_data(1))
+    assert not worker.submit(qna_data(1), timeout=0.01)
+    release.set()
+    assert worker.stats()["dropped"] == 1
+
+
+def test_submit_after_shutdown_is_refused(workers, monkeypatch):
+    worker = start(workers, monkeypatch, FakeStore())
+    worker.shutdown(timeout=5)
+    assert not worker.submit(qna_data(1))
@@ -0,0 +1,80 @@
+import json
+import pytest
+from intent_classifier import IntentClassifier, NaiveBayesModel, load_labels, tokenize, train
+
+EXAMPLES = [
+    ("How do I install part PS11752778?", "installation"),
+    ("How can I replace the door bin on my fridge?", "installation"),
+    ("Installation steps for WPW10321304", "installation"),
+    ("Is PS11752778 compatible with WDT780SAEM1?", "compatibility"),
+    ("Will this part fit my GSS25GSHSS?", "compatibility"),
+    ("Does WR55X10942 work with my GE fridge?", "compatibility"),
+    ("My ice maker is not working", "troubleshoot"),
+    ("Dishwasher won't drain", "troubleshoot"),
+    ("Fridge is leaking water on the floor", "troubleshoot"),
+    ("What are your store hours?", "general"),
+]
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / "intent_model.json")
+    NaiveBayesModel.train(EXAMPLES * 3).save(path)
+    return path
+
+
+def classifier(tmp_path, model_path, mode="on", threshold=0.6) -> IntentClassifier:
+    return IntentClassifier(mode=mode, threshold=threshold, model_path=model_path,
+                            label_log=str(tmp_path / "labels.jsonl"))
+
+
+def test_tokens_hide_identifiers_and_mark_rules():
+    tokens = tokenize("Is PS11752778 compatible with WDT780SAEM1?")
+    assert "<id>" in tokens and "ps11752778" not in tokens
+    assert "<rule:compatibility>" in tokens
+    assert "<id> compatible" in tokens
+
+
+def test_trained_model_predicts_unseen_phrasings(tmp_path, model_path):
+    local = classifier(tmp_path, model_path)
+    assert local.classify("How do I install WPW10321304 in my door?") == "installation"
+    assert local.classify("Is WPW10321304 compatible with WRS588FIHZ00?") == "compatibility"
+    assert local.classify("My dishwasher is not draining") == "troubleshoot"
+
+
+def test_only_on_mode_answers_locally(tmp_path, model_path):
+    assert classifier(tmp_path, model_path, mode="shadow").classify("How do I install PS11752778?") is None
+    assert classifier(tmp_path, "missing.json").classify("How do I install PS11752778?") is None
+
+
+def test_unconfident_prediction_goes_to_gpt(tmp_path, model_path):
+    local = classifier(tmp_path, model_path, threshold=0.999)
+    assert local.classify("Tell me about this") is None
+    assert local.stats()["fast_path"] == 0
+
+
+def test_gpt_labels_are_logged_and_compared(tmp_path, model_path):
+    local = classifier(tmp_path, model_path, mode="shadow")
+    local.observe("How do I install PS11752778?", "installation")
+    local.observe("How do I install PS11752778?", "compatibility")
+    local.observe("Anything", "not-an-intent")
+    stats = local.stats()
+    assert stats["compared"] == 2 and stats["agreed"] == 1
+    assert stats["disagreements"] == {"compatibility->installation": 1}
+    # The latest label of a query wins
+    assert load_labels(local.label_log) == [("How do I install PS11752778?", "compatibility")]
+
+
+def test_off_mode_records_nothing(tmp_path, model_path):
+    local = classifier(tmp_path, model_path, mode="off")
+    local.observe("How do I install PS11752778?", "installation")
+    assert not (tmp_path / "labels.jsonl").exists()
+
+
+def test_train_from_label_log(tmp_path):
+    label_log, model_path = tmp_path / "labels.jsonl", tmp_path / "model.json"
+    label_log.write_text("".join(json.dumps({"query": q, "intent": i}) + "\n" for q, i in EXAMPLES) + "not json\n")
+    report = train(str(label_log), str(model_path), holdout=0.2, threshold=0.6)
+    assert report["examples"] == len(EXAMPLES)
+    assert report["holdout"] == 2
+    assert NaiveBayesModel.load(str(model_path)).class_counts["installation"] == 3
@@ -0,0 +1,100 @@
+import sqlite3
+import pytest
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from langchain.schema.messages import AIMessageChunk
+from llm_cache import CachedChatModel, LLMCache, cache_key
+
+MESSAGES = [SystemMessage(content="Answer briefly."), HumanMessage(content="How do I install PS11752778?")]
+
+
+class FakeChatModel:
+    model_name = "gpt-4"
+
+    def __init__(self, temperature=0):
+        self.temperature = temperature
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        return AIMessage(content=f"Answer {self.calls}",
+                         response_metadata={"token_usage": {"prompt_tokens": 40, "completion_tokens": 5}})
+
+    def stream(self, messages, **kwargs):
+        self.calls += 1
+        for token in ("Slide ", "the bin ", "in."):
+            yield AIMessageChunk(content=token)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / "llm.sqlite3"), ttl=60, memory_entries=8, max_entries=100)
+
+
+def test_cache_key_depends_on_model_temperature_and_messages():
+    key = cache_key("gpt-4", 0, MESSAGES)
+    assert key == cache_key("gpt-4", 0, list(MESSAGES))
+    assert key != cache_key("gpt-4o", 0, MESSAGES)
+    assert key != cache_key("gpt-4", 0, MESSAGES[1:])
+
+
+def test_repeated_call_is_answered_from_cache(cache):
+    llm = FakeChatModel()
+    model = CachedChatModel(llm, cache)
+    assert model.invoke(MESSAGES).content == "Answer 1"
+    assert model.invoke(MESSAGES).content == "Answer 1"
+    assert model.invoke(MESSAGES[1:]).content == "Answer 2"
+    assert llm.calls == 2
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["saved_prompt_tokens"] == 40 and stats["saved_completion_tokens"] == 5
+
+
+def test_sampled_calls_are_not_cached(cache):
+    llm = FakeChatModel(temperature=0.7)
+    model = CachedChatModel(llm, cache)
+    model.invoke(MESSAGES)
+    model.invoke(MESSAGES)
+    assert llm.calls == 2
+
+
+def test_entries_are_shared_through_disk(cache, tmp_path):
+    CachedChatModel(FakeChatModel(), cache).invoke(MESSAGES)
+    other_process = LLMCache(path=str(tmp_path / "llm.sqlite3"), ttl=60)
+    llm = FakeChatModel()
+    assert CachedChatModel(llm, other_process).invoke(MESSAGES).content == "Answer 1"
+    assert llm.calls == 0
+    assert other_process.stats()["disk_hits"] == 1
+
+
+def test_expired_entries_are_misses(cache):
+    llm = FakeChatModel()
+    model = CachedChatModel(llm, cache)
+    model.invoke(MESSAGES)
+    cache.ttl = -1
+    model.invoke(MESSAGES)
+    assert llm.calls == 2
+
+
+def test_only_completed_streams_are_cached(cache):
+    llm = FakeChatModel()
+    model = CachedChatModel(llm, cache)
+    stream = model.stream(MESSAGES)
+    next(stream)
+    stream.close()
+    assert "".join(chunk.content for chunk in model.stream(MESSAGES)) == "Slide the bin in."
+    assert [chunk.content for chunk in model.stream(MESSAGES)] == ["Slide the bin in."]
+    assert llm.calls == 2
+
+
+def test_cache_errors_fall_through_to_the_model(cache):
+    class LockedCache(LLMCache):
+        def get(self, key):
+            raise sqlite3.OperationalError("database is locked")
+
+        def set(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    llm = FakeChatModel()
+    model = CachedChatModel(llm, LockedCache(path=":memory:"))
+    assert model.invoke(MESSAGES).content == "Answer 1"
+    assert model.invoke(MESSAGES).content == "Answer 2"
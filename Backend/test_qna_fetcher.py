@@ -0,0 +1,79 @@
+import pytest
+import qna_fetcher as qna_fetcher_module
+from qna_fetcher import QnAFetcher, QnAProgress
+
+PRODUCT_URL = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+
+
+def qna_page(page: int, size: int = 10) -> list:
+    return [{"question": f"Question {page}.{i}", "answer": f"Answer {page}.{i}"} for i in range(size)]
+
+
+class FakeSite:
+    """
+    Serves `pages` Q&A pages, then repeats the last one like the pager does past the end.
+    """
+
+    def __init__(self, pages: int, failing: set = ()):
+        self.pages = pages
+        self.failing = set(failing)
+        self.requested = []
+
+    def fetch_page(self, product_url, inventory_id, page, page_size):
+        self.requested.append(page)
+        if page in self.failing:
+            return None, {}
+        return qna_page(min(page, self.pages)), {"total_items": self.pages * page_size}
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    batches = []
+    monkeypatch.setattr(qna_fetcher_module.ingestion_worker, "submit", batches.append)
+    return batches
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return QnAFetcher(workers=2, max_pages=20, progress=QnAProgress(path=str(tmp_path / "qna.sqlite3")))
+
+
+def test_page_urls_use_a_stable_oldest_first_order(fetcher):
+    url = fetcher.page_url(PRODUCT_URL + "?SourceCode=18", "11752778", 3, 10)
+    assert url.startswith(PRODUCT_URL + "?currentPage=3&inventoryID=11752778")
+    assert "sortColumn=date&sortOrder=asc" in url
+
+
+def test_harvest_fetches_every_page_from_the_first(fetcher, submitted):
+    site = FakeSite(pages=5)
+    fetcher.fetch_page = site.fetch_page
+    assert fetcher.harvest(PRODUCT_URL, "11752778", total_items=50, page_size=10) == 50
+    assert sorted(site.requested) == [1, 2, 3, 4, 5]
+    assert [batch["qna"][0]["question"] for batch in submitted] == [f"Question {p}.0" for p in range(1, 6)]
+    assert fetcher.progress.get("11752778") == (5, 50)
+
+
+def test_harvest_without_total_stops_at_repeated_page(fetcher, submitted):
+    site = FakeSite(pages=3)
+    fetcher.fetch_page = lambda *args: (site.fetch_page(*args)[0], {})
+    assert fetcher.harvest(PRODUCT_URL, "11752778") == 30
+    assert len(submitted) == 3
+
+
+def test_refresh_resumes_from_the_last_page(fetcher, submitted):
+    fetcher.fetch_page = FakeSite(pages=3).fetch_page
+    fetcher.harvest(PRODUCT_URL, "11752778", total_items=30, page_size=10)
+    # Two new questions have been added to the end since
+    site = FakeSite(pages=4)
+    fetcher.fetch_page = site.fetch_page
+    fetcher.harvest(PRODUCT_URL, "11752778", total_items=32, page_size=10)
+    assert sorted(site.requested) == [3, 4]
+    assert fetcher.progress.get("11752778") == (4, 40)
+
+
+def test_failed_page_keeps_progress_contiguous(fetcher, submitted):
+    site = FakeSite(pages=5, failing={3})
+    fetcher.fetch_page = site.fetch_page
+    assert fetcher.harvest(PRODUCT_URL, "11752778", total_items=50, page_size=10) == 20
+    assert fetcher.progress.get("11752778")[0] == 2
+    assert fetcher.stats()["failed_pages"] == 1
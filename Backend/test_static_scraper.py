@@ -0,0 +1,48 @@
+import os
+import pytest
+from static_scraper import make_soup, parse_product_html, parse_qna_meta, PRODUCT_SECTIONS
+
+PRODUCT_URL = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+SAVED_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug_output.html")
+
+
+@pytest.fixture(scope="module")
+def html():
+    with open(SAVED_PAGE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_basic_info(html):
+    data = parse_product_html(html, PRODUCT_URL, sections=())
+    assert data["inventory_id"] == "11752778"
+    assert data["brand"] == "Whirlpool"
+    assert data["manufacturer_part_number"] == "WPW10321304"
+    assert data["product_page"] == PRODUCT_URL
+
+
+def test_model_compatibility_rows(html):
+    rows = parse_product_html(html, PRODUCT_URL, sections=("model_compatibility",))["model_compatibility"]
+    assert len(rows) == 30
+    assert rows[0] == {"brand": "Kenmore", "model_number": "10640262010", "description": "Refrigerator"}
+    assert all(row["brand"] and row["model_number"] and row["description"] for row in rows)
+
+
+def test_first_qna_page_and_pager_meta(html):
+    data = parse_product_html(html, PRODUCT_URL, sections=("qna",))
+    assert len(data["qna"]) == 10
+    assert all(pair["question"] and pair["answer"] for pair in data["qna"])
+    assert data["qna_meta"] == {"inventory_id": "11752778", "total_items": 48, "page_size": 10}
+    assert parse_qna_meta(make_soup(html)) == data["qna_meta"]
+
+
+def test_only_requested_sections_are_parsed(html):
+    data = parse_product_html(html, PRODUCT_URL, sections=("description",))
+    assert data["full_description"].startswith("This refrigerator door bin")
+    for section, (key, _) in PRODUCT_SECTIONS.items():
+        if section != "description":
+            assert key not in data
+
+
+def test_page_without_product_details():
+    data = parse_product_html("<html><body><p>Not found</p></body></html>", PRODUCT_URL, sections=())
+    assert "error" in data
@@ -0,0 +1,108 @@
+import sqlite3
+import pytest
+import requests
+from url_resolver import PartSelectURLResolver, parse_product_url, parse_model_url
+
+PRODUCT_URL = "https://www.partselect.com/PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm"
+
+
+@pytest.mark.parametrize("url, expected", [
+    (PRODUCT_URL, ("PS11752778", "WPW10321304")),
+    ("https://www.partselect.com/PS4204638-Samsung-DA97-07365A-Ice-Maker-Assembly.htm?SourceCode=18",
+     ("PS4204638", "DA97-07365A")),
+    ("https://www.partselect.com/PS2358880-Jenn-Air-W10190965-Dishwasher-Door-Latch.htm",
+     ("PS2358880", "W10190965")),
+    ("https://www.partselect.com/PS123-Whirlpool-Door-Bin.htm", ("PS123", "")),
+    ("https://www.partselect.com/Models/WRS588FIHZ00/", ("", "")),
+])
+def test_parse_product_url(url, expected):
+    assert parse_product_url(url) == expected
+
+
+def test_parse_model_url():
+    assert parse_model_url("https://www.partselect.com/Models/wrs588fihz00/Symptoms/Leaking/") == "WRS588FIHZ00"
+    assert parse_model_url(PRODUCT_URL) == ""
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200):
+        self.url = url
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """
+    Answers HEAD requests from a map of candidate URL -> final URL; anything else is a 404.
+    """
+
+    def __init__(self, redirects: dict):
+        self.redirects = redirects
+        self.requested = []
+        self.headers = {}
+
+    def head(self, url, allow_redirects=True, timeout=None):
+        self.requested.append(url)
+        if url in self.redirects:
+            return FakeResponse(self.redirects[url])
+        return FakeResponse(url, 404)
+
+    def get(self, url, **kwargs):
+        return self.head(url)
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    resolver = PartSelectURLResolver(path=str(tmp_path / "urls.sqlite3"))
+    resolver.session = FakeSession({})
+    return resolver
+
+
+def test_learned_identifiers_resolve_without_requests(resolver):
+    resolver.learn_from_search_results([("snippet", PRODUCT_URL + "#reviews"),
+                                        ("snippet", "https://www.partselect.com/Models/WRS588FIHZ00/Parts/")])
+    assert resolver.resolve_part("PS11752778") == PRODUCT_URL
+    assert resolver.resolve_part("wpw10321304") == PRODUCT_URL
+    assert resolver.resolve_model("WRS588FIHZ00") == "https://www.partselect.com/Models/WRS588FIHZ00/"
+    assert resolver.session.requested == []
+
+
+def test_part_number_is_resolved_from_the_ps_url_pattern(resolver):
+    resolver.session = FakeSession({"https://www.partselect.com/PS11752778.htm": PRODUCT_URL})
+    assert resolver.resolve_part("PS11752778") == PRODUCT_URL
+    # The redirect target is learned, including its manufacturer part number
+    assert resolver.lookup("WPW10321304", "part") == PRODUCT_URL
+
+
+def test_unresolvable_part_returns_none(resolver):
+    assert resolver.resolve_part("PS99999999") is None
+    assert len(resolver.session.requested) == 2
+
+
+def test_request_errors_are_not_fatal(resolver):
+    class BrokenSession(FakeSession):
+        def head(self, url, **kwargs):
+            raise requests.ConnectionError("offline")
+
+    resolver.session = BrokenSession({})
+    assert resolver.resolve_model("WRS588FIHZ00") is None
+
+
+def test_non_partselect_urls_are_not_learned(resolver):
+    resolver.learn("PS11752778", "https://example.com/PS11752778.htm", "part")
+    assert resolver.lookup("PS11752778", "part") is None
+
+
+def test_hyphenated_keys_from_older_tables_are_rekeyed(tmp_path):
+    path = str(tmp_path / "urls.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE identifier_urls (identifier TEXT NOT NULL, kind TEXT NOT NULL, url TEXT NOT NULL, "
+                 "learned_at REAL NOT NULL, PRIMARY KEY (identifier, kind))")
+    conn.execute("INSERT INTO identifier_urls VALUES ('DA97-07365A', 'part', 'https://www.partselect.com/PS4204638.htm', 0)")
+    conn.commit()
+    conn.close()
+    resolver = PartSelectURLResolver(path=path)
+    assert resolver.identifiers() == [("DA9707365A", "part")]
+    assert resolver.lookup("DA97-07365A", "part") == "https://www.partselect.com/PS4204638.htm"
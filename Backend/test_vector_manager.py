@@ -0,0 +1,153 @@
+import uuid
+import threading
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import Chroma
+from langchain.docstore.document import Document
+from vector_manager import LivePartSelectMemory, build_documents, page_part_numbers, page_symptom
+
+PRODUCT_URL = "https://www.partselect.com/PS4204638-Samsung-DA97-07365A-Ice-Maker-Assembly.htm"
+
+
+class CountingEmbeddings(Embeddings):
+    """
+    Embeds every text as the same unit vector and counts the texts it was asked to embed.
+    """
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[1.0, 0.0, 0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def store():
+    # A private in-memory collection instead of the persistent singleton
+    memory = object.__new__(LivePartSelectMemory)
+    memory.embedding_model = CountingEmbeddings()
+    memory.vector_store = Chroma(embedding_function=memory.embedding_model,
+                                 collection_name=f"test-{uuid.uuid4().hex}")
+    memory._write_lock = threading.Lock()
+    memory._lock_path = None
+    return memory
+
+
+def scraped_page(description="The ice maker assembly makes ice.") -> dict:
+    return {
+        "product_page": PRODUCT_URL,
+        "inventory_id": "4204638",
+        "manufacturer_part_number": "DA97-07365A",
+        "full_description": description,
+        "qna": [{"question": "Does it come with the harness?", "answer": "Yes."},
+                {"question": "Is it OEM?", "answer": "Yes, genuine Samsung."},
+                {"question": "Does it come with the harness?", "answer": "Yes."}],
+    }
+
+
+def test_page_part_numbers_prefer_scraped_values():
+    assert page_part_numbers(scraped_page()) == ("PS4204638", "DA97-07365A")
+    assert page_part_numbers({"product_page": PRODUCT_URL}) == ("PS4204638", "DA97-07365A")
+
+
+def test_identifiers_are_stored_as_lookup_keys():
+    for doc in build_documents(scraped_page()):
+        assert doc.metadata["part_number"] == "PS4204638"
+        assert doc.metadata["manufacturer_part_number"] == "DA9707365A"
+
+
+def test_document_ids_depend_on_type_page_and_content(store):
+    doc = Document(page_content="text", metadata={"type": "qna", "page_url": PRODUCT_URL})
+    same = Document(page_content="text", metadata={"type": "qna", "page_url": PRODUCT_URL, "indexed_at": 1})
+    other_page = Document(page_content="text", metadata={"type": "qna", "page_url": PRODUCT_URL + "?x"})
+    assert store.document_id(doc) == store.document_id(same)
+    assert store.document_id(doc) != store.document_id(other_page)
+
+
+def test_rescraped_page_is_not_embedded_again(store):
+    documents = build_documents(scraped_page())
+    added, skipped = store.upsert_documents(documents)
+    # The repeated Q&A pair is only stored once
+    assert (added, skipped) == (len(documents) - 1, 1)
+    embedded = store.embedding_model.embedded
+
+    added, skipped = store.upsert_documents(build_documents(scraped_page()))
+    assert (added, skipped) == (0, len(documents))
+    assert store.embedding_model.embedded == embedded
+    assert store.document_count() == len(documents) - 1
+
+
+def test_changed_chunk_is_the_only_one_embedded(store):
+    store.upsert_documents(build_documents(scraped_page()))
+    embedded = store.embedding_model.embedded
+    added, _ = store.upsert_documents(build_documents(scraped_page("A new description.")))
+    assert added == 1
+    assert store.embedding_model.embedded == embedded + 1
+
+
+def test_unchanged_chunks_get_fresh_metadata(store):
+    store.upsert_documents(build_documents(scraped_page()))
+    before = store.vector_store.get(include=["metadatas"])["metadatas"][0]["indexed_at"]
+    store.upsert_documents(build_documents(scraped_page()))
+    after = store.vector_store.get(include=["metadatas"])["metadatas"][0]["indexed_at"]
+    assert after > before
+
+
+def test_fresh_documents_are_found_by_either_part_number_spelling(store):
+    store.upsert_documents(build_documents(scraped_page()))
+    for part_number in ("PS4204638", "DA97-07365A", "da9707365a"):
+        assert store.retrieve_fresh("Does it come with a harness?", "qna", part_number=part_number)
+    assert store.retrieve_fresh("Does it come with a harness?", "qna", part_number="DA97-07366A") == []
+
+
+SYMPTOM_URL = "https://www.partselect.com/Models/WRS588FIHZ00/Symptoms/Ice-maker-not-making-ice/"
+
+
+class SymptomEmbeddings(CountingEmbeddings):
+    """
+    Embeds texts about leaking apart from everything else.
+    """
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [0.0, 1.0, 0.0] if "leak" in text.lower() else [1.0, 0.0, 0.0]
+
+
+def symptom_page() -> dict:
+    return {
+        "product_url": SYMPTOM_URL,
+        "model_number": "WRS588FIHZ00",
+        "symptom_title": "Ice maker not making ice",
+        "common_parts": [{
+            "part_name": "Ice Maker Assembly", "part_number": "PS11756150", "fix_percentage": "38",
+            "price": "120.00", "description": "Makes ice.",
+            "user_stories": [{"title": "Ice maker stopped", "instruction": "Replaced the assembly."},
+                             {"title": "No ice", "instruction": "Unplugged the fridge first."}],
+        }],
+    }
+
+
+def test_symptom_pages_tag_their_documents_with_the_symptom():
+    documents = build_documents(symptom_page())
+    assert {doc.metadata["symptom"] for doc in documents} == {"ice maker not making ice"}
+    assert page_symptom({"symptom_title": "Ice Maker Not Making Ice"}) == "ice maker not making ice"
+
+
+def test_troubleshooting_needs_the_same_symptom(store):
+    store.embedding_model = SymptomEmbeddings()
+    store.upsert_documents(build_documents(symptom_page()))
+    query = "My ice maker is not making ice"
+    assert len(store.retrieve_fresh(query, "troubleshoot", model_number="WRS588FIHZ00",
+                                    symptom="Ice maker not making ice")) == 3
+    # Worded differently but embedded alike
+    assert store.retrieve_fresh(query, "troubleshoot", model_number="WRS588FIHZ00", symptom="ice maker not working")
+    # Same model, different symptom
+    assert store.retrieve_fresh(query, "troubleshoot", model_number="WRS588FIHZ00", symptom="leaking") == []
+    assert store.retrieve_fresh(query, "troubleshoot", model_number="WRS588FIHZ00") == []
@@ -0,0 +1,258 @@
+# url_resolver.py
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import quote
+import requests
+from compatibility_store import model_key
+
+logger = logging.getLogger("URLResolver")
+
+URL_TABLE_PATH = os.getenv("URL_TABLE_PATH", "partselect_urls.sqlite3")
+VERIFY_TIMEOUT = float(os.getenv("URL_VERIFY_TIMEOUT", "5"))
+
+BASE_URL = "https://www.partselect.com"
+PS_NUMBER_RE = re.compile(r'^PS\d+$')
+# /PS11752778-Whirlpool-WPW10321304-Refrigerator-Door-Shelf-Bin.htm
+# /PS4204638-Samsung-DA97-07365A-Ice-Maker-Assembly.htm
+PRODUCT_URL_RE = re.compile(r'partselect\.com/(PS\d+)-([^/?#]+)\.htm', re.IGNORECASE)
+# /Models/WRS588FIHZ00/ (optionally followed by /Symptoms/... or /Parts/...)
+MODEL_URL_RE = re.compile(r'partselect\.com/Models/([^/?#]+)/?', re.IGNORECASE)
+
+
+def normalize_identifier(identifier: str) -> str:
+    """
+    The identifier as PartSelect spells it in URLs and searches: upper case, no whitespace.
+    Learned URLs are keyed by model_key() instead, so DA97-07365A and DA9707365A match.
+    """
+    return re.sub(r'\s+', '', identifier or "").upper()
+
+
+def parse_product_url(url: str) -> tuple:
+    """
+    Returns the (PartSelect number, manufacturer part number) encoded in a product URL,
+    or ("", "") if the URL is not a product page.
+
+    The slug is <brand>-<part number>-<title>, all hyphen-separated, and both brands
+    (Jenn-Air) and part numbers (DA97-07365A) may contain hyphens. The part number is the
+    first run of segments that contain a digit; brand and title words don't.
+    """
+    match = PRODUCT_URL_RE.search(url or "")
+    if not match:
+        return "", ""
+    segments = match.group(2).split("-")
+    start = next((i for i, segment in enumerate(segments) if any(char.isdigit() for char in segment)), None)
+    if start is None:
+        return match.group(1).upper(), ""
+    end = start + 1
+    while end < len(segments) and any(char.isdigit() for char in segments[end]):
+        end += 1
+    return match.group(1).upper(), "-".join(segments[start:end]).upper()
+
+
+def parse_model_url(url: str) -> str:
+    """
+    Returns the model number encoded in a /Models/<model>/ URL, or "".
+    """
+    match = MODEL_URL_RE.search(url or "")
+    return match.group(1).upper() if match else ""
+
+
+class PartSelectURLResolver:
+    """
+    Maps part and model numbers to partselect.com URLs without spending a Custom Search query.
+
+    Resolution order:
+    1. The learned identifier -> URL table, filled from every scrape and search result.
+    2. Candidate URLs built from PartSelect's URL patterns (PS<digits>.htm, /Models/<model>/)
+       and the site's own search handler, verified with a cheap HEAD request.
+    Callers fall back to Google only when both fail.
+    """
+
+    def __init__(self, path: str = URL_TABLE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS identifier_urls ("
+            "identifier TEXT NOT NULL, kind TEXT NOT NULL, url TEXT NOT NULL, learned_at REAL NOT NULL, "
+            "PRIMARY KEY (identifier, kind))"
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Identifiers used to keep their hyphens; re-key them the way they are looked up
+            for identifier, kind, url, learned_at in self._conn.execute(
+                    "SELECT identifier, kind, url, learned_at FROM identifier_urls").fetchall():
+                if model_key(identifier) != identifier:
+                    self._conn.execute("DELETE FROM identifier_urls WHERE identifier = ? AND kind = ?",
+                                       (identifier, kind))
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO identifier_urls (identifier, kind, url, learned_at) "
+                        "VALUES (?, ?, ?, ?)", (model_key(identifier), kind, url, learned_at))
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+        # Bumped on every learned identifier, so derived indexes know when to pick up new ones
+        self.version = 0
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                "(KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
+            )
+        })
+
+    # ============================
+    # Learned table
+    # ============================
+
+    def lookup(self, identifier: str, kind: str) -> str:
+        """
+        Returns the learned URL for an identifier ('part' or 'model'), or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url FROM identifier_urls WHERE identifier = ? AND kind = ?",
+                (model_key(identifier), kind)).fetchone()
+        return row[0] if row else None
+
+    def learn(self, identifier: str, url: str, kind: str):
+        """
+        Records that an identifier ('part' or 'model') lives at the given URL.
+        """
+        identifier = model_key(identifier)
+        if not identifier or not url or "partselect.com" not in url:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO identifier_urls (identifier, kind, url, learned_at) VALUES (?, ?, ?, ?)",
+                (identifier, kind, url, time.time()))
+            self._conn.commit()
+            self.version += 1
+
+    def identifiers(self) -> list:
+        """
+        Returns (identifier, kind) for every learned identifier, in model_key() form.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT identifier, kind FROM identifier_urls").fetchall()
+
+    def learn_from_url(self, url: str):
+        """
+        Learns whatever identifiers a partselect.com URL encodes.
+        """
+        part_number, manufacturer_part_number = parse_product_url(url)
+        if part_number:
+            product_url = url.split("?")[0].split("#")[0]
+            self.learn(part_number, product_url, "part")
+            self.learn(manufacturer_part_number, product_url, "part")
+        model_number = parse_model_url(url)
+        if model_number:
+            self.learn(model_number, f"{BASE_URL}/Models/{model_number}/", "model")
+
+    def learn_from_search_results(self, results: list):
+        """
+        Learns from the (snippet, link) tuples returned by google_partselect_search.
+        """
+        for _, link in results or []:
+            self.learn_from_url(link)
+
+    def learn_from_scrape(self, data: dict):
+        """
+        Learns from a scraped product or symptom page.
+        """
+        if not isinstance(data, dict):
+            return
+        product_page = data.get("product_page", "")
+        if product_page:
+            self.learn_from_url(product_page)
+            if data.get("inventory_id"):
+                self.learn(f"PS{data['inventory_id']}", product_page, "part")
+        self.learn_from_url(data.get("product_url", ""))
+        if data.get("model_number"):
+            self.learn(data["model_number"], f"{BASE_URL}/Models/{normalize_identifier(data['model_number'])}/", "model")
+        for part in data.get("common_parts", []):
+            part_url = part.get("part_url") or ""
+            if part_url.startswith("/"):
+                part_url = BASE_URL + part_url
+            self.learn_from_url(part_url)
+            self.learn(part.get("part_number", ""), part_url, "part")
+            self.learn(part.get("manufacturer_part_number", ""), part_url, "part")
+
+    # ============================
+    # Candidate URLs
+    # ============================
+
+    def verify(self, url: str) -> str:
+        """
+        Checks a candidate URL with a HEAD request, following redirects.
+        Returns the final partselect.com URL, or None if it doesn't resolve.
+        """
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=VERIFY_TIMEOUT)
+            if response.status_code == 405:
+                response = self.session.get(url, allow_redirects=True, timeout=VERIFY_TIMEOUT, stream=True)
+                response.close()
+        except requests.RequestException as e:
+            logger.info(f"ℹ️ Could not verify {url}: {e}")
+            return None
+        if response.status_code != 200 or "partselect.com" not in response.url:
+            return None
+        return response.url
+
+    def _search_handler_url(self, identifier: str) -> str:
+        """
+        PartSelect's own search handler, which redirects exact part/model matches to their page.
+        """
+        return f"{BASE_URL}/api/search/?searchterm={quote(identifier)}"
+
+    def resolve_part(self, part_number: str) -> str:
+        """
+        Resolves a PartSelect (PS11752778) or manufacturer (WPW10321304) part number
+        to its product page URL, or None.
+        """
+        identifier = normalize_identifier(part_number)
+        if not identifier:
+            return None
+        learned = self.lookup(identifier, "part")
+        if learned:
+            logger.info(f"✅ Resolved part {identifier} from learned table: {learned}")
+            return learned
+
+        candidates = []
+        if PS_NUMBER_RE.match(identifier):
+            candidates.append(f"{BASE_URL}/{identifier}.htm")
+        candidates.append(self._search_handler_url(identifier))
+
+        for candidate in candidates:
+            url = self.verify(candidate)
+            if url and parse_product_url(url)[0]:
+                logger.info(f"✅ Resolved part {identifier} without search: {url}")
+                self.learn_from_url(url)
+                self.learn(identifier, url, "part")
+                return url
+        return None
+
+    def resolve_model(self, model_number: str) -> str:
+        """
+        Resolves an appliance model number to its /Models/<model>/ page URL, or None.
+        """
+        identifier = normalize_identifier(model_number)
+        if not identifier:
+            return None
+        learned = self.lookup(identifier, "model")
+        if learned:
+            logger.info(f"✅ Resolved model {identifier} from learned table: {learned}")
+            return learned
+
+        for candidate in (f"{BASE_URL}/Models/{quote(identifier)}/", self._search_handler_url(identifier)):
+            url = self.verify(candidate)
+            if url and parse_model_url(url):
+                logger.info(f"✅ Resolved model {identifier} without search: {url}")
+                self.learn(identifier, url, "model")
+                return url
+        return None
+
+
+url_resolver = PartSelectURLResolver()
@@ -1,24 +1,55 @@
 # vector_manager.py
 
 import os
+import re
 import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, writes are only serialized within a process
+    fcntl = None
 from langchain_community.embeddings import OpenAIEmbeddings  # Updated import
 from langchain_community.vectorstores import Chroma  # Updated import
 from langchain.docstore.document import Document
 from google_search import google_partselect_search
+from url_resolver import parse_product_url
+from compatibility_store import compatibility_store, model_key
+from answer_cache import normalize_query, cosine_similarity
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - VectorManager - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("vector_manager.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("VectorManager")
 
+# Set VECTOR_STORE_PERSIST=false to get the old throwaway in-memory collection
+VECTOR_STORE_PERSIST = os.getenv("VECTOR_STORE_PERSIST", "true").lower() == "true"
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "chroma_db")
+# How long a write waits for another process (worker, reparse_archive) to finish its batch
+VECTOR_STORE_LOCK_TIMEOUT = float(os.getenv("VECTOR_STORE_LOCK_TIMEOUT", "30"))
+
+# Retrieval-first answering: how old and how many indexed documents may be used
+# to answer a query without searching and scraping again
+RETRIEVAL_MAX_AGE_HOURS = float(os.getenv("RETRIEVAL_MAX_AGE_HOURS", "168"))
+RETRIEVAL_MIN_RELEVANCE = float(os.getenv("RETRIEVAL_MIN_RELEVANCE", "0.75"))
+# Troubleshooting documents must come from a symptom page about the asked symptom:
+# worded the same, or embedded at least this alike
+RETRIEVAL_SYMPTOM_SIMILARITY = float(os.getenv("RETRIEVAL_SYMPTOM_SIMILARITY", "0.9"))
+
+# Document types that can answer each intent, and how many of them are needed
+INTENT_DOC_TYPES = {
+    "troubleshoot": ["user_story", "part_info"],
+    "installation": ["installation_guides", "full_description", "qna", "troubleshooting_replacements"],
+    "compatibility": ["model_compatibility"],
+    "qna": ["qna", "full_description"],
+}
+INTENT_MIN_DOCS = {
+    "troubleshoot": 3,
+    "installation": 3,
+    "compatibility": 1,
+    "qna": 2,
+}
+
 
 class LivePartSelectMemory:
     _instance = None
@@ -38,13 +69,171 @@ class LivePartSelectMemory:
             model="text-embedding-ada-002"  # Update if a more recent model is available
         )
 
-        # Initialize Chroma without persistence
+        self._write_lock = threading.Lock()
+        self._lock_path = None
+
+        if not VECTOR_STORE_PERSIST:
+            # Initialize Chroma without persistence
+            self.vector_store = Chroma(
+                embedding_function=self.embedding_model,
+                collection_name="partselect_data"
+            )
+            logger.info("✅ LivePartSelectMemory initialized with non-persistent ChromaDB.")
+            return
+
+        os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+        self._lock_path = os.path.join(VECTOR_STORE_DIR, ".writer.lock")
+
+        # Reopens the collection persisted by earlier runs, no re-embedding needed
         self.vector_store = Chroma(
             embedding_function=self.embedding_model,
-            collection_name="partselect_data"
+            collection_name="partselect_data",
+            persist_directory=VECTOR_STORE_DIR
         )
 
-        logger.info("✅ LivePartSelectMemory initialized with non-persistent ChromaDB.")
+        logger.info(
+            f"✅ LivePartSelectMemory loaded persistent ChromaDB from '{VECTOR_STORE_DIR}' "
+            f"({self.document_count()} documents)."
+        )
+
+    @contextmanager
+    def writer_lock(self, timeout: float = VECTOR_STORE_LOCK_TIMEOUT):
+        """
+        Serializes writes to the persistent store across threads and processes. Held for one
+        upsert batch only, so every worker process can index what it scrapes.
+        Raises TimeoutError if another writer holds it for longer than `timeout` seconds.
+        """
+        with self._write_lock:
+            if fcntl is None or self._lock_path is None:
+                yield
+                return
+            with open(self._lock_path, "w") as lock_file:
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f"vector store writer lock busy for {timeout:g}s")
+                        time.sleep(0.05)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def document_count(self) -> int:
+        """
+        Returns the number of documents in the collection.
+        """
+        try:
+            return self.vector_store._collection.count()
+        except Exception:
+            return 0
+
+    @staticmethod
+    def document_id(doc: Document) -> str:
+        """
+        Deterministic ID for a document, derived from its type, source page and content.
+        Re-scraping the same page yields the same IDs, so unchanged chunks are recognized.
+        """
+        key = "\x1f".join([
+            doc.metadata.get("type", ""),
+            doc.metadata.get("page_url") or doc.metadata.get("source", ""),
+            doc.page_content,
+        ])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def upsert_documents(self, documents: list) -> tuple:
+        """
+        Adds only the documents whose content-derived ID is not in the store yet.
+        Unchanged chunks are skipped before the embedding call, so they are never re-embedded.
+        Returns (added, skipped) counts.
+        """
+        unique = {}
+        for doc in documents:
+            unique.setdefault(self.document_id(doc), doc)
+
+        ids = list(unique)
+        with self.writer_lock():
+            existing = set(self.vector_store.get(ids=ids, include=[])["ids"]) if ids else set()
+            new_ids = [doc_id for doc_id in ids if doc_id not in existing]
+            existing_ids = [doc_id for doc_id in ids if doc_id in existing]
+
+            if new_ids:
+                self.vector_store.add_documents([unique[doc_id] for doc_id in new_ids], ids=new_ids)
+            if existing_ids:
+                # Refresh metadata (e.g. indexed_at) of unchanged chunks without re-embedding them
+                self.vector_store._collection.update(
+                    ids=existing_ids, metadatas=[unique[doc_id].metadata for doc_id in existing_ids])
+        return len(new_ids), len(documents) - len(new_ids)
+
+    def retrieve_fresh(self, query: str, intent: str, part_number: str = None,
+                       model_number: str = None, symptom: str = None, top_k: int = 6) -> list:
+        """
+        Looks for indexed documents that can answer the query without a live search and scrape.
+        Documents are filtered by intent type, part/model number and age
+        (RETRIEVAL_MAX_AGE_HOURS), and must be at least RETRIEVAL_MIN_RELEVANCE similar.
+        Troubleshooting documents must also come from a page about the same symptom.
+        Returns the matching Documents, or [] when the store doesn't cover the query well enough.
+        """
+        doc_types = INTENT_DOC_TYPES.get(intent)
+        if not doc_types or not (part_number or model_number):
+            return []
+        if intent == "compatibility" and not part_number:
+            return []
+        symptom = normalize_query(symptom)
+        if intent == "troubleshoot" and not symptom:
+            return []
+
+        cutoff = time.time() - RETRIEVAL_MAX_AGE_HOURS * 3600
+        conditions = [
+            {"type": {"$in": doc_types}},
+            {"indexed_at": {"$gte": cutoff}},
+        ]
+        if part_number:
+            part_number = model_key(part_number)
+            conditions.append({"$or": [
+                {"part_number": {"$eq": part_number}},
+                {"manufacturer_part_number": {"$eq": part_number}},
+            ]})
+        # Compatibility is indexed as one summary document per part, the model itself is
+        # checked against compatibility_store by the caller
+        if model_number and intent == "troubleshoot":
+            conditions.append({"model": {"$eq": model_key(model_number)}})
+
+        try:
+            results = self.vector_store.similarity_search_with_relevance_scores(
+                query, k=top_k, filter={"$and": conditions})
+        except Exception as e:
+            logger.warning(f"⚠️ Retrieval-first lookup failed: {e}")
+            return []
+
+        documents = [doc for doc, score in results if score >= RETRIEVAL_MIN_RELEVANCE]
+        if intent == "troubleshoot":
+            documents = self._same_symptom(symptom, documents)
+        if len(documents) < INTENT_MIN_DOCS.get(intent, 1):
+            logger.info(f"ℹ️ Vector store miss for intent '{intent}' ({len(documents)} fresh documents).")
+            return []
+
+        logger.info(f"✅ Vector store hit for intent '{intent}' with {len(documents)} fresh documents.")
+        return documents
+
+    def _same_symptom(self, symptom: str, documents: list) -> list:
+        """
+        Keeps the documents whose symptom page is about `symptom`: worded the same, or
+        embedded at least RETRIEVAL_SYMPTOM_SIMILARITY alike.
+        """
+        matching = {symptom}
+        indexed = sorted({doc.metadata.get("symptom") or "" for doc in documents} - {"", symptom})
+        if indexed:
+            try:
+                asked, *embeddings = self.embedding_model.embed_documents([symptom] + indexed)
+                matching.update(other for other, embedding in zip(indexed, embeddings)
+                                if cosine_similarity(asked, embedding) >= RETRIEVAL_SYMPTOM_SIMILARITY)
+            except Exception as e:
+                logger.warning(f"⚠️ Symptom comparison failed, using exact matches only: {e}")
+        return [doc for doc in documents if doc.metadata.get("symptom") in matching]
 
     def live_search_and_index(self, query: str, k=3):
         """
@@ -71,10 +260,10 @@ class LivePartSelectMemory:
             return "No valid data found to index."
 
         try:
-            # Add documents to the vector store (Chroma handles embeddings internally)
-            self.vector_store.add_documents(documents)
-            logger.info(f"✅ Live indexed {len(documents)} new items from PartSelect.")
-            return f"Live indexed {len(documents)} new items from PartSelect."
+            # Add new documents to the vector store (Chroma handles embeddings internally)
+            added, skipped = self.upsert_documents(documents)
+            logger.info(f"✅ Live indexed {added} new items from PartSelect ({skipped} already indexed).")
+            return f"Live indexed {added} new items from PartSelect."
         except Exception as e:
             logger.exception(f"Error during indexing: {e}")
             return "Error: Unable to index data."
@@ -89,11 +278,11 @@ class LivePartSelectMemory:
         if intent == 'troubleshoot':
             filter_metadata = {"type": {"$eq": "user_story"}}
             if model_number:
-                filter_metadata["model"] = {"$eq": model_number}  # Filter by model if provided
+                filter_metadata["model"] = {"$eq": model_key(model_number)}  # Filter by model if provided
         elif intent == 'installation':
             filter_metadata = {"type": {"$eq": "installation_guides"}}
             if model_number:
-                filter_metadata["model"] = {"$eq": model_number}
+                filter_metadata["model"] = {"$eq": model_key(model_number)}
         elif intent == 'compatibility':
             filter_metadata = {"type": {"$eq": "model_compatibility"}}
         elif intent == 'qna':
@@ -146,17 +335,32 @@ class LivePartSelectMemory:
 live_store = LivePartSelectMemory()
 
 
-def index_scraped_data(json_str: str) -> str:
+def page_part_numbers(data: dict) -> tuple:
     """
-    Parses JSON data from the scraper and indexes relevant sections into the vector store.
+    Returns the (PartSelect number, manufacturer part number) of a scraped product page,
+    taken from its inventory ID and the page's part number, else from its URL
+    (e.g. /PS11752778-Whirlpool-WPW10321304-...htm).
     """
-    logger.info(f"Indexing data: {json_str}")
-    try:
-        data = json.loads(json_str)
-    except json.JSONDecodeError:
-        logger.error("❌ Invalid JSON input.")
-        return "❌ Invalid JSON input."
+    url_part_number, url_manufacturer_part_number = parse_product_url(data.get("product_page", ""))
+    part_number = f"PS{data['inventory_id']}" if data.get("inventory_id") else url_part_number
+    manufacturer_part_number = (data.get("manufacturer_part_number") or url_manufacturer_part_number).upper()
+    return part_number.upper(), manufacturer_part_number
+
+
+def page_symptom(data: dict) -> str:
+    """
+    Returns the normalized symptom of a scraped symptom page, taken from its URL
+    (e.g. /Models/WRS588FIHZ00/Symptoms/Ice-maker-not-making-ice/), else from its title.
+    """
+    url = data.get("product_url") or data.get("product_page") or ""
+    match = re.search(r"/Symptoms/([^/?#]+)", url)
+    return normalize_query(match.group(1) if match else data.get("symptom_title"))
 
+
+def build_documents(data: dict) -> list:
+    """
+    Turns scraped data into tagged Documents, one per Q&A pair, story, description chunk, etc.
+    """
     documents = []
 
     # ============================
@@ -231,25 +435,36 @@ def index_scraped_data(json_str: str) -> str:
     # ============================
     # 3. Model Compatibility Document Tagging
     # ============================
+    # The rows go to the columnar compatibility store (checked by key lookup); only one
+    # summary document per part is embedded
     model_compatibility = data.get("model_compatibility", [])
-    if isinstance(model_compatibility, list):
-        for model in model_compatibility:
-            if isinstance(model, dict):
-                brand = model.get("brand", "").strip()
-                model_number = model.get("model_number", "").strip()
-                description = model.get("description", "").strip()
-                if brand and model_number and description:
-                    # 🏷️ Mark as "model_compatibility"
-                    content = f"Brand: {brand}\nModel Number: {model_number}\nDescription: {description}"
-                    documents.append(
-                        Document(
-                            page_content=content,
-                            metadata={
-                                "type": "model_compatibility",
-                                "source": "scraped_json"
-                            }
-                        )
-                    )
+    part_number, manufacturer_part_number = page_part_numbers(data)
+    if isinstance(model_compatibility, list) and model_compatibility and part_number:
+        rows = (
+            model for model in model_compatibility
+            if isinstance(model, dict) and model.get("brand") and model.get("model_number")
+        )
+        table = compatibility_store.put(part_number, rows, aliases=[manufacturer_part_number],
+                                        complete=bool(data.get("model_compatibility_complete")))
+        if len(table):
+            summary = table.summary()
+            brands = ", ".join(f"{brand} ({count})" for brand, count in summary["brands"].items())
+            appliance_types = ", ".join(summary["appliance_types"])
+            content = (
+                f"Part {part_number} ({manufacturer_part_number}) fits {summary['model_count']} appliance models.\n"
+                f"Brands: {brands}\n"
+                f"Appliance types: {appliance_types}\n"
+                f"Example models: {', '.join(summary['sample_models'])}"
+            )
+            documents.append(
+                Document(
+                    page_content=content,
+                    metadata={
+                        "type": "model_compatibility",
+                        "source": "scraped_json"
+                    }
+                )
+            )
 
     # ============================
     # 4. Installation Document Tagging
@@ -293,6 +508,7 @@ def index_scraped_data(json_str: str) -> str:
     # 6. Symptom Information Tagging
     # ============================
     # Index common parts
+    symptom = page_symptom(data)
     for part in data.get("common_parts", []):
         content = f"Part: {part['part_name']}\nFix Percentage: {part['fix_percentage']}%\nPrice: ${part['price']}\nDescription: {part['description']}"
         documents.append(
@@ -301,6 +517,9 @@ def index_scraped_data(json_str: str) -> str:
                 metadata={
                     "type": "part_info",
                     "model": data.get("model_number", ""),
+                    "part_number": model_key(part.get("part_number")),
+                    "manufacturer_part_number": model_key(part.get("manufacturer_part_number")),
+                    "symptom": symptom,
                     "source": "scraped_json"
                 }
             )
@@ -315,20 +534,51 @@ def index_scraped_data(json_str: str) -> str:
                     metadata={
                         "type": "user_story",
                         "model": data.get("model_number", ""),
+                        "part_number": model_key(part.get("part_number")),
+                        "manufacturer_part_number": model_key(part.get("manufacturer_part_number")),
+                        "symptom": symptom,
                         "source": "scraped_json"
                     }
                 )
             )
 
+    # Tag every document with the page it came from (so IDs differ between pages),
+    # the identifiers it belongs to (as model_key() lookup keys) and when it was indexed
+    # (for retrieval-first answering)
+    page_url = data.get("product_page") or data.get("product_url") or ""
+    part_number, manufacturer_part_number = page_part_numbers(data)
+    indexed_at = time.time()
+    for doc in documents:
+        doc.metadata["page_url"] = page_url
+        doc.metadata["indexed_at"] = indexed_at
+        doc.metadata.setdefault("part_number", model_key(part_number))
+        doc.metadata.setdefault("manufacturer_part_number", model_key(manufacturer_part_number))
+        doc.metadata["model"] = model_key(doc.metadata.get("model") or data.get("model_number"))
+
+    return documents
+
+
+def index_scraped_data(json_str: str) -> str:
+    """
+    Parses JSON data from the scraper and indexes relevant sections into the vector store.
+    """
+    logger.info(f"Indexing data: {json_str}")
+    try:
+        data = json.loads(json_str)
+    except json.JSONDecodeError:
+        logger.error("❌ Invalid JSON input.")
+        return "❌ Invalid JSON input."
+
+    documents = build_documents(data)
     if not documents:
         logger.error("❌ No valid documents found to index.")
         return "❌ No valid documents found to index."
 
     try:
-        # Add documents to the vector store
-        live_store.vector_store.add_documents(documents)
-        logger.info(f"✅ Indexed {len(documents)} documents from scraped data.")
-        return f"✅ Indexed {len(documents)} documents from scraped data."
+        # Upsert documents into the vector store, skipping chunks that are already indexed
+        added, skipped = live_store.upsert_documents(documents)
+        logger.info(f"✅ Indexed {added} documents from scraped data ({skipped} unchanged).")
+        return f"✅ Indexed {added} documents from scraped data ({skipped} unchanged)."
     except Exception as e:
         logger.exception(f"❌ Error during indexing: {e}")
         return "❌ Failed to index scraped data."
@@ -339,3 +589,11 @@ def semantic_search_with_intent(query: str, intent: str, model_number: str = Non
     Performs semantic search based on the query and intent.
     """
     return live_store.semantic_search_with_intent(query, intent, model_number, top_k)
+
+
+def retrieve_fresh(query: str, intent: str, part_number: str = None, model_number: str = None,
+                   symptom: str = None, top_k: int = 6):
+    """
+    Returns fresh indexed documents that cover the query, or [] on a miss.
+    """
+    return live_store.retrieve_fresh(query, intent, part_number, model_number, symptom, top_k)
@@ -0,0 +1,158 @@
+# waits.py
+
+import os
+import time
+import logging
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, JavascriptException
+
+logger = logging.getLogger("Waits")
+
+WAIT_TIMEOUT = float(os.getenv("WAIT_TIMEOUT", "10"))
+# Bound for small UI reactions (popup closing, "Read more" expanding)
+EXPAND_TIMEOUT = float(os.getenv("WAIT_EXPAND_TIMEOUT", "2"))
+WAIT_POLL_INTERVAL = float(os.getenv("WAIT_POLL_INTERVAL", "0.1"))
+DOM_QUIET_MS = int(os.getenv("WAIT_DOM_QUIET_MS", "300"))
+NETWORK_IDLE_MS = int(os.getenv("WAIT_NETWORK_IDLE_MS", "500"))
+
+# Installs one MutationObserver per root selector that timestamps the latest DOM change
+_INSTALL_OBSERVER_JS = """
+var key = arguments[0];
+var root = (key && document.querySelector(key)) || document.body;
+window.__waitObservers = window.__waitObservers || {};
+var entry = window.__waitObservers[key];
+if (entry && entry.root === root) { entry.last = performance.now(); return; }
+if (entry) { entry.observer.disconnect(); }
+entry = {root: root, last: performance.now()};
+entry.observer = new MutationObserver(function() { entry.last = performance.now(); });
+entry.observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+window.__waitObservers[key] = entry;
+"""
+
+_DOM_QUIET_JS = """
+var entry = (window.__waitObservers || {})[arguments[0]];
+return !entry || performance.now() - entry.last >= arguments[1];
+"""
+
+# Resource timing entries are added as requests finish; the page is idle once the count
+# has stayed the same for the idle window and the document has finished loading.
+_NETWORK_IDLE_JS = """
+var count = performance.getEntriesByType('resource').length;
+var now = performance.now();
+if (window.__waitResourceCount !== count) {
+    window.__waitResourceCount = count;
+    window.__waitResourceChangedAt = now;
+}
+return document.readyState === 'complete' && now - window.__waitResourceChangedAt >= arguments[0];
+"""
+
+
+class WaitRecorder:
+    """
+    Records how long each named wait actually took, so the upper bounds can be tuned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = {}
+
+    def record(self, name: str, seconds: float, timed_out: bool):
+        with self._lock:
+            entry = self._waits.setdefault(name, {
+                "count": 0,
+                "timeouts": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            })
+            entry["count"] += 1
+            entry["timeouts"] += int(timed_out)
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def stats(self) -> dict:
+        """
+        Returns per-wait counters with the average and maximum duration in seconds.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "count": entry["count"],
+                    "timeouts": entry["timeouts"],
+                    "avg_seconds": round(entry["total_seconds"] / entry["count"], 3),
+                    "max_seconds": round(entry["max_seconds"], 3),
+                }
+                for name, entry in self._waits.items()
+            }
+
+
+wait_recorder = WaitRecorder()
+
+
+def wait_for(driver, name: str, condition, timeout: float = WAIT_TIMEOUT) -> bool:
+    """
+    Polls `condition(driver)` until it is truthy or `timeout` seconds pass.
+    Returns False on timeout instead of raising; the duration is recorded under `name`.
+    """
+    start = time.monotonic()
+    timed_out = False
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_INTERVAL,
+                      ignored_exceptions=(StaleElementReferenceException,)).until(condition)
+    except TimeoutException:
+        timed_out = True
+        logger.info(f"ℹ️ Wait '{name}' timed out after {timeout}s.")
+    finally:
+        wait_recorder.record(name, time.monotonic() - start, timed_out)
+    return not timed_out
+
+
+def wait_for_dom_quiet(driver, root_selector: str = "", quiet_ms: int = DOM_QUIET_MS,
+                       timeout: float = WAIT_TIMEOUT, name: str = "dom_quiet") -> bool:
+    """
+    Waits until no DOM mutation has happened under `root_selector` (default: the whole body)
+    for `quiet_ms` milliseconds.
+    """
+    try:
+        driver.execute_script(_INSTALL_OBSERVER_JS, root_selector)
+    except JavascriptException as e:
+        logger.warning(f"⚠️ Could not install mutation observer: {e}")
+        return False
+    return wait_for(driver, name, lambda d: d.execute_script(_DOM_QUIET_JS, root_selector, quiet_ms), timeout)
+
+
+def wait_for_network_idle(driver, idle_ms: int = NETWORK_IDLE_MS, timeout: float = WAIT_TIMEOUT,
+                          name: str = "network_idle") -> bool:
+    """
+    Waits until the document is loaded and no resource has finished loading for `idle_ms` milliseconds.
+    """
+    return wait_for(driver, name, lambda d: d.execute_script(_NETWORK_IDLE_JS, idle_ms), timeout)
+
+
+def wait_for_attribute(driver, locator: tuple, attribute: str, value: str, timeout: float = WAIT_TIMEOUT,
+                       name: str = "attribute") -> bool:
+    """
+    Waits until the element at `locator` has `attribute` equal to `value`.
+    """
+    return wait_for(driver, name, EC.attribute_to_be(locator, attribute, value), timeout)
+
+
+def wait_for_element_count(driver, css_selector: str, minimum: int = 1, timeout: float = WAIT_TIMEOUT,
+                           name: str = "element_count") -> bool:
+    """
+    Waits until at least `minimum` elements match `css_selector`.
+    """
+    count_js = "return document.querySelectorAll(arguments[0]).length;"
+    return wait_for(driver, name, lambda d: d.execute_script(count_js, css_selector) >= minimum, timeout)
+
+
+def wait_for_invisible(driver, target, timeout: float = WAIT_TIMEOUT, name: str = "invisible") -> bool:
+    """
+    Waits until `target` (a WebElement or a locator tuple) is hidden or removed from the DOM.
+    """
+    if isinstance(target, tuple):
+        condition = EC.invisibility_of_element_located(target)
+    else:
+        condition = EC.invisibility_of_element(target)
+    return wait_for(driver, name, condition, timeout)